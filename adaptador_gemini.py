@@ -1,82 +1,203 @@
 # adaptadores/adaptador_gemini.py
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Iterator, Optional
 from returns.result import Result, Success, Failure
-import os
-from PIL import Image
-from google import genai
-from google.genai.types import Part
+import time
 
-from entidades import CaminhoImagem, DescricaoImagem, ErroIA, ProvedorIA
+from entidades import (
+    CaminhoImagem, CategoriaErro, DescricaoImagem, ErroIA, ProvedorIA,
+    PerfilImagem, LimiteTaxa, NivelDetalhe
+)
 from servico_ia import ServicoIA
+from tratador_erros import classificar_excecao
+from clientes_sdk import GerenciadorClientes
+from prompts import instrucao_bloco, instrucao_nivel, max_tokens_saida
+from prazo import Prazo
+from metricas import medir_etapa
+from formato_imagem import tipo_mime
+
+# Motivos de término que indicam bloqueio da resposta pelos filtros do Gemini
+MOTIVOS_BLOQUEIO = {'SAFETY', 'PROHIBITED_CONTENT', 'BLOCKLIST', 'SPII', 'IMAGE_SAFETY'}
 
 class AdaptadorGemini(ServicoIA):
     """Adaptador para o serviço de IA do Google Gemini utilizando o SDK oficial."""
     
     provedor = ProvedorIA.GEMINI
+    # O Gemini divide imagens grandes em blocos de 768 px cobrados em tokens;
+    # acima de 1536 px o ganho de detalhe não compensa o custo de envio
+    perfil_imagem = PerfilImagem(lado_maximo=1536, formato='WEBP', qualidade=80)
+    # Cota do nível gratuito do gemini-2.0-flash
+    limite_taxa = LimiteTaxa(requisicoes_por_minuto=15, rajada=4)
+    # Endereço aberto antecipadamente para aquecer a conexão
+    url_api = 'https://generativelanguage.googleapis.com/'
     
-    def __init__(self, chave_api: str):
-        """Inicializa o adaptador com a chave API."""
+    def __init__(self, chave_api: str, clientes: Optional[GerenciadorClientes] = None):
+        """Inicializa o adaptador com a chave API e o gerenciador de clientes compartilhado."""
         self.chave_api = chave_api
+        self.clientes = clientes or GerenciadorClientes()
         self.modelo = "gemini-2.0-flash"
-        self.cliente = None
+        # Modelo mais barato para as chamadas só de texto
+        self.modelo_texto = "gemini-2.0-flash-lite"
+        # Modelo rápido, também com visão, para o texto alternativo
+        self.modelo_rapido = "gemini-2.0-flash-lite"
+    
+    def modelo_nivel(self, nivel: NivelDetalhe) -> str:
+        """Modelo que descreve a imagem no nível pedido: o rápido para o texto alternativo."""
+        return self.modelo_rapido if nivel == NivelDetalhe.TEXTO_ALTERNATIVO else self.modelo
+    
+    @property
+    def cliente(self):
+        """Cliente do SDK, mantido pelo gerenciador enquanto a chave não mudar."""
+        return self.clientes.obter(self.provedor, self.chave_api, self._criar_cliente)
+    
+    @staticmethod
+    def _criar_cliente(chave_api: str, http):
+        """
+        Cria o cliente Gemini sobre o cliente HTTP compartilhado. O SDK só é
+        importado aqui, para não pesar na inicialização do NVDA.
+        """
+        from google import genai
+        from google.genai.types import HttpOptions
         
+        try:
+            return genai.Client(api_key=chave_api, http_options=HttpOptions(httpx_client=http))
+        except (TypeError, ValueError):
+            # Versões do SDK sem httpx_client mantêm um pool próprio
+            return genai.Client(api_key=chave_api)
+    
+    def aquecer(self) -> None:
+        """Cria o cliente e abre a conexão com a API em segundo plano."""
         if self.chave_api:
-            try:
-                # Inicializa o cliente Gemini com a chave API
-                self.cliente = genai.Client(api_key=self.chave_api)
-            except Exception:
-                self.cliente = None
+            self.clientes.aquecer(self.provedor, self.chave_api, self._criar_cliente, self.url_api)
+    
+    def _configuracao_requisicao(self, prazo: Optional[Prazo], nivel: NivelDetalhe):
+        """
+        Limita a resposta ao orçamento de tokens do nível e aplica o tempo
+        restante do prazo como timeout HTTP da requisição.
+        """
+        from google.genai.types import GenerateContentConfig, HttpOptions
+        
+        return GenerateContentConfig(
+            max_output_tokens=max_tokens_saida(self.provedor, nivel),
+            http_options=HttpOptions(timeout=prazo.milissegundos_restantes) if prazo is not None else None
+        )
+    
+    def _erro_resposta_vazia(self, response) -> ErroIA:
+        """Resposta sem texto: bloqueio pelo filtro de conteúdo ou resposta realmente vazia."""
+        feedback = getattr(response, 'prompt_feedback', None)
+        motivo = getattr(feedback, 'block_reason', None)
+        if motivo is None:
+            candidatos = getattr(response, 'candidates', None) or []
+            motivo_fim = getattr(candidatos[0], 'finish_reason', None) if candidatos else None
+            if getattr(motivo_fim, 'name', motivo_fim) in MOTIVOS_BLOQUEIO:
+                motivo = motivo_fim
+        if motivo is not None:
+            return ErroIA(
+                f'Gemini recusou a imagem pelo filtro de conteúdo: {getattr(motivo, "name", motivo)}',
+                CategoriaErro.CONTEUDO_BLOQUEADO
+            )
+        return ErroIA('Resposta vazia da API Gemini')
     
-    def descrever_imagem(self, caminho_imagem: CaminhoImagem) -> Result[DescricaoImagem, ErroIA]:
+    def descrever_imagem(self, caminho_imagem: CaminhoImagem, prazo: Optional[Prazo] = None, nivel: NivelDetalhe = NivelDetalhe.DETALHADO) -> Result[DescricaoImagem, ErroIA]:
         """Descreve uma imagem usando o Google Gemini."""
         if not self.chave_api or not self.cliente:
-            return Failure(ErroIA('Chave API do Gemini não configurada ou cliente não inicializado'))
+            return Failure(ErroIA('Chave API do Gemini não configurada ou cliente não inicializado', CategoriaErro.AUTENTICACAO))
         
         try:
-            # Carregando a imagem usando PIL
-            imagem = Image.open(caminho_imagem)
-            
-            # Construindo o prompt para descrição detalhada
-            prompt = "Descreva detalhadamente esta imagem para uma pessoa com deficiência visual."
+            with medir_etapa('leitura', self.provedor):
+                with open(caminho_imagem, 'rb') as arquivo:
+                    imagem_bytes = arquivo.read()
+        except OSError as e:
+            return Failure(ErroIA(f'Erro ao ler imagem para o Gemini: {str(e)}', CategoriaErro.ENTRADA_INVALIDA))
+        
+        # Os bytes lidos seguem o mesmo caminho das imagens já carregadas, sem decodificá-los aqui
+        return self.descrever_imagem_bytes(imagem_bytes, tipo_mime(imagem_bytes), prazo, nivel)
+    
+    def descrever_imagem_bytes(self, imagem_bytes: bytes, mime_type: str, prazo: Optional[Prazo] = None, nivel: NivelDetalhe = NivelDetalhe.DETALHADO, resumo: Optional[bytes] = None) -> Result[DescricaoImagem, ErroIA]:
+        """Descreve uma imagem a partir de bytes usando o Google Gemini."""
+        return self._descrever_bytes(imagem_bytes, mime_type, instrucao_nivel(nivel), prazo, nivel)
+    
+    def descrever_bloco_bytes(self, imagem_bytes: bytes, mime_type: str, indice: int, total: int, prazo: Optional[Prazo] = None, nivel: NivelDetalhe = NivelDetalhe.DETALHADO, resumo: Optional[bytes] = None) -> Result[DescricaoImagem, ErroIA]:
+        """Descreve um bloco de uma imagem dividida, informando qual parte ele é."""
+        return self._descrever_bytes(imagem_bytes, mime_type, instrucao_bloco(nivel, indice, total), prazo, nivel)
+    
+    def _descrever_bytes(self, imagem_bytes: bytes, mime_type: str, prompt: str, prazo: Optional[Prazo], nivel: NivelDetalhe) -> Result[DescricaoImagem, ErroIA]:
+        if not self.chave_api or not self.cliente:
+            return Failure(ErroIA('Chave API do Gemini não configurada ou cliente não inicializado', CategoriaErro.AUTENTICACAO))
+        
+        try:
+            # Criando a parte para a imagem em bytes
+            from google.genai.types import Part
+            imagem_part = Part.from_bytes(data=imagem_bytes, mime_type=mime_type)
             
             # Enviando a requisição para a API usando o SDK
-            response = self.cliente.models.generate_content(
-                model=self.modelo,
-                contents=[prompt, imagem]
-            )
+            with medir_etapa('requisicao', self.provedor, bytes_enviados=len(imagem_bytes)) as medicao:
+                response = self.cliente.models.generate_content(
+                    model=self.modelo_nivel(nivel),
+                    contents=[prompt, imagem_part],
+                    config=self._configuracao_requisicao(prazo, nivel)
+                )
+                medicao['bytes_resposta'] = len((response.text or '').encode('utf-8'))
             
             # Verificando a resposta
             if response.text:
                 return Success(DescricaoImagem(response.text))
             else:
-                return Failure(ErroIA('Resposta vazia da API Gemini'))
+                return Failure(self._erro_resposta_vazia(response))
                 
         except Exception as e:
-            return Failure(ErroIA(f'Erro ao descrever imagem com Gemini: {str(e)}'))
+            return Failure(classificar_excecao(e, 'Erro ao descrever imagem com Gemini'))
     
-    def descrever_imagem_bytes(self, imagem_bytes: bytes, mime_type: str) -> Result[DescricaoImagem, ErroIA]:
-        """Descreve uma imagem a partir de bytes usando o Google Gemini."""
+    def gerar_texto(self, instrucao: str, prazo: Optional[Prazo] = None, nivel: NivelDetalhe = NivelDetalhe.DETALHADO) -> Result[str, ErroIA]:
+        """Gera texto sem imagem, como a junção de descrições parciais."""
         if not self.chave_api or not self.cliente:
-            return Failure(ErroIA('Chave API do Gemini não configurada ou cliente não inicializado'))
+            return Failure(ErroIA('Chave API do Gemini não configurada ou cliente não inicializado', CategoriaErro.AUTENTICACAO))
         
         try:
-            # Construindo o prompt para descrição detalhada
-            prompt = "Descreva detalhadamente esta imagem para uma pessoa com deficiência visual."
+            with medir_etapa('requisicao_texto', self.provedor, bytes_enviados=len(instrucao.encode('utf-8'))) as medicao:
+                response = self.cliente.models.generate_content(
+                    model=self.modelo_texto,
+                    contents=[instrucao],
+                    config=self._configuracao_requisicao(prazo, nivel)
+                )
+                medicao['bytes_resposta'] = len((response.text or '').encode('utf-8'))
             
-            # Criando a parte para a imagem em bytes
+            if response.text:
+                return Success(response.text)
+            return Failure(self._erro_resposta_vazia(response))
+        except Exception as e:
+            return Failure(classificar_excecao(e, 'Erro ao gerar texto com Gemini'))
+    
+    def descrever_imagem_bytes_stream(self, imagem_bytes: bytes, mime_type: str, prazo: Optional[Prazo] = None, nivel: NivelDetalhe = NivelDetalhe.DETALHADO, resumo: Optional[bytes] = None) -> Result[Iterator[str], ErroIA]:
+        """Descreve uma imagem a partir de bytes, entregando o texto à medida que é gerado."""
+        if not self.chave_api or not self.cliente:
+            return Failure(ErroIA('Chave API do Gemini não configurada ou cliente não inicializado', CategoriaErro.AUTENTICACAO))
+        
+        try:
+            from google.genai.types import Part
             imagem_part = Part.from_bytes(data=imagem_bytes, mime_type=mime_type)
             
-            # Enviando a requisição para a API usando o SDK
-            response = self.cliente.models.generate_content(
-                model=self.modelo,
-                contents=[prompt, imagem_part]
+            # A requisição só é enviada quando o primeiro fragmento é consumido
+            fluxo = self.cliente.models.generate_content_stream(
+                model=self.modelo_nivel(nivel),
+                contents=[instrucao_nivel(nivel), imagem_part],
+                config=self._configuracao_requisicao(prazo, nivel)
             )
-            
-            # Verificando a resposta
-            if response.text:
-                return Success(DescricaoImagem(response.text))
-            else:
-                return Failure(ErroIA('Resposta vazia da API Gemini'))
-                
+            return Success(self._extrair_texto_fluxo(fluxo, len(imagem_bytes)))
         except Exception as e:
-            return Failure(ErroIA(f'Erro ao descrever imagem com Gemini: {str(e)}'))
\ No newline at end of file
+            return Failure(classificar_excecao(e, 'Erro ao descrever imagem com Gemini'))
+    
+    def _extrair_texto_fluxo(self, fluxo, bytes_enviados: int) -> Iterator[str]:
+        """Extrai o texto de cada resposta parcial; fechar o iterador encerra a conexão."""
+        try:
+            with medir_etapa('geracao_fluxo', self.provedor, bytes_enviados=bytes_enviados, bytes_resposta=0) as medicao:
+                inicio = time.perf_counter()
+                for resposta in fluxo:
+                    if resposta.text:
+                        if not medicao['bytes_resposta']:
+                            medicao['primeiro_fragmento_ms'] = round((time.perf_counter() - inicio) * 1000, 1)
+                        medicao['bytes_resposta'] += len(resposta.text.encode('utf-8'))
+                        yield resposta.text
+        finally:
+            fechar = getattr(fluxo, 'close', None)
+            if fechar is not None:
+                fechar()
\ No newline at end of file
@@ -0,0 +1,251 @@
+# adaptadores/adaptador_local.py
+from typing import Any, Dict, List, Optional, Tuple
+from returns.result import Result, Success, Failure
+from concurrent.futures import Future, TimeoutError as TempoEsgotado
+import io
+import os
+import json
+import queue
+import threading
+
+from entidades import CaminhoImagem, CategoriaErro, DescricaoImagem, ErroIA, NivelDetalhe, ProvedorIA
+from servico_ia import ServicoIA
+from prazo import Prazo
+from metricas import medir_etapa
+from prompts import max_tokens_saida
+
+# Modelo local exportado para ONNX no formato do Optimum (codificador de
+# visão + decodificador de texto), por exemplo um ViT-GPT2 quantizado. Não
+# vem com o complemento: os arquivos vão nesta pasta, e numpy, onnxruntime e
+# tokenizers precisam estar instalados onde o NVDA os encontre
+DIRETORIO_MODELO_LOCAL = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'modelo_local')
+ARQUIVOS_MODELO = ('encoder_model.onnx', 'decoder_model.onnx', 'tokenizer.json')
+
+# Imagens reunidas numa mesma inferência e tempo máximo de espera por elas
+MAX_LOTE = 4
+JANELA_LOTE = 0.02
+# Tempo de espera pelo modelo quando o pedido não tem prazo
+TIMEOUT_PADRAO = 30.0
+
+class _ModeloLocal:
+    """Sessões ONNX, tokenizador e parâmetros de preprocessamento do modelo."""
+
+    def __init__(self, diretorio: str):
+        # Dependências pesadas só são importadas quando o modelo é carregado
+        import numpy
+        import onnxruntime
+        from tokenizers import Tokenizer
+
+        self.np = numpy
+        opcoes = onnxruntime.SessionOptions()
+        opcoes.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        # Metade dos núcleos, para o NVDA continuar responsivo durante a inferência
+        opcoes.intra_op_num_threads = max(1, (os.cpu_count() or 2) // 2)
+        provedores = ['CPUExecutionProvider']
+        self.codificador = onnxruntime.InferenceSession(
+            os.path.join(diretorio, 'encoder_model.onnx'), opcoes, providers=provedores
+        )
+        self.decodificador = onnxruntime.InferenceSession(
+            os.path.join(diretorio, 'decoder_model.onnx'), opcoes, providers=provedores
+        )
+        self.tokenizador = Tokenizer.from_file(os.path.join(diretorio, 'tokenizer.json'))
+
+        configuracao = self._ler_json(diretorio, 'config.json')
+        self.token_inicial = configuracao.get('decoder_start_token_id') or 50256
+        self.token_final = configuracao.get('eos_token_id') or 50256
+
+        preprocessador = self._ler_json(diretorio, 'preprocessor_config.json')
+        tamanho = preprocessador.get('size', 224)
+        if isinstance(tamanho, dict):
+            tamanho = (tamanho.get('width', 224), tamanho.get('height', 224))
+        else:
+            tamanho = (tamanho, tamanho)
+        self.tamanho: Tuple[int, int] = tamanho
+        self.media = numpy.array(preprocessador.get('image_mean', [0.5] * 3), dtype=numpy.float32)
+        self.desvio = numpy.array(preprocessador.get('image_std', [0.5] * 3), dtype=numpy.float32)
+
+    @staticmethod
+    def _ler_json(diretorio: str, nome: str) -> Dict[str, Any]:
+        try:
+            with open(os.path.join(diretorio, nome), 'r', encoding='utf-8') as arquivo:
+                return json.load(arquivo)
+        except (OSError, ValueError):
+            return {}
+
+    def preparar(self, imagem_bytes: bytes):
+        """Converte a imagem no tensor CHW normalizado de entrada do codificador."""
+        from PIL import Image
+
+        np = self.np
+        with Image.open(io.BytesIO(imagem_bytes)) as original:
+            # Em JPEGs, decodifica direto numa escala próxima da de entrada
+            original.draft('RGB', self.tamanho)
+            imagem = original.convert('RGB').resize(self.tamanho, Image.BILINEAR)
+        pixels = np.asarray(imagem, dtype=np.float32) / 255.0
+        return ((pixels - self.media) / self.desvio).transpose(2, 0, 1)
+
+    def descrever_lote(self, tensores: List[Any], limites: List[int]) -> List[str]:
+        """
+        Gera as descrições de várias imagens numa única inferência, por busca
+        gulosa; cada sequência para no limite de tokens do seu pedido.
+        """
+        np = self.np
+        estados = self.codificador.run(None, {'pixel_values': np.stack(tensores)})[0]
+
+        quantidade = len(tensores)
+        tokens = np.full((quantidade, 1), self.token_inicial, dtype=np.int64)
+        terminadas = np.zeros(quantidade, dtype=bool)
+        limites = np.array(limites)
+        for passo in range(int(limites.max())):
+            logits = self.decodificador.run(None, {
+                'input_ids': tokens,
+                'encoder_hidden_states': estados,
+            })[0]
+            proximos = logits[:, -1, :].argmax(axis=-1)
+            # Sequências já terminadas continuam recebendo o token final
+            proximos = np.where(terminadas, self.token_final, proximos)
+            tokens = np.concatenate([tokens, proximos[:, None].astype(np.int64)], axis=1)
+            terminadas |= (proximos == self.token_final) | (limites <= passo + 1)
+            if terminadas.all():
+                break
+
+        return [
+            self.tokenizador.decode(
+                [int(token) for token in sequencia[1:] if token != self.token_final],
+                skip_special_tokens=True
+            ).strip()
+            for sequencia in tokens
+        ]
+
+class AdaptadorLocal(ServicoIA):
+    """
+    Adaptador para um modelo de descrição que roda na CPU, sem rede.
+    O modelo é carregado uma vez e mantido na memória; pedidos simultâneos
+    (como os da descrição em lote) são reunidos numa mesma inferência.
+    """
+
+    provedor = ProvedorIA.LOCAL
+    # O próprio adaptador reduz a imagem ao tamanho de entrada do modelo
+    perfil_imagem = None
+
+    def __init__(self, diretorio: str = DIRETORIO_MODELO_LOCAL):
+        self.diretorio = diretorio
+        self.modelo = os.path.basename(os.path.normpath(diretorio))
+        self._modelo: Optional[_ModeloLocal] = None
+        self._erro_carregamento: Optional[str] = None
+        self._trava_modelo = threading.Lock()
+        self._trava_trabalhador = threading.Lock()
+        # (tensor, limite de tokens, futuro) de cada pedido
+        self._fila: 'queue.Queue[Tuple[Any, int, Future]]' = queue.Queue()
+        self._trabalhador: Optional[threading.Thread] = None
+
+    @staticmethod
+    def disponivel(diretorio: str = DIRETORIO_MODELO_LOCAL) -> bool:
+        """Indica se os arquivos do modelo estão instalados, sem carregá-lo."""
+        return all(os.path.isfile(os.path.join(diretorio, nome)) for nome in ARQUIVOS_MODELO)
+
+    def aquecer(self) -> None:
+        """Carrega o modelo em segundo plano, para que o primeiro pedido não espere por ele."""
+        threading.Thread(target=self._obter_modelo, name='Camille-modelo-local', daemon=True).start()
+
+    def _obter_modelo(self, espera: Optional[float] = None) -> Optional[_ModeloLocal]:
+        """Modelo carregado; None se falhou ou se o carregamento não terminou dentro da espera."""
+        if self._modelo is None and self._erro_carregamento is None:
+            if not self._trava_modelo.acquire(timeout=-1 if espera is None else espera):
+                return None
+            try:
+                if self._modelo is None and self._erro_carregamento is None:
+                    with medir_etapa('carregamento_modelo', self.provedor):
+                        self._modelo = _ModeloLocal(self.diretorio)
+            except Exception as e:
+                self._erro_carregamento = str(e)
+            finally:
+                self._trava_modelo.release()
+        return self._modelo
+
+    def descrever_imagem(
+        self,
+        caminho_imagem: CaminhoImagem,
+        prazo: Optional[Prazo] = None,
+        nivel: NivelDetalhe = NivelDetalhe.DETALHADO
+    ) -> Result[DescricaoImagem, ErroIA]:
+        """Descreve uma imagem local com o modelo local."""
+        try:
+            with medir_etapa('leitura', self.provedor):
+                with open(caminho_imagem, 'rb') as arquivo:
+                    imagem_bytes = arquivo.read()
+        except OSError as e:
+            return Failure(ErroIA(f'Erro ao ler imagem para o modelo local: {str(e)}', CategoriaErro.ENTRADA_INVALIDA))
+        return self.descrever_imagem_bytes(imagem_bytes, '', prazo, nivel)
+
+    def descrever_imagem_bytes(
+        self,
+        imagem_bytes: bytes,
+        mime_type: str,
+        prazo: Optional[Prazo] = None,
+        nivel: NivelDetalhe = NivelDetalhe.DETALHADO,
+        resumo: Optional[bytes] = None
+    ) -> Result[DescricaoImagem, ErroIA]:
+        """Descreve uma imagem a partir de bytes com o modelo local."""
+        modelo = self._obter_modelo(prazo.restante if prazo is not None else None)
+        if modelo is None:
+            if self._erro_carregamento is None:
+                return Failure(ErroIA('Modelo local ainda carregando', CategoriaErro.TRANSITORIO))
+            return Failure(ErroIA(f'Modelo local indisponível: {self._erro_carregamento}'))
+
+        try:
+            # O preprocessamento roda na thread do pedido; só a inferência é serializada
+            with medir_etapa('codificacao', self.provedor, bytes_enviados=len(imagem_bytes)):
+                tensor = modelo.preparar(imagem_bytes)
+        except Exception as e:
+            return Failure(ErroIA(f'Erro ao preparar imagem para o modelo local: {str(e)}', CategoriaErro.ENTRADA_INVALIDA))
+
+        futuro: Future = Future()
+        self._fila.put((tensor, max_tokens_saida(self.provedor, nivel), futuro))
+        self._garantir_trabalhador()
+        try:
+            texto = futuro.result(timeout=prazo.restante if prazo is not None else TIMEOUT_PADRAO)
+        except TempoEsgotado:
+            futuro.cancel()
+            return Failure(ErroIA('Tempo esgotado aguardando o modelo local', CategoriaErro.TEMPO_ESGOTADO))
+        except Exception as e:
+            return Failure(ErroIA(f'Erro ao descrever imagem com o modelo local: {str(e)}'))
+
+        if not texto:
+            return Failure(ErroIA('Resposta vazia do modelo local'))
+        return Success(DescricaoImagem(texto))
+
+    def _garantir_trabalhador(self) -> None:
+        with self._trava_trabalhador:
+            if self._trabalhador is None:
+                self._trabalhador = threading.Thread(
+                    target=self._processar_fila, name='Camille-inferencia-local', daemon=True
+                )
+                self._trabalhador.start()
+
+    def _processar_fila(self) -> None:
+        """Reúne os pedidos que chegam dentro da janela do lote e os descreve juntos."""
+        while True:
+            pedidos = [self._fila.get()]
+            while len(pedidos) < MAX_LOTE:
+                try:
+                    pedidos.append(self._fila.get(timeout=JANELA_LOTE))
+                except queue.Empty:
+                    break
+
+            # Pedidos que desistiram por falta de prazo não entram na inferência
+            pedidos = [pedido for pedido in pedidos if pedido[2].set_running_or_notify_cancel()]
+            if not pedidos:
+                continue
+            try:
+                with medir_etapa('inferencia', self.provedor, lote=len(pedidos)):
+                    textos = self._modelo.descrever_lote(
+                        [tensor for tensor, _, _ in pedidos],
+                        [limite for _, limite, _ in pedidos]
+                    )
+            except Exception as e:
+                for _, _, futuro in pedidos:
+                    futuro.set_exception(e)
+                continue
+            for (_, _, futuro), texto in zip(pedidos, textos):
+                futuro.set_result(texto)
@@ -1,92 +1,169 @@
 # adaptadores/adaptador_mistral.py
-import base64
-from typing import Dict, Any, Optional, Union
+from typing import Dict, Any, Iterator, Optional, Union
 from returns.result import Result, Success, Failure
-import os
 import re
-from PIL import Image
+import time
 
-# Importando o SDK do Mistral
-from mistralai import Mistral
-
-from entidades import CaminhoImagem, DescricaoImagem, ErroIA, ProvedorIA
+from entidades import (
+    CaminhoImagem, CategoriaErro, DescricaoImagem, ErroIA, ProvedorIA,
+    PerfilImagem, LimiteTaxa, NivelDetalhe
+)
 from servico_ia import ServicoIA
+from tratador_erros import classificar_excecao
+from clientes_sdk import GerenciadorClientes
+from prompts import instrucao_bloco, instrucao_nivel, max_tokens_saida
+from prazo import Prazo
+from metricas import medir_etapa
+from formato_imagem import codificar_data_url, tipo_mime
 
 class AdaptadorMistral(ServicoIA):
     """Adaptador para o serviço de IA do Mistral AI com suporte a imagens locais e URLs."""
     
     provedor = ProvedorIA.MISTRAL
+    # O Pixtral reamostra as imagens para no máximo 1024x1024 pixels
+    perfil_imagem = PerfilImagem(lado_maximo=1024, formato='JPEG', qualidade=85)
+    # A API do Mistral limita o nível gratuito a uma requisição por segundo
+    limite_taxa = LimiteTaxa(requisicoes_por_minuto=60, rajada=2)
+    # Endereço aberto antecipadamente para aquecer a conexão
+    url_api = 'https://api.mistral.ai/'
     
-    def __init__(self, chave_api: str):
-        """Inicializa o adaptador com a chave API."""
+    def __init__(self, chave_api: str, clientes: Optional[GerenciadorClientes] = None):
+        """Inicializa o adaptador com a chave API e o gerenciador de clientes compartilhado."""
         self.chave_api = chave_api
+        self.clientes = clientes or GerenciadorClientes()
         self.modelo = "pixtral-12b-2409"  # Modelo com suporte a visão
-        self.cliente = None
+        # Modelo mais barato para as chamadas só de texto
+        self.modelo_texto = "mistral-small-latest"
+        # Modelo rápido, também com visão, para o texto alternativo
+        self.modelo_rapido = "mistral-small-latest"
+    
+    def modelo_nivel(self, nivel: NivelDetalhe) -> str:
+        """Modelo que descreve a imagem no nível pedido: o rápido para o texto alternativo."""
+        return self.modelo_rapido if nivel == NivelDetalhe.TEXTO_ALTERNATIVO else self.modelo
+    
+    @property
+    def cliente(self):
+        """Cliente do SDK, mantido pelo gerenciador enquanto a chave não mudar."""
+        return self.clientes.obter(self.provedor, self.chave_api, self._criar_cliente)
+    
+    @staticmethod
+    def _criar_cliente(chave_api: str, http):
+        """
+        Cria o cliente Mistral sobre o cliente HTTP compartilhado. O SDK só é
+        importado aqui, para não pesar na inicialização do NVDA.
+        """
+        from mistralai import Mistral
         
+        return Mistral(api_key=chave_api, client=http)
+    
+    def aquecer(self) -> None:
+        """Cria o cliente e abre a conexão com a API em segundo plano."""
         if self.chave_api:
-            try:
-                # Inicializa o cliente Mistral com a chave API
-                self.cliente = Mistral(api_key=self.chave_api)
-            except Exception:
-                self.cliente = None
-    
-    def _codificar_imagem(self, caminho_imagem: str) -> Optional[str]:
-        """Codifica a imagem para base64."""
+            self.clientes.aquecer(self.provedor, self.chave_api, self._criar_cliente, self.url_api)
+    
+    def _ler_imagem(self, caminho_imagem: str) -> Optional[bytes]:
+        """Lê os bytes da imagem local."""
         try:
-            with open(caminho_imagem, "rb") as arquivo_imagem:
-                return base64.b64encode(arquivo_imagem.read()).decode('utf-8')
+            with medir_etapa('leitura', self.provedor):
+                with open(caminho_imagem, "rb") as arquivo_imagem:
+                    return arquivo_imagem.read()
         except FileNotFoundError:
             return None
         except Exception:
             return None
     
+    def _codificar_bytes(self, imagem_bytes: bytes, mime_type: str) -> str:
+        """Data URL em base64 da imagem, codificada a cada envio."""
+        with medir_etapa('codificacao', self.provedor):
+            return codificar_data_url(imagem_bytes, mime_type)
+    
+    def _enviar(
+        self,
+        mensagens,
+        prazo: Optional[Prazo],
+        nivel: NivelDetalhe,
+        modelo: Optional[str] = None,
+        etapa: str = 'requisicao'
+    ):
+        """
+        Envia a conversa ao modelo, com a resposta limitada ao orçamento de
+        tokens do nível, medindo o tamanho enviado e o da resposta.
+        """
+        bytes_enviados = sum(
+            len(parte.get('text', '')) + len(parte.get('image_url', ''))
+            for mensagem in mensagens for parte in mensagem['content']
+        )
+        with medir_etapa(etapa, self.provedor, bytes_enviados=bytes_enviados) as medicao:
+            chat_response = self.cliente.chat.complete(
+                model=modelo or self.modelo_nivel(nivel),
+                messages=mensagens,
+                max_tokens=max_tokens_saida(self.provedor, nivel),
+                timeout_ms=self._timeout_ms(prazo)
+            )
+            if chat_response and chat_response.choices:
+                medicao['bytes_resposta'] = len((chat_response.choices[0].message.content or '').encode('utf-8'))
+            return chat_response
+    
+    def _timeout_ms(self, prazo: Optional[Prazo]) -> Optional[int]:
+        """Converte o tempo restante do prazo no timeout HTTP do SDK."""
+        return prazo.milissegundos_restantes if prazo is not None else None
+    
     def _eh_url_web(self, caminho: str) -> bool:
         """Verifica se o caminho é uma URL web."""
         return caminho.startswith(('http://', 'https://'))
     
-    def descrever_imagem(self, caminho_imagem: CaminhoImagem) -> Result[DescricaoImagem, ErroIA]:
+    def descrever_imagem(self, caminho_imagem: CaminhoImagem, prazo: Optional[Prazo] = None, nivel: NivelDetalhe = NivelDetalhe.DETALHADO) -> Result[DescricaoImagem, ErroIA]:
         """
         Descreve uma imagem usando o Mistral AI.
         Funciona com caminhos locais ou URLs da web.
         """
         if not self.chave_api or not self.cliente:
-            return Failure(ErroIA('Chave API do Mistral não configurada ou cliente não inicializado'))
+            return Failure(ErroIA('Chave API do Mistral não configurada ou cliente não inicializado', CategoriaErro.AUTENTICACAO))
         
         try:
             # Verifica se é uma URL web ou um caminho local
             if self._eh_url_web(caminho_imagem):
-                return self.descrever_imagem_url(caminho_imagem)
+                return self.descrever_imagem_url(caminho_imagem, prazo, nivel)
             
             # Processamento para arquivo local
-            base64_imagem = self._codificar_imagem(caminho_imagem)
-            if not base64_imagem:
-                return Failure(ErroIA(f'Não foi possível ler ou codificar a imagem: {caminho_imagem}'))
-            
-            # Obtendo o tipo MIME da imagem
-            mime_type = self._obter_mime_type(caminho_imagem)
+            imagem_bytes = self._ler_imagem(caminho_imagem)
+            if not imagem_bytes:
+                return Failure(ErroIA(f'Não foi possível ler ou codificar a imagem: {caminho_imagem}', CategoriaErro.ENTRADA_INVALIDA))
             
-            # Criando a mensagem para o Mistral com data URL
+            # Os bytes lidos seguem o mesmo caminho das imagens já carregadas
+            return self.descrever_imagem_bytes(imagem_bytes, tipo_mime(imagem_bytes), prazo, nivel)
+                
+        except Exception as e:
+            return Failure(classificar_excecao(e, 'Erro ao descrever imagem com Mistral'))
+    
+    def descrever_imagem_url(self, url_imagem: str, prazo: Optional[Prazo] = None, nivel: NivelDetalhe = NivelDetalhe.DETALHADO) -> Result[DescricaoImagem, ErroIA]:
+        """Descreve uma imagem a partir de uma URL web usando o Mistral AI."""
+        if not self.chave_api or not self.cliente:
+            return Failure(ErroIA('Chave API do Mistral não configurada ou cliente não inicializado', CategoriaErro.AUTENTICACAO))
+        
+        if not self._eh_url_web(url_imagem):
+            return Failure(ErroIA('URL inválida. Deve começar com http:// ou https://', CategoriaErro.ENTRADA_INVALIDA))
+        
+        try:
+            # Criando a mensagem para o Mistral com URL direta
             mensagens = [
                 {
                     "role": "user",
                     "content": [
                         {
                             "type": "text",
-                            "text": "Descreva detalhadamente esta imagem para uma pessoa com deficiência visual."
+                            "text": instrucao_nivel(nivel)
                         },
                         {
                             "type": "image_url",
-                            "image_url": f"data:{mime_type};base64,{base64_imagem}"
+                            "image_url": url_imagem
                         }
                     ]
                 }
             ]
             
             # Enviando a requisição para a API usando o SDK
-            chat_response = self.cliente.chat.complete(
-                model=self.modelo,
-                messages=mensagens
-            )
+            chat_response = self._enviar(mensagens, prazo, nivel)
             
             # Extraindo a resposta
             if chat_response and chat_response.choices and len(chat_response.choices) > 0:
@@ -96,39 +173,43 @@ class AdaptadorMistral(ServicoIA):
                 return Failure(ErroIA('Resposta vazia da API Mistral'))
                 
         except Exception as e:
-            return Failure(ErroIA(f'Erro ao descrever imagem com Mistral: {str(e)}'))
+            return Failure(classificar_excecao(e, 'Erro ao descrever imagem com URL usando Mistral'))
     
-    def descrever_imagem_url(self, url_imagem: str) -> Result[DescricaoImagem, ErroIA]:
-        """Descreve uma imagem a partir de uma URL web usando o Mistral AI."""
+    def descrever_imagem_bytes(self, imagem_bytes: bytes, mime_type: str, prazo: Optional[Prazo] = None, nivel: NivelDetalhe = NivelDetalhe.DETALHADO, resumo: Optional[bytes] = None) -> Result[DescricaoImagem, ErroIA]:
+        """Descreve uma imagem a partir de bytes usando o Mistral AI."""
+        return self._descrever_bytes(imagem_bytes, mime_type, instrucao_nivel(nivel), prazo, nivel)
+    
+    def descrever_bloco_bytes(self, imagem_bytes: bytes, mime_type: str, indice: int, total: int, prazo: Optional[Prazo] = None, nivel: NivelDetalhe = NivelDetalhe.DETALHADO, resumo: Optional[bytes] = None) -> Result[DescricaoImagem, ErroIA]:
+        """Descreve um bloco de uma imagem dividida, informando qual parte ele é."""
+        return self._descrever_bytes(imagem_bytes, mime_type, instrucao_bloco(nivel, indice, total), prazo, nivel)
+    
+    def _descrever_bytes(self, imagem_bytes: bytes, mime_type: str, instrucao: str, prazo: Optional[Prazo], nivel: NivelDetalhe) -> Result[DescricaoImagem, ErroIA]:
         if not self.chave_api or not self.cliente:
-            return Failure(ErroIA('Chave API do Mistral não configurada ou cliente não inicializado'))
-        
-        if not self._eh_url_web(url_imagem):
-            return Failure(ErroIA('URL inválida. Deve começar com http:// ou https://'))
+            return Failure(ErroIA('Chave API do Mistral não configurada ou cliente não inicializado', CategoriaErro.AUTENTICACAO))
         
         try:
-            # Criando a mensagem para o Mistral com URL direta
+            # Codificando a imagem em base64
+            data_url = self._codificar_bytes(imagem_bytes, mime_type)
+            
+            # Criando a mensagem para o Mistral
             mensagens = [
                 {
                     "role": "user",
                     "content": [
                         {
                             "type": "text",
-                            "text": "Descreva detalhadamente esta imagem para uma pessoa com deficiência visual."
+                            "text": instrucao
                         },
                         {
                             "type": "image_url",
-                            "image_url": url_imagem
+                            "image_url": data_url
                         }
                     ]
                 }
             ]
             
             # Enviando a requisição para a API usando o SDK
-            chat_response = self.cliente.chat.complete(
-                model=self.modelo,
-                messages=mensagens
-            )
+            chat_response = self._enviar(mensagens, prazo, nivel)
             
             # Extraindo a resposta
             if chat_response and chat_response.choices and len(chat_response.choices) > 0:
@@ -138,16 +219,41 @@ class AdaptadorMistral(ServicoIA):
                 return Failure(ErroIA('Resposta vazia da API Mistral'))
                 
         except Exception as e:
-            return Failure(ErroIA(f'Erro ao descrever imagem com URL usando Mistral: {str(e)}'))
+            return Failure(classificar_excecao(e, 'Erro ao descrever imagem com Mistral'))
     
-    def descrever_imagem_bytes(self, imagem_bytes: bytes, mime_type: str) -> Result[DescricaoImagem, ErroIA]:
-        """Descreve uma imagem a partir de bytes usando o Mistral AI."""
+    def gerar_texto(self, instrucao: str, prazo: Optional[Prazo] = None, nivel: NivelDetalhe = NivelDetalhe.DETALHADO) -> Result[str, ErroIA]:
+        """Gera texto sem imagem, como a junção de descrições parciais."""
         if not self.chave_api or not self.cliente:
-            return Failure(ErroIA('Chave API do Mistral não configurada ou cliente não inicializado'))
+            return Failure(ErroIA('Chave API do Mistral não configurada ou cliente não inicializado', CategoriaErro.AUTENTICACAO))
+        
+        try:
+            mensagens = [
+                {
+                    "role": "user",
+                    "content": [
+                        {
+                            "type": "text",
+                            "text": instrucao
+                        }
+                    ]
+                }
+            ]
+            chat_response = self._enviar(mensagens, prazo, nivel, self.modelo_texto, 'requisicao_texto')
+            
+            if chat_response and chat_response.choices and chat_response.choices[0].message.content:
+                return Success(chat_response.choices[0].message.content)
+            return Failure(ErroIA('Resposta vazia da API Mistral'))
+        except Exception as e:
+            return Failure(classificar_excecao(e, 'Erro ao gerar texto com Mistral'))
+    
+    def descrever_imagem_bytes_stream(self, imagem_bytes: bytes, mime_type: str, prazo: Optional[Prazo] = None, nivel: NivelDetalhe = NivelDetalhe.DETALHADO, resumo: Optional[bytes] = None) -> Result[Iterator[str], ErroIA]:
+        """Descreve uma imagem a partir de bytes, entregando o texto à medida que é gerado."""
+        if not self.chave_api or not self.cliente:
+            return Failure(ErroIA('Chave API do Mistral não configurada ou cliente não inicializado', CategoriaErro.AUTENTICACAO))
         
         try:
             # Codificando a imagem em base64
-            base64_imagem = base64.b64encode(imagem_bytes).decode('utf-8')
+            data_url = self._codificar_bytes(imagem_bytes, mime_type)
             
             # Criando a mensagem para o Mistral
             mensagens = [
@@ -156,41 +262,35 @@ class AdaptadorMistral(ServicoIA):
                     "content": [
                         {
                             "type": "text",
-                            "text": "Descreva detalhadamente esta imagem para uma pessoa com deficiência visual."
+                            "text": instrucao_nivel(nivel)
                         },
                         {
                             "type": "image_url",
-                            "image_url": f"data:{mime_type};base64,{base64_imagem}"
+                            "image_url": data_url
                         }
                     ]
                 }
             ]
             
-            # Enviando a requisição para a API usando o SDK
-            chat_response = self.cliente.chat.complete(
-                model=self.modelo,
-                messages=mensagens
+            # Abrindo o fluxo de eventos da API usando o SDK
+            fluxo = self.cliente.chat.stream(
+                model=self.modelo_nivel(nivel),
+                messages=mensagens,
+                max_tokens=max_tokens_saida(self.provedor, nivel),
+                timeout_ms=self._timeout_ms(prazo)
             )
-            
-            # Extraindo a resposta
-            if chat_response and chat_response.choices and len(chat_response.choices) > 0:
-                texto_resposta = chat_response.choices[0].message.content
-                return Success(DescricaoImagem(texto_resposta))
-            else:
-                return Failure(ErroIA('Resposta vazia da API Mistral'))
-                
+            return Success(self._extrair_texto_fluxo(fluxo, len(data_url)))
         except Exception as e:
-            return Failure(ErroIA(f'Erro ao descrever imagem com Mistral: {str(e)}'))
-    
-    def _obter_mime_type(self, caminho_imagem: str) -> str:
-        """Obtém o MIME type da imagem baseado na extensão do arquivo."""
-        extensao = os.path.splitext(caminho_imagem)[1].lower()
-        mime_types = {
-            '.jpg': 'image/jpeg',
-            '.jpeg': 'image/jpeg',
-            '.png': 'image/png',
-            '.gif': 'image/gif',
-            '.bmp': 'image/bmp',
-            '.webp': 'image/webp'
-        }
-        return mime_types.get(extensao, 'image/jpeg')
\ No newline at end of file
+            return Failure(classificar_excecao(e, 'Erro ao descrever imagem com Mistral'))
+    
+    def _extrair_texto_fluxo(self, fluxo, bytes_enviados: int) -> Iterator[str]:
+        """Extrai o texto de cada evento; fechar o iterador encerra a conexão."""
+        with fluxo, medir_etapa('geracao_fluxo', self.provedor, bytes_enviados=bytes_enviados, bytes_resposta=0) as medicao:
+            inicio = time.perf_counter()
+            for evento in fluxo:
+                escolhas = evento.data.choices
+                if escolhas and escolhas[0].delta.content:
+                    if not medicao['bytes_resposta']:
+                        medicao['primeiro_fragmento_ms'] = round((time.perf_counter() - inicio) * 1000, 1)
+                    medicao['bytes_resposta'] += len(escolhas[0].delta.content.encode('utf-8'))
+                    yield escolhas[0].delta.content
@@ -0,0 +1,19 @@
+# portas/baixador_imagens.py
+from typing import Optional, Protocol
+from returns.result import Result
+
+from prazo import Prazo
+
+def eh_url_remota(caminho: str) -> bool:
+    """Indica se o caminho da imagem é uma URL http(s)."""
+    return caminho.lower().startswith(('http://', 'https://'))
+
+class BaixadorImagens(Protocol):
+    """
+    Porta que define a interface para obter o conteúdo de imagens remotas.
+    O conteúdo baixado é entregue a todos os provedores, inclusive os que
+    não aceitam URLs.
+    """
+    def baixar(self, url: str, prazo: Optional[Prazo] = None) -> Result[bytes, str]:
+        """Retorna os bytes da imagem ou a mensagem de erro."""
+        ...
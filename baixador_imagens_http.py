@@ -0,0 +1,335 @@
+# adaptadores/baixador_imagens_http.py
+import os
+import re
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from returns.result import Result, Success, Failure
+
+from baixador_imagens import BaixadorImagens, eh_url_remota
+from prazo import Prazo
+from metricas import medir_etapa
+
+# Maior imagem aceita; o download é interrompido assim que passa disso
+MAX_BYTES_IMAGEM = 20 * 1024 * 1024
+# Espaço em disco das imagens baixadas; as acessadas há mais tempo saem primeiro
+MAX_BYTES_DISCO = 50 * 1024 * 1024
+# Imagens recentes mantidas em memória, só para os pedidos repetidos em
+# seguida, que dispensam a leitura do disco. As demais voltam do disco
+MAX_BYTES_MEMORIA = 4 * 1024 * 1024
+# Conexões do cliente HTTP, mantidas abertas entre os pedidos
+MAX_CONEXOES = 8
+MAX_CONEXOES_OCIOSAS = 4
+# Timeout, em segundos, dos downloads feitos sem prazo
+TIMEOUT_PADRAO = 10.0
+# Parte do tempo restante do pedido dada ao download; o resto fica para a descrição
+FRACAO_PRAZO_DOWNLOAD = 0.5
+# Menor tempo dado a um download, mesmo com o pedido perto do fim do prazo
+TIMEOUT_MINIMO_DOWNLOAD = 1.0
+# Downloads da mesma URL esperam um pelo outro; URLs diferentes correm em paralelo
+QUANTIDADE_TRAVAS = 16
+
+PADRAO_MAX_AGE = re.compile(r'max-age\s*=\s*(\d+)', re.IGNORECASE)
+
+def _validade(cabecalhos) -> float:
+    """Momento até o qual a cópia pode ser usada sem revalidar, pelo Cache-Control."""
+    controle = cabecalhos.get('cache-control', '').lower()
+    if 'no-cache' in controle or 'no-store' in controle:
+        return 0.0
+    encontrado = PADRAO_MAX_AGE.search(controle)
+    if encontrado is None:
+        return 0.0
+    idade = cabecalhos.get('age', '0')
+    idade = int(idade) if idade.isdigit() else 0
+    return time.time() + max(0, int(encontrado.group(1)) - idade)
+
+def _prazo_download(prazo: Optional[Prazo]) -> Prazo:
+    """
+    Prazo do download: uma parte do tempo restante do pedido, para que sobre
+    tempo para descrever a imagem, mas nunca menos que o mínimo.
+    """
+    if prazo is None:
+        return Prazo(TIMEOUT_PADRAO)
+    return Prazo(max(TIMEOUT_MINIMO_DOWNLOAD, prazo.restante * FRACAO_PRAZO_DOWNLOAD))
+
+class BaixadorImagensHTTP(BaixadorImagens):
+    """
+    Baixa imagens remotas com um cliente HTTP compartilhado, que mantém as
+    conexões abertas entre os pedidos. As imagens ficam num cache em disco
+    junto com o ETag e o Last-Modified da resposta: enquanto o Cache-Control
+    permitir, são usadas sem acessar a rede; depois disso, uma requisição
+    condicional confirma a cópia (304) sem baixá-la de novo.
+    """
+
+    def __init__(
+        self,
+        diretorio: str,
+        max_bytes_imagem: int = MAX_BYTES_IMAGEM,
+        max_bytes_disco: int = MAX_BYTES_DISCO
+    ):
+        self.diretorio = diretorio
+        self.max_bytes_imagem = max_bytes_imagem
+        self.max_bytes_disco = max_bytes_disco
+
+        self._cliente = None
+        self._trava_cliente = threading.Lock()
+        self._travas_url = [threading.Lock() for _ in range(QUANTIDADE_TRAVAS)]
+
+        self._memoria: 'OrderedDict[str, bytes]' = OrderedDict()
+        self._bytes_memoria = 0
+        # chave -> (último acesso, tamanho em bytes); carregado sob demanda
+        self._indice_disco: Optional[Dict[str, Tuple[float, int]]] = None
+        self._bytes_disco = 0
+        self._trava = threading.RLock()
+
+    @property
+    def cliente(self):
+        """
+        Cliente HTTP, criado no primeiro download. O httpx só é importado
+        aqui, para não pesar na inicialização do NVDA.
+        """
+        if self._cliente is None:
+            with self._trava_cliente:
+                if self._cliente is None:
+                    import httpx
+
+                    self._cliente = httpx.Client(
+                        limits=httpx.Limits(
+                            max_connections=MAX_CONEXOES,
+                            max_keepalive_connections=MAX_CONEXOES_OCIOSAS
+                        ),
+                        follow_redirects=True,
+                        timeout=TIMEOUT_PADRAO
+                    )
+        return self._cliente
+
+    def baixar(self, url: str, prazo: Optional[Prazo] = None) -> Result[bytes, str]:
+        """Retorna a imagem do cache, revalidada se preciso, ou baixada da rede."""
+        if not eh_url_remota(url):
+            return Failure(f'URL inválida: {url}')
+
+        chave = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        with self._travas_url[int(chave[:8], 16) % QUANTIDADE_TRAVAS]:
+            with medir_etapa('download') as medicao:
+                metadados = self._ler_metadados(chave)
+                if metadados is not None and metadados['valido_ate'] > time.time():
+                    conteudo = self._ler_conteudo(chave)
+                    if conteudo is not None:
+                        medicao['origem'] = 'cache'
+                        return Success(conteudo)
+
+                resultado = self._requisitar(url, chave, metadados, prazo, medicao)
+                medicao['sucesso'] = isinstance(resultado, Success)
+                return resultado
+
+    def fechar(self) -> None:
+        """Fecha as conexões abertas."""
+        with self._trava_cliente:
+            cliente, self._cliente = self._cliente, None
+        if cliente is not None:
+            cliente.close()
+
+    def _requisitar(
+        self,
+        url: str,
+        chave: str,
+        metadados: Optional[Dict[str, Any]],
+        prazo: Optional[Prazo],
+        medicao: Dict[str, Any]
+    ) -> Result[bytes, str]:
+        if prazo is not None and prazo.expirado:
+            return Failure('Tempo esgotado antes do download da imagem')
+
+        cabecalhos = {}
+        if metadados is not None:
+            if metadados.get('etag'):
+                cabecalhos['If-None-Match'] = metadados['etag']
+            if metadados.get('ultima_modificacao'):
+                cabecalhos['If-Modified-Since'] = metadados['ultima_modificacao']
+
+        prazo_download = _prazo_download(prazo)
+        try:
+            with self.cliente.stream(
+                'GET',
+                url,
+                headers=cabecalhos,
+                timeout=prazo_download.restante
+            ) as resposta:
+                if resposta.status_code == 304 and metadados is not None:
+                    conteudo = self._ler_conteudo(chave)
+                    if conteudo is None:
+                        return Failure('Cópia local da imagem não encontrada')
+                    self._revalidar(chave, metadados, resposta.headers)
+                    medicao['origem'] = 'revalidado'
+                    return Success(conteudo)
+
+                if resposta.status_code != 200:
+                    return Failure(f'Falha ao baixar a imagem: HTTP {resposta.status_code}')
+
+                # Recusa antes de baixar quando o servidor informa o tamanho
+                tamanho = resposta.headers.get('content-length', '')
+                if tamanho.isdigit() and int(tamanho) > self.max_bytes_imagem:
+                    return Failure(self._mensagem_tamanho_excedido())
+
+                partes = []
+                recebidos = 0
+                for parte in resposta.iter_bytes():
+                    recebidos += len(parte)
+                    if recebidos > self.max_bytes_imagem:
+                        return Failure(self._mensagem_tamanho_excedido())
+                    if prazo_download.expirado:
+                        return Failure('Tempo esgotado durante o download da imagem')
+                    partes.append(parte)
+
+                conteudo = b''.join(partes)
+                medicao['bytes_resposta'] = recebidos
+                medicao['origem'] = 'rede'
+                self._guardar(chave, url, conteudo, resposta.headers)
+                return Success(conteudo)
+        except Exception as e:
+            return Failure(f'Erro ao baixar a imagem: {str(e)}')
+
+    def _mensagem_tamanho_excedido(self) -> str:
+        return f'Imagem maior que o limite de {self.max_bytes_imagem // (1024 * 1024)} MB'
+
+    def _caminho(self, chave: str, extensao: str) -> str:
+        return os.path.join(self.diretorio, f'{chave}.{extensao}')
+
+    def _obter_indice_disco(self) -> Dict[str, Tuple[float, int]]:
+        """Varre o diretório na primeira utilização."""
+        if self._indice_disco is None:
+            self._indice_disco = {}
+            self._bytes_disco = 0
+            try:
+                with os.scandir(self.diretorio) as entradas:
+                    for entrada in entradas:
+                        if entrada.is_file() and entrada.name.endswith('.img'):
+                            estado = entrada.stat()
+                            self._indice_disco[entrada.name[:-4]] = (estado.st_mtime, estado.st_size)
+                            self._bytes_disco += estado.st_size
+            except OSError:
+                pass
+        return self._indice_disco
+
+    def _ler_metadados(self, chave: str) -> Optional[Dict[str, Any]]:
+        """Metadados da cópia em disco; None se não houver cópia."""
+        with self._trava:
+            if chave not in self._memoria and chave not in self._obter_indice_disco():
+                return None
+            try:
+                with open(self._caminho(chave, 'json'), 'r', encoding='utf-8') as arquivo:
+                    return json.load(arquivo)
+            except Exception:
+                return None
+
+    def _ler_conteudo(self, chave: str) -> Optional[bytes]:
+        with self._trava:
+            conteudo = self._memoria.get(chave)
+            if conteudo is not None:
+                self._memoria.move_to_end(chave)
+                return conteudo
+
+            if chave not in self._obter_indice_disco():
+                return None
+            caminho = self._caminho(chave, 'img')
+            try:
+                with open(caminho, 'rb') as arquivo:
+                    conteudo = arquivo.read()
+                # O mtime registra o último acesso, usado para liberar espaço
+                os.utime(caminho)
+            except OSError:
+                self._remover_disco(chave)
+                return None
+
+            self._indice_disco[chave] = (time.time(), len(conteudo))
+            self._guardar_memoria(chave, conteudo)
+            return conteudo
+
+    def _guardar(self, chave: str, url: str, conteudo: bytes, cabecalhos) -> None:
+        with self._trava:
+            self._guardar_memoria(chave, conteudo)
+            # no-store proíbe guardar a resposta em disco
+            if 'no-store' in cabecalhos.get('cache-control', '').lower():
+                self._remover_disco(chave)
+                return
+
+            metadados = {
+                'url': url,
+                'etag': cabecalhos.get('etag'),
+                'ultima_modificacao': cabecalhos.get('last-modified'),
+                'valido_ate': _validade(cabecalhos),
+            }
+            try:
+                os.makedirs(self.diretorio, exist_ok=True)
+                self._escrever_atomico(self._caminho(chave, 'img'), conteudo)
+                self._escrever_metadados(chave, metadados)
+            except OSError:
+                self._remover_disco(chave)
+                return
+
+            indice = self._obter_indice_disco()
+            anterior = indice.get(chave)
+            if anterior is not None:
+                self._bytes_disco -= anterior[1]
+            indice[chave] = (time.time(), len(conteudo))
+            self._bytes_disco += len(conteudo)
+            self._limitar_disco()
+
+    def _revalidar(self, chave: str, metadados: Dict[str, Any], cabecalhos) -> None:
+        """Renova a validade após um 304; o servidor pode enviar um novo ETag."""
+        with self._trava:
+            metadados = dict(metadados)
+            metadados['valido_ate'] = _validade(cabecalhos)
+            if cabecalhos.get('etag'):
+                metadados['etag'] = cabecalhos['etag']
+            try:
+                self._escrever_metadados(chave, metadados)
+            except OSError:
+                pass
+
+    def _escrever_metadados(self, chave: str, metadados: Dict[str, Any]) -> None:
+        self._escrever_atomico(
+            self._caminho(chave, 'json'),
+            json.dumps(metadados, ensure_ascii=False).encode('utf-8')
+        )
+
+    @staticmethod
+    def _escrever_atomico(caminho: str, dados: bytes) -> None:
+        """Grava num arquivo temporário e o renomeia, para nunca deixar arquivo pela metade."""
+        temporario = f'{caminho}.tmp'
+        with open(temporario, 'wb') as arquivo:
+            arquivo.write(dados)
+        os.replace(temporario, caminho)
+
+    def _guardar_memoria(self, chave: str, conteudo: bytes) -> None:
+        anterior = self._memoria.pop(chave, None)
+        if anterior is not None:
+            self._bytes_memoria -= len(anterior)
+        self._memoria[chave] = conteudo
+        self._bytes_memoria += len(conteudo)
+        while self._bytes_memoria > MAX_BYTES_MEMORIA and len(self._memoria) > 1:
+            _, removido = self._memoria.popitem(last=False)
+            self._bytes_memoria -= len(removido)
+
+    def _remover_disco(self, chave: str) -> None:
+        indice = self._obter_indice_disco()
+        entrada = indice.pop(chave, None)
+        if entrada is not None:
+            self._bytes_disco -= entrada[1]
+        for extensao in ('img', 'json'):
+            try:
+                os.remove(self._caminho(chave, extensao))
+            except OSError:
+                pass
+
+    def _limitar_disco(self) -> None:
+        """Remove as imagens acessadas há mais tempo até caber no limite."""
+        if self._bytes_disco <= self.max_bytes_disco:
+            return
+        for chave, _ in sorted(self._indice_disco.items(), key=lambda item: item[1][0]):
+            if self._bytes_disco <= self.max_bytes_disco:
+                break
+            self._remover_disco(chave)
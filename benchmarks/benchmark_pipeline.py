@@ -0,0 +1,443 @@
+# benchmarks/benchmark_pipeline.py
+"""
+Mede o custo do próprio complemento por pedido de descrição, sem rede:
+os provedores são substituídos por serviços falsos com latência e taxa de
+falha configuráveis. Cada etapa é medida em imagens de ícone a captura 8K;
+o tempo é a mediana das repetições e a memória é o pico do tracemalloc
+(alocações do Python; buffers internos do Pillow não entram na conta).
+
+Cada execução é comparada com a última gravada em
+benchmarks/resultados.jsonl, para evidenciar regressões. O resultado só é
+acrescentado a esse arquivo com --salvar; ele é local e não vai para o
+repositório.
+
+A importação do complemento é medida num interpretador novo a cada
+repetição, com os módulos do NVDA simulados; se ela carregar algum módulo
+pesado, o benchmark termina com código de saída 1. Com
+--verificar-importacao, só essa verificação é feita. A mesma verificação
+roda com os testes, em tests/test_importacao.py.
+
+Uso:
+    python benchmarks/benchmark_pipeline.py [--repeticoes 5] [--latencia 0]
+        [--taxa-falha 0] [--tamanhos icone,1080p] [--salvar]
+        [--verificar-importacao]
+"""
+import os
+import sys
+import json
+import time
+import base64
+import random
+import argparse
+import platform
+import tempfile
+import statistics
+import subprocess
+import tracemalloc
+from typing import Callable, Dict, Iterator, Optional
+
+DIRETORIO_COMPLEMENTO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, DIRETORIO_COMPLEMENTO)
+
+from returns.result import Result, Success, Failure
+
+from entidades import CaminhoImagem, DescricaoImagem, ErroIA, ModoFallback, NivelDetalhe, ProvedorIA, RegiaoTela
+from casos_uso import (
+    validar_imagem, gerar_descricao_imagem, gerar_descricao_imagem_em_fluxo,
+    gerar_descricao_imagem_bytes
+)
+from preprocessamento_imagem import preprocessar_imagem, _memoria_preprocessamento
+from cache_descricoes import CacheDescricoes, ServicoIAComCache
+from hash_perceptual import calcular_dhash
+from formato_imagem import codificar_data_url
+from adaptador_gemini import AdaptadorGemini
+from adaptador_mistral import AdaptadorMistral
+from executor_descricoes import ExecutorDescricoes
+from prazo import Prazo
+
+ARQUIVO_RESULTADOS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'resultados.jsonl')
+
+# Razão de tempo, em relação à execução anterior, a partir da qual a etapa é destacada
+LIMIAR_REGRESSAO = 1.2
+
+# Largura e altura de cada tamanho de imagem medido
+TAMANHOS_IMAGEM = {
+    'icone': (32, 32),
+    'miniatura': (256, 256),
+    '1080p': (1920, 1080),
+    '4k': (3840, 2160),
+    '8k': (7680, 4320),
+    # Captura de página inteira, dividida em blocos pelos serviços com perfil
+    'pagina_longa': (1920, 16000),
+}
+
+# Módulos pesados que não devem ser carregados na importação do complemento
+MODULOS_PESADOS = ('PIL', 'google.genai', 'mistralai', 'cryptography', 'httpx', 'numpy', 'onnxruntime')
+
+# Módulos do NVDA (e o wx) importados pela interface, simulados na medição da importação
+MODULOS_NVDA = (
+    'globalPluginHandler', 'addonHandler', 'gui', 'wx', 'globalVars', 'ui', 'api',
+    'controlTypes', 'scriptHandler', 'inputCore', 'config', 'logHandler',
+)
+
+# Executado num interpretador novo: simula os módulos do NVDA e importa o
+# complemento pela interface, como o NVDA faz ao carregá-lo
+CODIGO_IMPORTACAO = """
+import sys, time, json, types, builtins
+
+class _MetaSimulado(type):
+    def __getattr__(cls, nome):
+        return cls
+    def __or__(cls, outro):
+        return cls
+
+class Simulado(metaclass=_MetaSimulado):
+    \"\"\"Aceita qualquer atributo, chamada, herança ou uso como decorador.\"\"\"
+    def __init__(self, *args, **kwargs):
+        pass
+    def __call__(self, *args, **kwargs):
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return Simulado()
+    def __getattr__(self, nome):
+        return Simulado()
+
+class ModuloSimulado(types.ModuleType):
+    def __getattr__(self, nome):
+        if nome.startswith('__'):
+            raise AttributeError(nome)
+        return Simulado
+
+for nome in {modulos_nvda!r}:
+    sys.modules[nome] = ModuloSimulado(nome)
+builtins._ = lambda texto: texto
+sys.path.insert(0, {diretorio!r})
+
+inicio = time.perf_counter()
+import interface_nvda
+duracao = (time.perf_counter() - inicio) * 1000
+pesados = [m for m in {pesados!r} if m in sys.modules]
+print(json.dumps({{"duracao_ms": duracao, "modulos_pesados": pesados}}))
+"""
+
+TEXTO_FALSO = (
+    'Captura de tela de uma janela com uma barra de ferramentas no topo. '
+    'Abaixo há uma lista de arquivos com ícones coloridos. '
+    'No canto inferior direito aparece um botão azul escrito Salvar.'
+)
+
+class ServicoFalso:
+    """
+    ServicoIA de teste: faz o mesmo trabalho local dos adaptadores (ler o
+    arquivo e codificar em base64) e simula a resposta do provedor.
+    """
+
+    def __init__(
+        self,
+        provedor: ProvedorIA,
+        perfil_imagem=None,
+        latencia: float = 0.0,
+        taxa_falha: float = 0.0,
+        semente: int = 0
+    ):
+        self.provedor = provedor
+        self.perfil_imagem = perfil_imagem
+        self.modelo = 'falso'
+        self.latencia = latencia
+        self.taxa_falha = taxa_falha
+        self._aleatorio = random.Random(semente)
+
+    def _responder(self, imagem_bytes: bytes) -> Result[DescricaoImagem, ErroIA]:
+        base64.b64encode(imagem_bytes)
+        if self.latencia:
+            time.sleep(self.latencia)
+        if self._aleatorio.random() < self.taxa_falha:
+            return Failure(ErroIA(f'{self.provedor.name}: falha simulada'))
+        return Success(DescricaoImagem(TEXTO_FALSO))
+
+    def descrever_imagem(self, caminho_imagem: CaminhoImagem, prazo: Optional[Prazo] = None, nivel: NivelDetalhe = NivelDetalhe.DETALHADO) -> Result[DescricaoImagem, ErroIA]:
+        with open(caminho_imagem, 'rb') as arquivo:
+            return self._responder(arquivo.read())
+
+    def descrever_imagem_bytes(self, imagem_bytes: bytes, mime_type: str, prazo: Optional[Prazo] = None, nivel: NivelDetalhe = NivelDetalhe.DETALHADO, resumo: Optional[bytes] = None) -> Result[DescricaoImagem, ErroIA]:
+        return self._responder(imagem_bytes)
+
+    def descrever_bloco_bytes(self, imagem_bytes: bytes, mime_type: str, indice: int, total: int, prazo: Optional[Prazo] = None, nivel: NivelDetalhe = NivelDetalhe.DETALHADO, resumo: Optional[bytes] = None) -> Result[DescricaoImagem, ErroIA]:
+        return self._responder(imagem_bytes)
+
+    def gerar_texto(self, instrucao: str, prazo: Optional[Prazo] = None, nivel: NivelDetalhe = NivelDetalhe.DETALHADO) -> Result[str, ErroIA]:
+        return self._responder(instrucao.encode('utf-8'))
+
+    def descrever_imagem_bytes_stream(self, imagem_bytes: bytes, mime_type: str, prazo: Optional[Prazo] = None, nivel: NivelDetalhe = NivelDetalhe.DETALHADO, resumo: Optional[bytes] = None) -> Result[Iterator[str], ErroIA]:
+        return self._responder(imagem_bytes).map(
+            lambda texto: iter(texto[inicio:inicio + 16] for inicio in range(0, len(texto), 16))
+        )
+
+class CapturaFalsa:
+    """CapturaTela de teste: entrega sempre a mesma imagem já codificada."""
+
+    def __init__(self, conteudo: bytes):
+        self.conteudo = conteudo
+
+    def capturar(self, regiao: RegiaoTela) -> Result[bytes, str]:
+        return Success(self.conteudo)
+
+def gerar_imagem(caminho: str, largura: int, altura: int) -> None:
+    """Gera uma imagem parecida com uma captura de tela: áreas lisas, bordas e texto."""
+    from PIL import Image, ImageDraw
+
+    aleatorio = random.Random(largura * altura)
+    imagem = Image.new('RGB', (largura, altura), (240, 240, 240))
+    desenho = ImageDraw.Draw(imagem)
+    passo = max(8, min(largura, altura) // 12)
+    for _ in range(60):
+        x, y = aleatorio.randrange(largura), aleatorio.randrange(altura)
+        cor = tuple(aleatorio.randrange(256) for _ in range(3))
+        desenho.rectangle((x, y, x + passo * 3, y + passo), fill=cor, outline=(0, 0, 0))
+        desenho.text((x + 2, y + 2), 'Arquivo', fill=(0, 0, 0))
+    imagem.save(caminho, quality=90)
+
+def medir(funcao: Callable[[], object], repeticoes: int) -> Dict[str, float]:
+    """Mediana e máximo do tempo em milissegundos e pico de memória em KiB."""
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+
+    # A memória é medida numa execução à parte, para não distorcer os tempos
+    tracemalloc.start()
+    funcao()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'mediana_ms': round(statistics.median(tempos), 3),
+        'max_ms': round(max(tempos), 3),
+        'pico_kib': round(pico / 1024, 1),
+    }
+
+def medir_importacao(repeticoes: int = 1) -> Dict[str, object]:
+    """
+    Mediana do tempo de importação do complemento, a partir da interface,
+    cada vez num interpretador novo, e os módulos pesados que ela carregou.
+    """
+    codigo = CODIGO_IMPORTACAO.format(
+        modulos_nvda=MODULOS_NVDA,
+        diretorio=DIRETORIO_COMPLEMENTO,
+        pesados=MODULOS_PESADOS
+    )
+    duracoes = []
+    pesados = set()
+    for _ in range(repeticoes):
+        saida = subprocess.run([sys.executable, '-c', codigo], capture_output=True, text=True)
+        if saida.returncode != 0:
+            raise RuntimeError(f'Falha ao importar o complemento:\n{saida.stderr}')
+        importacao = json.loads(saida.stdout)
+        duracoes.append(importacao['duracao_ms'])
+        pesados.update(importacao['modulos_pesados'])
+    return {
+        'mediana_ms': round(statistics.median(duracoes), 3),
+        'max_ms': round(max(duracoes), 3),
+        'modulos_pesados': sorted(pesados),
+    }
+
+def verificar_importacao(importacao: Dict[str, object]) -> bool:
+    """Informa os módulos pesados carregados na importação; retorna False se houver algum."""
+    if importacao['modulos_pesados']:
+        print('Módulos pesados carregados na importação:', ', '.join(importacao['modulos_pesados']))
+        return False
+    return True
+
+def _sem_cache_de_preprocessamento(funcao: Callable[[], object]) -> Callable[[], object]:
+    """Esvazia a memorização do preprocessamento para medir o custo de cada pedido novo."""
+    def executar():
+        _memoria_preprocessamento.limpar()
+        return funcao()
+    return executar
+
+def etapas_para_imagem(caminho: str, args, diretorio_cache: str) -> Dict[str, Callable[[], object]]:
+    """Etapas medidas para uma imagem; cada uma repete o trabalho de um pedido."""
+    imagem = validar_imagem(caminho).unwrap()
+    with open(caminho, 'rb') as arquivo:
+        conteudo = arquivo.read()
+
+    def criar_servico(provedor, perfil, taxa_falha=args.taxa_falha, semente=0):
+        return ServicoFalso(provedor, perfil, args.latencia, taxa_falha, semente)
+
+    gemini = criar_servico(ProvedorIA.GEMINI, AdaptadorGemini.perfil_imagem)
+    mistral = criar_servico(ProvedorIA.MISTRAL, AdaptadorMistral.perfil_imagem)
+    gemini_falho = criar_servico(ProvedorIA.GEMINI, AdaptadorGemini.perfil_imagem, taxa_falha=1.0)
+    mistral_falho = criar_servico(ProvedorIA.MISTRAL, AdaptadorMistral.perfil_imagem, taxa_falha=1.0)
+    sem_perfil = criar_servico(ProvedorIA.MISTRAL, None)
+
+    captura = CapturaFalsa(conteudo)
+    regiao = RegiaoTela(0, 0, imagem.largura, imagem.altura)
+    cache = CacheDescricoes(diretorio_cache)
+    com_cache = ServicoIAComCache(criar_servico(ProvedorIA.GEMINI, None), cache)
+    com_cache.descrever_imagem(CaminhoImagem(caminho))
+
+    def carregar_pil():
+        from PIL import Image
+        with Image.open(caminho) as aberta:
+            aberta.load()
+
+    def prazo():
+        return Prazo(args.prazo) if args.prazo else None
+
+    # A segunda etapa roda no mesmo executor de fundo do complemento
+    segundo_plano = ExecutorDescricoes(lambda funcao, *argumentos: funcao(*argumentos))
+
+    return {
+        'validar_imagem': lambda: validar_imagem(caminho),
+        'ler_arquivo': lambda: open(caminho, 'rb').read(),
+        # Sem a memorização, para medir o custo da primeira codificação de cada imagem
+        'base64_mistral': lambda: codificar_data_url(conteudo, imagem.mime_type),
+        'pil_gemini': carregar_pil,
+        'preprocessar_gemini': _sem_cache_de_preprocessamento(
+            lambda: preprocessar_imagem(AdaptadorGemini.perfil_imagem, imagem)
+        ),
+        'preprocessar_mistral': _sem_cache_de_preprocessamento(
+            lambda: preprocessar_imagem(AdaptadorMistral.perfil_imagem, imagem)
+        ),
+        'hash_perceptual': lambda: calcular_dhash(conteudo),
+        'cache_acerto': lambda: com_cache.descrever_imagem(CaminhoImagem(caminho)),
+        'pipeline_sem_preprocessar': lambda: gerar_descricao_imagem(
+            sem_perfil, [], caminho, None, ModoFallback.SEQUENCIAL, None, prazo()
+        ),
+        'pipeline_sequencial': _sem_cache_de_preprocessamento(
+            lambda: gerar_descricao_imagem(
+                gemini, [mistral], caminho, None, ModoFallback.SEQUENCIAL, None, prazo()
+            )
+        ),
+        'pipeline_fallback': _sem_cache_de_preprocessamento(
+            lambda: gerar_descricao_imagem(
+                gemini_falho, [mistral_falho, sem_perfil], caminho,
+                None, ModoFallback.SEQUENCIAL, None, prazo()
+            )
+        ),
+        'pipeline_corrida': _sem_cache_de_preprocessamento(
+            lambda: gerar_descricao_imagem(
+                gemini, [mistral], caminho, None, ModoFallback.CORRIDA, None, prazo()
+            )
+        ),
+        'pipeline_captura': _sem_cache_de_preprocessamento(
+            lambda: captura.capturar(regiao).bind(
+                lambda capturada: gerar_descricao_imagem_bytes(
+                    gemini, [mistral], capturada, None, ModoFallback.SEQUENCIAL, None, prazo()
+                )
+            )
+        ),
+        'pipeline_fluxo': _sem_cache_de_preprocessamento(
+            lambda: gerar_descricao_imagem_em_fluxo(
+                gemini, [mistral], caminho, lambda frase: None,
+                None, ModoFallback.SEQUENCIAL, None, prazo()
+            )
+        ),
+        # Mede só a primeira etapa; a detalhada segue em segundo plano
+        'pipeline_duas_etapas': _sem_cache_de_preprocessamento(
+            lambda: gerar_descricao_imagem(
+                gemini, [mistral], caminho, None, ModoFallback.SEQUENCIAL, None, prazo(),
+                agendar_detalhada=lambda tarefa: segundo_plano.executar_em_segundo_plano(tarefa, lambda resultado: None)
+            )
+        ),
+    }
+
+def versao_atual() -> str:
+    try:
+        saida = subprocess.run(
+            ['git', 'describe', '--always', '--dirty'],
+            cwd=DIRETORIO_COMPLEMENTO, capture_output=True, text=True, check=True
+        )
+        return saida.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'desconhecida'
+
+def carregar_execucao_anterior() -> Optional[dict]:
+    try:
+        with open(ARQUIVO_RESULTADOS, 'r', encoding='utf-8') as arquivo:
+            linhas = [linha for linha in arquivo if linha.strip()]
+    except OSError:
+        return None
+    return json.loads(linhas[-1]) if linhas else None
+
+def comparar(atual: Dict[str, dict], anterior: Optional[dict]) -> Dict[str, float]:
+    """Razão entre o tempo atual e o da execução anterior, por etapa."""
+    if anterior is None:
+        return {}
+    razoes = {}
+    for nome, medida in atual.items():
+        referencia = anterior['etapas'].get(nome)
+        if referencia and referencia.get('mediana_ms'):
+            razoes[nome] = medida['mediana_ms'] / referencia['mediana_ms']
+    return razoes
+
+def imprimir(etapas: Dict[str, dict], razoes: Dict[str, float]) -> None:
+    print(f'{"etapa":<40} {"mediana ms":>11} {"máx ms":>10} {"pico KiB":>10} {"vs anterior":>12}')
+    for nome, medida in etapas.items():
+        razao = razoes.get(nome)
+        comparacao = ''
+        if razao is not None:
+            comparacao = f'{razao:.2f}x'
+            if razao >= LIMIAR_REGRESSAO:
+                comparacao += ' REGRESSÃO'
+        print(
+            f'{nome:<40} {medida["mediana_ms"]:>11.3f} {medida.get("max_ms", 0):>10.3f} '
+            f'{medida.get("pico_kib", 0):>10.1f} {comparacao:>12}'
+        )
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Benchmark do pipeline de descrição com provedores falsos.')
+    parser.add_argument('--repeticoes', type=int, default=5)
+    parser.add_argument('--latencia', type=float, default=0.0, help='latência simulada dos provedores, em segundos')
+    parser.add_argument('--taxa-falha', type=float, default=0.0, help='fração de respostas com falha simulada')
+    parser.add_argument('--prazo', type=float, default=0.0, help='prazo por pedido, em segundos (0 desativa)')
+    parser.add_argument('--tamanhos', default=','.join(TAMANHOS_IMAGEM), help='tamanhos separados por vírgula')
+    parser.add_argument('--salvar', action='store_true', help='acrescenta o resultado a resultados.jsonl')
+    parser.add_argument(
+        '--verificar-importacao', action='store_true',
+        help='só verifica se a importação carrega módulos pesados'
+    )
+    args = parser.parse_args()
+
+    importacao = medir_importacao(args.repeticoes)
+    if args.verificar_importacao:
+        print(f'importação: {importacao["mediana_ms"]:.3f} ms')
+        return 0 if verificar_importacao(importacao) else 1
+
+    etapas: Dict[str, dict] = {'importacao': importacao}
+    with tempfile.TemporaryDirectory() as diretorio:
+        for nome_tamanho in args.tamanhos.split(','):
+            largura, altura = TAMANHOS_IMAGEM[nome_tamanho]
+            for extensao in ('png', 'jpg'):
+                caminho = os.path.join(diretorio, f'{nome_tamanho}.{extensao}')
+                gerar_imagem(caminho, largura, altura)
+                diretorio_cache = os.path.join(diretorio, f'cache_{nome_tamanho}_{extensao}')
+                for nome, funcao in etapas_para_imagem(caminho, args, diretorio_cache).items():
+                    etapas[f'{nome}[{nome_tamanho}.{extensao}]'] = medir(funcao, args.repeticoes)
+
+    anterior = carregar_execucao_anterior()
+    imprimir(etapas, comparar(etapas, anterior))
+    importacao_leve = verificar_importacao(importacao)
+
+    if args.salvar:
+        registro = {
+            'versao': versao_atual(),
+            'data': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'plataforma': platform.platform(),
+            'parametros': {
+                'repeticoes': args.repeticoes,
+                'latencia': args.latencia,
+                'taxa_falha': args.taxa_falha,
+                'prazo': args.prazo,
+            },
+            'etapas': etapas,
+        }
+        with open(ARQUIVO_RESULTADOS, 'a', encoding='utf-8') as arquivo:
+            arquivo.write(json.dumps(registro, ensure_ascii=False) + '\n')
+
+    return 0 if importacao_leve else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
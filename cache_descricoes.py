@@ -0,0 +1,517 @@
+# infraestrutura/cache_descricoes.py
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Iterator, Optional, Tuple
+from returns.result import Result, Success
+
+from entidades import CaminhoImagem, DescricaoImagem, ErroIA, NivelDetalhe
+from servico_ia import ServicoIA, DecoradorServicoIA, descrever_em_fragmentos
+from prazo import Prazo
+from hash_perceptual import IndiceHashPerceptual, calcular_dhash
+from prompts import instrucao_bloco, instrucao_nivel
+from formato_imagem import tipo_mime
+
+def calcular_chave_cache(
+    imagem_bytes: bytes,
+    provedor: str,
+    modelo: str,
+    prompt: str,
+    resumo_imagem: Optional[bytes] = None
+) -> str:
+    """
+    Calcula a chave do cache a partir do conteúdo da imagem e dos parâmetros
+    da requisição. Com o SHA-256 da imagem já calculado, os bytes não são lidos.
+    """
+    if resumo_imagem is None:
+        resumo_imagem = hashlib.sha256(imagem_bytes).digest()
+    resumo = hashlib.sha256(resumo_imagem)
+    for parte in (provedor, modelo, prompt):
+        resumo.update(b'\0')
+        resumo.update(parte.encode('utf-8'))
+    return resumo.hexdigest()
+
+def parametros_requisicao(
+    servico: ServicoIA,
+    nivel: NivelDetalhe,
+    instrucao: Optional[str] = None
+) -> Tuple[str, str, str]:
+    """
+    Provedor, modelo e instrução que, com a imagem, determinam a descrição.
+    A instrução é a do nível, salvo quando outra é informada (a dos blocos).
+    """
+    # Serviços que escolhem o modelo pelo nível informam qual será usado
+    modelo_nivel = getattr(servico, 'modelo_nivel', None)
+    return (
+        servico.provedor.name,
+        modelo_nivel(nivel) if modelo_nivel is not None else getattr(servico, 'modelo', ''),
+        instrucao if instrucao is not None else instrucao_nivel(nivel)
+    )
+
+# Arquivo com as linhas "chave contexto hash" do índice perceptual
+ARQUIVO_INDICE_PERCEPTUAL = 'indice_perceptual.txt'
+
+class CacheDescricoes:
+    """
+    Cache de descrições em dois níveis: LRU em memória e arquivos JSON em disco.
+    As entradas expiram após o TTL e o disco é limitado por tamanho total,
+    removendo primeiro as entradas acessadas há mais tempo.
+    Entradas guardadas com hash perceptual também podem ser encontradas por
+    imagens quase idênticas, dentro da distância de semelhança configurada.
+    """
+
+    def __init__(
+        self,
+        diretorio: str,
+        max_entradas_memoria: int = 256,
+        max_bytes_disco: int = 20 * 1024 * 1024,
+        ttl_segundos: float = 30 * 24 * 3600,
+        distancia_semelhanca: int = 0
+    ):
+        self.diretorio = diretorio
+        self.max_entradas_memoria = max_entradas_memoria
+        self.max_bytes_disco = max_bytes_disco
+        self.ttl_segundos = ttl_segundos
+        self.acertos = 0
+        self.falhas = 0
+
+        self._memoria: 'OrderedDict[str, Tuple[str, float]]' = OrderedDict()
+        # chave -> (último acesso, tamanho em bytes); carregado sob demanda
+        self._indice_disco: Optional[Dict[str, Tuple[float, int]]] = None
+        self._bytes_disco = 0
+        self._trava = threading.RLock()
+
+        # Índices perceptuais por contexto (provedor, modelo e prompt), carregados sob demanda
+        self.distancia_semelhanca = distancia_semelhanca
+        self._indices_perceptuais: Optional[Dict[str, IndiceHashPerceptual]] = None
+        self._hash_por_chave: Dict[str, Tuple[str, int]] = {}
+
+    def obter(self, chave: str) -> Optional[str]:
+        """Retorna a descrição em cache ou None se ausente ou expirada."""
+        with self._trava:
+            entrada = self._obter_entrada(chave)
+            if entrada is None:
+                self.falhas += 1
+                return None
+
+            self.acertos += 1
+            return entrada[0]
+
+    def obter_semelhante(self, hash_perceptual: int, contexto: str) -> Optional[str]:
+        """
+        Retorna a descrição da imagem mais parecida do mesmo contexto, se
+        estiver dentro da distância de semelhança; None caso contrário.
+        """
+        if self.distancia_semelhanca <= 0:
+            return None
+
+        with self._trava:
+            indice = self._obter_indices_perceptuais().get(contexto)
+            if indice is None:
+                return None
+
+            for _, chave in indice.buscar(hash_perceptual):
+                entrada = self._obter_entrada(chave)
+                if entrada is not None:
+                    self.acertos += 1
+                    return entrada[0]
+                # A entrada expirou ou foi removida do disco
+                self._remover_hash(chave)
+            return None
+
+    def guardar(
+        self,
+        chave: str,
+        texto: str,
+        hash_perceptual: Optional[int] = None,
+        contexto: str = ''
+    ) -> None:
+        """Guarda uma descrição nos dois níveis do cache."""
+        entrada = (texto, time.time())
+        with self._trava:
+            self._guardar_memoria(chave, entrada)
+            self._escrever_disco(chave, entrada)
+            if hash_perceptual is not None:
+                self._guardar_hash(chave, contexto, hash_perceptual)
+
+    def definir_distancia_semelhanca(self, distancia: int) -> None:
+        """Altera a distância de Hamming aceita como imagem semelhante; 0 desativa."""
+        with self._trava:
+            if distancia == self.distancia_semelhanca:
+                return
+            self.distancia_semelhanca = distancia
+            # Os blocos do índice dependem da distância: reconstrói com os hashes atuais
+            if self._indices_perceptuais is not None:
+                hashes = list(self._hash_por_chave.items())
+                self._indices_perceptuais = {}
+                for chave, (contexto, valor) in hashes:
+                    self._indexar_hash(chave, contexto, valor)
+
+    def limpar(self) -> None:
+        """Remove todas as entradas do cache."""
+        with self._trava:
+            self._memoria.clear()
+            for chave in list(self._obter_indice_disco()):
+                self._remover_disco(chave)
+            self._indices_perceptuais = {}
+            self._hash_por_chave.clear()
+            try:
+                os.remove(self._caminho_indice_perceptual())
+            except OSError:
+                pass
+
+    def _obter_entrada(self, chave: str) -> Optional[Tuple[str, float]]:
+        entrada = self._memoria.get(chave)
+        if entrada is None:
+            entrada = self._ler_disco(chave)
+            if entrada is not None:
+                self._guardar_memoria(chave, entrada)
+        elif self._expirada(entrada):
+            del self._memoria[chave]
+            entrada = None
+        else:
+            self._memoria.move_to_end(chave)
+        return entrada
+
+    def _expirada(self, entrada: Tuple[str, float]) -> bool:
+        return time.time() - entrada[1] > self.ttl_segundos
+
+    def _guardar_memoria(self, chave: str, entrada: Tuple[str, float]) -> None:
+        self._memoria[chave] = entrada
+        self._memoria.move_to_end(chave)
+        while len(self._memoria) > self.max_entradas_memoria:
+            self._memoria.popitem(last=False)
+
+    def _caminho_entrada(self, chave: str) -> str:
+        return os.path.join(self.diretorio, f'{chave}.json')
+
+    def _obter_indice_disco(self) -> Dict[str, Tuple[float, int]]:
+        """Varre o diretório do cache na primeira utilização."""
+        if self._indice_disco is None:
+            self._indice_disco = {}
+            self._bytes_disco = 0
+            try:
+                with os.scandir(self.diretorio) as entradas:
+                    for entrada in entradas:
+                        if entrada.is_file() and entrada.name.endswith('.json'):
+                            estado = entrada.stat()
+                            self._indice_disco[entrada.name[:-5]] = (estado.st_mtime, estado.st_size)
+                            self._bytes_disco += estado.st_size
+            except OSError:
+                pass
+        return self._indice_disco
+
+    def _ler_disco(self, chave: str) -> Optional[Tuple[str, float]]:
+        if chave not in self._obter_indice_disco():
+            return None
+
+        caminho = self._caminho_entrada(chave)
+        try:
+            with open(caminho, 'r', encoding='utf-8') as arquivo:
+                dados = json.load(arquivo)
+            entrada = (dados['texto'], dados['criado_em'])
+        except Exception:
+            self._remover_disco(chave)
+            return None
+
+        if self._expirada(entrada):
+            self._remover_disco(chave)
+            return None
+
+        # O mtime do arquivo registra o último acesso, usado na política LRU do disco
+        agora = time.time()
+        try:
+            os.utime(caminho, (agora, agora))
+        except OSError:
+            pass
+        self._indice_disco[chave] = (agora, self._indice_disco[chave][1])
+        return entrada
+
+    def _escrever_disco(self, chave: str, entrada: Tuple[str, float]) -> None:
+        indice = self._obter_indice_disco()
+        conteudo = json.dumps(
+            {'texto': entrada[0], 'criado_em': entrada[1]},
+            ensure_ascii=False
+        ).encode('utf-8')
+
+        caminho = self._caminho_entrada(chave)
+        try:
+            os.makedirs(self.diretorio, exist_ok=True)
+            temporario = f'{caminho}.{threading.get_ident()}.tmp'
+            with open(temporario, 'wb') as arquivo:
+                arquivo.write(conteudo)
+            os.replace(temporario, caminho)
+        except OSError:
+            return
+
+        if chave in indice:
+            self._bytes_disco -= indice[chave][1]
+        indice[chave] = (entrada[1], len(conteudo))
+        self._bytes_disco += len(conteudo)
+        self._aplicar_limite_disco()
+
+    def _remover_disco(self, chave: str) -> None:
+        indice = self._obter_indice_disco()
+        try:
+            os.remove(self._caminho_entrada(chave))
+        except OSError:
+            pass
+        if chave in indice:
+            self._bytes_disco -= indice.pop(chave)[1]
+        self._remover_hash(chave)
+
+    def _aplicar_limite_disco(self) -> None:
+        """Remove as entradas menos recentemente usadas até caber no limite."""
+        if self._bytes_disco <= self.max_bytes_disco:
+            return
+
+        # Libera uma folga para não varrer o índice a cada nova escrita
+        alvo = self.max_bytes_disco * 0.9
+        for chave, _ in sorted(self._indice_disco.items(), key=lambda item: item[1][0]):
+            if self._bytes_disco <= alvo:
+                break
+            self._remover_disco(chave)
+
+    def _caminho_indice_perceptual(self) -> str:
+        return os.path.join(self.diretorio, ARQUIVO_INDICE_PERCEPTUAL)
+
+    def _obter_indices_perceptuais(self) -> Dict[str, IndiceHashPerceptual]:
+        """
+        Lê o índice perceptual do disco na primeira utilização, ignorando
+        linhas de entradas que já saíram do cache. Se houver mais linhas
+        obsoletas do que válidas, o arquivo é reescrito só com as válidas.
+        """
+        if self._indices_perceptuais is None:
+            self._indices_perceptuais = {}
+            indice_disco = self._obter_indice_disco()
+            linhas = 0
+            try:
+                with open(self._caminho_indice_perceptual(), 'r', encoding='utf-8') as arquivo:
+                    for linha in arquivo:
+                        linhas += 1
+                        partes = linha.split()
+                        if len(partes) == 3 and partes[0] in indice_disco:
+                            self._indexar_hash(partes[0], partes[1], int(partes[2], 16))
+            except (OSError, ValueError):
+                pass
+
+            if linhas > 2 * len(self._hash_por_chave):
+                self._reescrever_indice_perceptual()
+        return self._indices_perceptuais
+
+    def _indexar_hash(self, chave: str, contexto: str, valor: int) -> None:
+        anterior = self._hash_por_chave.get(chave)
+        if anterior is not None:
+            self._remover_hash(chave)
+        self._hash_por_chave[chave] = (contexto, valor)
+        indice = self._indices_perceptuais.get(contexto)
+        if indice is None:
+            indice = self._indices_perceptuais[contexto] = IndiceHashPerceptual(
+                max(0, self.distancia_semelhanca)
+            )
+        indice.adicionar(valor, chave)
+
+    def _guardar_hash(self, chave: str, contexto: str, valor: int) -> None:
+        self._obter_indices_perceptuais()
+        self._indexar_hash(chave, contexto, valor)
+        try:
+            with open(self._caminho_indice_perceptual(), 'a', encoding='utf-8') as arquivo:
+                arquivo.write(f'{chave} {contexto} {valor:016x}\n')
+        except OSError:
+            pass
+
+    def _remover_hash(self, chave: str) -> None:
+        # O arquivo não é alterado: linhas obsoletas são descartadas na próxima leitura
+        contexto_valor = self._hash_por_chave.pop(chave, None)
+        if contexto_valor is None or self._indices_perceptuais is None:
+            return
+        contexto, valor = contexto_valor
+        indice = self._indices_perceptuais.get(contexto)
+        if indice is not None:
+            indice.remover(valor, chave)
+
+    def _reescrever_indice_perceptual(self) -> None:
+        caminho = self._caminho_indice_perceptual()
+        try:
+            os.makedirs(self.diretorio, exist_ok=True)
+            temporario = f'{caminho}.{threading.get_ident()}.tmp'
+            with open(temporario, 'w', encoding='utf-8') as arquivo:
+                for chave, (contexto, valor) in self._hash_por_chave.items():
+                    arquivo.write(f'{chave} {contexto} {valor:016x}\n')
+            os.replace(temporario, caminho)
+        except OSError:
+            pass
+
+class ServicoIAComCache(DecoradorServicoIA):
+    """
+    Decorador que consulta o cache de descrições antes de chamar o serviço.
+    A chave combina o hash da imagem com provedor, modelo e a instrução do
+    nível de detalhe pedido.
+    """
+
+    def __init__(self, servico: ServicoIA, cache: CacheDescricoes):
+        super().__init__(servico)
+        self.cache = cache
+
+    def descrever_imagem(
+        self,
+        caminho_imagem: CaminhoImagem,
+        prazo: Optional[Prazo] = None,
+        nivel: NivelDetalhe = NivelDetalhe.DETALHADO
+    ) -> Result[DescricaoImagem, ErroIA]:
+        """
+        Descreve uma imagem local usando o cache; URLs vão direto ao serviço.
+        O arquivo é lido uma vez e os mesmos bytes seguem para o serviço.
+        """
+        if caminho_imagem.startswith(('http://', 'https://')):
+            return self.servico.descrever_imagem(caminho_imagem, prazo, nivel)
+
+        try:
+            with open(caminho_imagem, 'rb') as arquivo:
+                imagem_bytes = arquivo.read()
+        except OSError:
+            return self.servico.descrever_imagem(caminho_imagem, prazo, nivel)
+
+        resumo = hashlib.sha256(imagem_bytes).digest()
+        return self._descrever_com_cache(
+            imagem_bytes,
+            resumo,
+            nivel,
+            lambda: self.servico.descrever_imagem_bytes(imagem_bytes, tipo_mime(imagem_bytes), prazo, nivel, resumo)
+        )
+
+    def descrever_imagem_bytes(
+        self,
+        imagem_bytes: bytes,
+        mime_type: str,
+        prazo: Optional[Prazo] = None,
+        nivel: NivelDetalhe = NivelDetalhe.DETALHADO,
+        resumo: Optional[bytes] = None
+    ) -> Result[DescricaoImagem, ErroIA]:
+        """Descreve uma imagem em bytes usando o cache."""
+        return self._descrever_com_cache(
+            imagem_bytes,
+            resumo,
+            nivel,
+            lambda: self.servico.descrever_imagem_bytes(imagem_bytes, mime_type, prazo, nivel, resumo)
+        )
+
+    def descrever_bloco_bytes(
+        self,
+        imagem_bytes: bytes,
+        mime_type: str,
+        indice: int,
+        total: int,
+        prazo: Optional[Prazo] = None,
+        nivel: NivelDetalhe = NivelDetalhe.DETALHADO,
+        resumo: Optional[bytes] = None
+    ) -> Result[DescricaoImagem, ErroIA]:
+        """
+        Blocos só são reaproveitados pelo hash exato: a instrução inclui a
+        posição do bloco, e um bloco parecido pode estar em outra posição.
+        """
+        chave = calcular_chave_cache(
+            imagem_bytes,
+            *parametros_requisicao(self.servico, nivel, instrucao_bloco(nivel, indice, total)),
+            resumo
+        )
+        texto = self.cache.obter(chave)
+        if texto is not None:
+            return Success(DescricaoImagem(texto))
+
+        resultado = self.servico.descrever_bloco_bytes(imagem_bytes, mime_type, indice, total, prazo, nivel, resumo)
+        resultado.map(lambda descricao: self.cache.guardar(chave, descricao))
+        return resultado
+
+    def descrever_imagem_bytes_stream(
+        self,
+        imagem_bytes: bytes,
+        mime_type: str,
+        prazo: Optional[Prazo] = None,
+        nivel: NivelDetalhe = NivelDetalhe.DETALHADO,
+        resumo: Optional[bytes] = None
+    ) -> Result[Iterator[str], ErroIA]:
+        """
+        Entrega a descrição em cache como um único fragmento; em caso de falta,
+        repassa o fluxo do serviço e guarda o texto quando ele termina.
+        """
+        chave = self._calcular_chave(imagem_bytes, resumo, nivel)
+        texto, hash_perceptual = self._consultar_cache(chave, imagem_bytes, nivel)
+        if texto is not None:
+            return Success(iter([texto]))
+        
+        return descrever_em_fragmentos(self.servico, imagem_bytes, mime_type, prazo, nivel, resumo).map(
+            lambda fragmentos: self._guardar_ao_concluir(chave, hash_perceptual, nivel, fragmentos)
+        )
+
+    def _calcular_chave(self, imagem_bytes: bytes, resumo: Optional[bytes], nivel: NivelDetalhe) -> str:
+        return calcular_chave_cache(imagem_bytes, *self._parametros_requisicao(nivel), resumo)
+
+    def _parametros_requisicao(self, nivel: NivelDetalhe) -> Tuple[str, str, str]:
+        return parametros_requisicao(self.servico, nivel)
+
+    def _contexto(self, nivel: NivelDetalhe) -> str:
+        """Identifica provedor, modelo e instrução: só descrições do mesmo contexto são reaproveitadas."""
+        return calcular_chave_cache(b'', *self._parametros_requisicao(nivel))[:16]
+
+    def _consultar_cache(self, chave: str, imagem_bytes: bytes, nivel: NivelDetalhe) -> Tuple[Optional[str], Optional[int]]:
+        """
+        Procura a descrição pelo hash exato e, na falta, por uma imagem quase
+        idêntica. Retorna o texto encontrado e o hash perceptual, calculado
+        só com a busca por semelhança ativa e reaproveitado ao guardar.
+        """
+        texto = self.cache.obter(chave)
+        if texto is not None or self.cache.distancia_semelhanca <= 0:
+            return texto, None
+
+        hash_perceptual = calcular_dhash(imagem_bytes)
+        if hash_perceptual is None:
+            return None, None
+        return self.cache.obter_semelhante(hash_perceptual, self._contexto(nivel)), hash_perceptual
+
+    def _descrever_com_cache(
+        self,
+        imagem_bytes: bytes,
+        resumo: Optional[bytes],
+        nivel: NivelDetalhe,
+        descrever: Callable[[], Result[DescricaoImagem, ErroIA]]
+    ) -> Result[DescricaoImagem, ErroIA]:
+        chave = self._calcular_chave(imagem_bytes, resumo, nivel)
+
+        texto, hash_perceptual = self._consultar_cache(chave, imagem_bytes, nivel)
+        if texto is not None:
+            return Success(DescricaoImagem(texto))
+
+        resultado = descrever()
+        resultado.map(lambda descricao: self._guardar(chave, hash_perceptual, nivel, descricao))
+        return resultado
+
+    def _guardar(self, chave: str, hash_perceptual: Optional[int], nivel: NivelDetalhe, texto: str) -> None:
+        self.cache.guardar(chave, texto, hash_perceptual, self._contexto(nivel))
+
+    def _guardar_ao_concluir(
+        self,
+        chave: str,
+        hash_perceptual: Optional[int],
+        nivel: NivelDetalhe,
+        fragmentos: Iterator[str]
+    ) -> Iterator[str]:
+        """
+        Repassa os fragmentos; só guarda no cache se o fluxo chegar ao fim.
+        Um fluxo encerrado antes, ao atingir o limite de frases, não é guardado.
+        """
+        partes = []
+        try:
+            for fragmento in fragmentos:
+                partes.append(fragmento)
+                yield fragmento
+        finally:
+            fechar = getattr(fragmentos, 'close', None)
+            if fechar is not None:
+                fechar()
+
+        if partes:
+            self._guardar(chave, hash_perceptual, nivel, ''.join(partes))
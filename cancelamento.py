@@ -0,0 +1,20 @@
+# dominio/cancelamento.py
+import threading
+
+class TokenCancelamento:
+    """
+    Sinaliza de forma cooperativa que um pedido de descrição foi cancelado.
+    Os casos de uso consultam o token entre uma etapa e outra.
+    """
+
+    def __init__(self):
+        self._evento = threading.Event()
+
+    def cancelar(self) -> None:
+        """Marca o pedido como cancelado."""
+        self._evento.set()
+
+    @property
+    def cancelado(self) -> bool:
+        """Indica se o pedido foi cancelado."""
+        return self._evento.is_set()
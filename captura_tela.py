@@ -0,0 +1,14 @@
+# portas/captura_tela.py
+from typing import Protocol
+from returns.result import Result
+
+from entidades import RegiaoTela
+
+class CapturaTela(Protocol):
+    """
+    Porta que define a interface para capturar uma região da tela.
+    A imagem é entregue codificada, em memória, sem passar pelo disco.
+    """
+    def capturar(self, regiao: RegiaoTela) -> Result[bytes, str]:
+        """Retorna os bytes da imagem da região ou a mensagem de erro."""
+        ...
@@ -0,0 +1,145 @@
+# adaptadores/captura_tela_windows.py
+import io
+import ctypes
+from returns.result import Result, Success, Failure
+
+from entidades import RegiaoTela
+from captura_tela import CapturaTela
+from metricas import medir_etapa
+
+SRCCOPY = 0x00CC0020
+# Inclui janelas sobrepostas (layered), como menus e dicas de ferramenta
+CAPTUREBLT = 0x40000000
+DIB_RGB_COLORS = 0
+BI_RGB = 0
+# Métricas da área de trabalho virtual, que abrange todos os monitores
+SM_XVIRTUALSCREEN = 76
+SM_YVIRTUALSCREEN = 77
+SM_CXVIRTUALSCREEN = 78
+SM_CYVIRTUALSCREEN = 79
+
+# Compressão rápida: a imagem ainda é reduzida e recodificada para cada provedor
+NIVEL_COMPRESSAO_PNG = 1
+
+class _BitmapInfoHeader(ctypes.Structure):
+    _fields_ = [
+        ('biSize', ctypes.c_uint32),
+        ('biWidth', ctypes.c_int32),
+        ('biHeight', ctypes.c_int32),
+        ('biPlanes', ctypes.c_uint16),
+        ('biBitCount', ctypes.c_uint16),
+        ('biCompression', ctypes.c_uint32),
+        ('biSizeImage', ctypes.c_uint32),
+        ('biXPelsPerMeter', ctypes.c_int32),
+        ('biYPelsPerMeter', ctypes.c_int32),
+        ('biClrUsed', ctypes.c_uint32),
+        ('biClrImportant', ctypes.c_uint32),
+    ]
+
+class CapturaTelaWindows(CapturaTela):
+    """
+    Captura só a região pedida com GDI (BitBlt), sem copiar a tela inteira,
+    e a codifica em PNG num buffer em memória.
+    """
+
+    def capturar(self, regiao: RegiaoTela) -> Result[bytes, str]:
+        try:
+            regiao_visivel = self._limitar_a_tela(regiao)
+            if regiao_visivel is None:
+                return Failure('A imagem está fora da área visível da tela')
+
+            with medir_etapa('captura') as medicao:
+                pixels = self._copiar_pixels(regiao_visivel)
+
+                # PIL é importado sob demanda para não pesar na inicialização do NVDA
+                from PIL import Image
+
+                imagem = Image.frombuffer(
+                    'RGB',
+                    (regiao_visivel.largura, regiao_visivel.altura),
+                    pixels,
+                    'raw',
+                    'BGRX',
+                    0,
+                    1
+                )
+                saida = io.BytesIO()
+                imagem.save(saida, format='PNG', compress_level=NIVEL_COMPRESSAO_PNG)
+                conteudo = saida.getvalue()
+                medicao['bytes_resposta'] = len(conteudo)
+            return Success(conteudo)
+        except Exception as e:
+            return Failure(f'Erro ao capturar a tela: {str(e)}')
+
+    def _limitar_a_tela(self, regiao: RegiaoTela):
+        """Recorta a região à área de trabalho virtual; None se não sobrar nada."""
+        user32 = ctypes.windll.user32
+        esquerda_tela = user32.GetSystemMetrics(SM_XVIRTUALSCREEN)
+        topo_tela = user32.GetSystemMetrics(SM_YVIRTUALSCREEN)
+        direita_tela = esquerda_tela + user32.GetSystemMetrics(SM_CXVIRTUALSCREEN)
+        base_tela = topo_tela + user32.GetSystemMetrics(SM_CYVIRTUALSCREEN)
+
+        esquerda = max(regiao.esquerda, esquerda_tela)
+        topo = max(regiao.topo, topo_tela)
+        direita = min(regiao.esquerda + regiao.largura, direita_tela)
+        base = min(regiao.topo + regiao.altura, base_tela)
+        if direita <= esquerda or base <= topo:
+            return None
+        return RegiaoTela(esquerda, topo, direita - esquerda, base - topo)
+
+    def _copiar_pixels(self, regiao: RegiaoTela) -> ctypes.Array:
+        """Copia a região da tela para um buffer BGRX de 32 bits, de cima para baixo."""
+        user32 = ctypes.windll.user32
+        gdi32 = ctypes.windll.gdi32
+        for funcao in (user32.GetDC, gdi32.CreateCompatibleDC, gdi32.CreateCompatibleBitmap, gdi32.SelectObject):
+            funcao.restype = ctypes.c_void_p
+        user32.ReleaseDC.argtypes = (ctypes.c_void_p, ctypes.c_void_p)
+        gdi32.CreateCompatibleDC.argtypes = (ctypes.c_void_p,)
+        gdi32.CreateCompatibleBitmap.argtypes = (ctypes.c_void_p, ctypes.c_int, ctypes.c_int)
+        gdi32.SelectObject.argtypes = (ctypes.c_void_p, ctypes.c_void_p)
+        gdi32.BitBlt.argtypes = (
+            ctypes.c_void_p, ctypes.c_int, ctypes.c_int, ctypes.c_int, ctypes.c_int,
+            ctypes.c_void_p, ctypes.c_int, ctypes.c_int, ctypes.c_uint32
+        )
+        gdi32.GetDIBits.argtypes = (
+            ctypes.c_void_p, ctypes.c_void_p, ctypes.c_uint, ctypes.c_uint,
+            ctypes.c_void_p, ctypes.c_void_p, ctypes.c_uint
+        )
+        gdi32.DeleteObject.argtypes = (ctypes.c_void_p,)
+        gdi32.DeleteDC.argtypes = (ctypes.c_void_p,)
+
+        largura, altura = regiao.largura, regiao.altura
+        tela = user32.GetDC(None)
+        memoria = gdi32.CreateCompatibleDC(tela)
+        bitmap = gdi32.CreateCompatibleBitmap(tela, largura, altura)
+        anterior = gdi32.SelectObject(memoria, bitmap)
+        try:
+            copiado = gdi32.BitBlt(
+                memoria, 0, 0, largura, altura,
+                tela, regiao.esquerda, regiao.topo,
+                SRCCOPY | CAPTUREBLT
+            )
+            # O bitmap não pode estar selecionado num DC durante o GetDIBits
+            gdi32.SelectObject(memoria, anterior)
+            if not copiado:
+                raise ctypes.WinError()
+
+            cabecalho = _BitmapInfoHeader()
+            cabecalho.biSize = ctypes.sizeof(_BitmapInfoHeader)
+            cabecalho.biWidth = largura
+            # Altura negativa pede as linhas de cima para baixo
+            cabecalho.biHeight = -altura
+            cabecalho.biPlanes = 1
+            cabecalho.biBitCount = 32
+            cabecalho.biCompression = BI_RGB
+
+            pixels = ctypes.create_string_buffer(largura * altura * 4)
+            if not gdi32.GetDIBits(
+                memoria, bitmap, 0, altura, pixels, ctypes.byref(cabecalho), DIB_RGB_COLORS
+            ):
+                raise ctypes.WinError()
+            return pixels
+        finally:
+            gdi32.DeleteObject(bitmap)
+            gdi32.DeleteDC(memoria)
+            user32.ReleaseDC(None, tela)
@@ -1,89 +1,901 @@
 # dominio/casos_uso.py
-from typing import Callable, List
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
 from functools import partial
+from concurrent.futures import Future, ThreadPoolExecutor, wait, FIRST_COMPLETED
 from returns.result import Result, Success, Failure
 from returns.pipeline import pipe
 from returns.curry import curry
 from returns.pointfree import bind, map_
 
-from servico_ia import ServicoIA
+from servico_ia import ServicoIA, descrever_em_fragmentos
+from cancelamento import TokenCancelamento
+from prazo import Prazo
+from estatisticas_latencia import HistoricoLatencias
+from preprocessamento_imagem import (
+    preprocessar_imagem, precisa_dividir, calcular_blocos, lado_blocos, abrir_imagem_inteira, recortar_bloco,
+    MAX_BLOCOS
+)
+from formato_imagem import identificar_formato
+from baixador_imagens import BaixadorImagens, eh_url_remota
+from divisor_frases import dividir_em_frases
+from metricas import medir_etapa
+from tratador_erros import classificar_excecao
 from entidades import (
     Imagem, Descricao, ProvedorIA, CaminhoImagem,
-    DescricaoImagem, ErroIA
+    DescricaoImagem, ErroIA, ModoFallback, CategoriaErro, NivelDetalhe, categoria_erro
 )
+from prompts import FORMATOS_JUNCAO, max_frases
 
-@curry
-def validar_imagem(caminho: str) -> Result[Imagem, str]:
-    """Valida se a imagem existe e está acessível."""
-    from pathlib import Path
-    
-    if not caminho:
-        return Failure('Caminho de imagem vazio')
+# Percentil da latência do serviço em andamento após o qual o próximo é disparado
+PERCENTIL_ESCALONAMENTO = 0.9
+# Atraso usado enquanto não há histórico de latência do provedor
+ATRASO_ESCALONAMENTO_PADRAO = 3.0
+ATRASO_ESCALONAMENTO_MINIMO = 0.5
+# Intervalo máximo entre verificações de cancelamento
+INTERVALO_VERIFICACAO = 0.1
+# Imagens descritas ao mesmo tempo num lote; o limite por provedor fica nos serviços
+MAX_DESCRICOES_SIMULTANEAS = 4
+# Origem registrada nas imagens capturadas da tela, que não têm arquivo
+ORIGEM_CAPTURA = 'captura de tela'
+# Falhas causadas pela própria imagem, que os demais provedores também recusariam
+CATEGORIAS_SEM_FALLBACK = {CategoriaErro.ENTRADA_INVALIDA}
+# Falhas de rede ou de tempo dos serviços remotos, após as quais o serviço
+# local, que não depende da rede, ainda é tentado
+CATEGORIAS_ULTIMO_RECURSO = {CategoriaErro.TRANSITORIO, CategoriaErro.TEMPO_ESGOTADO}
+# Fração do prazo dada aos blocos de uma imagem dividida; o resto fica para a junção
+FRACAO_PRAZO_BLOCOS = 0.7
+# Pool compartilhado pelos blocos de todos os pedidos: as threads de recorte
+# e envio ficam limitadas mesmo com várias imagens divididas ao mesmo tempo
+_EXECUTOR_BLOCOS = ThreadPoolExecutor(max_workers=MAX_BLOCOS, thread_name_prefix='CamilleBlocos')
+# Níveis da descrição em duas etapas: a resposta rápida falada de imediato
+# e a detalhada, gerada ao mesmo tempo e guardada para quando for pedida
+NIVEL_PRIMEIRA_ETAPA = NivelDetalhe.TEXTO_ALTERNATIVO
+NIVEL_SEGUNDA_ETAPA = NivelDetalhe.DETALHADO
+# Recebe a tarefa da descrição detalhada e a executa em segundo plano
+AgendarDetalhada = Callable[[Callable[[], Result[Descricao, str]]], None]
+# Instrução da chamada só de texto que junta as descrições dos blocos
+INSTRUCAO_JUNCAO = (
+    'As descrições abaixo são de partes consecutivas de uma mesma imagem, '
+    'em ordem de leitura (de cima para baixo e da esquerda para a direita), '
+    'e partes vizinhas se sobrepõem um pouco. Junte-as numa única descrição '
+    'da imagem inteira para uma pessoa com deficiência visual, sem repetir '
+    'o que aparece em mais de uma parte e sem mencionar as partes. {formato}\n\n{partes}'
+)
+
+def _ler_conteudo(
+    caminho: str,
+    baixador: Optional[BaixadorImagens],
+    prazo: Optional[Prazo]
+) -> Result[bytes, str]:
+    """Lê o arquivo local ou baixa a imagem remota."""
+    if eh_url_remota(caminho):
+        if baixador is None:
+            return Failure(f'Imagens remotas não são suportadas: {caminho}')
+        return baixador.baixar(caminho, prazo)
     
-    path = Path(caminho)
-    if not path.exists():
+    try:
+        with medir_etapa('leitura'):
+            with open(caminho, 'rb') as arquivo:
+                return Success(arquivo.read())
+    except FileNotFoundError:
         return Failure(f'Imagem não encontrada: {caminho}')
+    except OSError as e:
+        return Failure(f'Não foi possível ler a imagem: {str(e)}')
+
+def carregar_imagem_bytes(conteudo: bytes, origem: str = ORIGEM_CAPTURA) -> Result[Imagem, str]:
+    """
+    Cria a imagem a partir de bytes já em memória. O formato e as dimensões
+    vêm do conteúdo, não da extensão da origem.
+    """
+    from pathlib import PurePath
     
-    # Extensões de imagem suportadas
-    extensoes_validas = {'.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp'}
-    if not path.suffix.lower() in extensoes_validas:
-        return Failure(f'Formato de imagem não suportado: {path.suffix}')
+    # Formatos suportados: PNG, JPEG, GIF, BMP e WEBP
+    formato = identificar_formato(conteudo)
+    if formato is None:
+        return Failure(f'Formato de imagem não suportado: {PurePath(origem).suffix or origem}')
     
+    tipo, largura, altura = formato
     return Success(Imagem(
-        caminho=caminho,
-        tipo=path.suffix.lower()[1:],  # Remove o ponto da extensão
+        caminho=origem,
+        tipo=tipo,
+        largura=largura,
+        altura=altura,
+        conteudo=conteudo
     ))
 
 @curry
-def descrever_com_servico(
+def validar_imagem(
+    caminho: str,
+    baixador: Optional[BaixadorImagens] = None,
+    prazo: Optional[Prazo] = None
+) -> Result[Imagem, str]:
+    """
+    Valida se a imagem existe e está acessível e a lê uma única vez.
+    URLs http(s) são baixadas pelo baixador, dentro do prazo do pedido.
+    O formato e as dimensões vêm do conteúdo, não da extensão; os bytes
+    lidos são compartilhados pelo preprocessamento e por todas as tentativas.
+    """
+    if not caminho:
+        return Failure('Caminho de imagem vazio')
+    
+    return _ler_conteudo(caminho, baixador, prazo).bind(
+        lambda conteudo: carregar_imagem_bytes(conteudo, caminho)
+    )
+
+@curry
+def preparar_imagem_para_servico(
     servico_ia: ServicoIA,
     imagem: Imagem
+) -> Result[Imagem, str]:
+    """
+    Prepara a imagem conforme o perfil do serviço (redução e recodificação).
+    Falhas no preprocessamento não impedem a descrição: a original é enviada.
+    """
+    perfil = getattr(servico_ia, 'perfil_imagem', None)
+    if perfil is None or imagem.dados is not None:
+        return Success(imagem)
+    
+    with medir_etapa('preprocessamento', servico_ia.provedor) as medicao:
+        resultado = preprocessar_imagem(perfil, imagem)
+        medicao['sucesso'] = isinstance(resultado, Success)
+    return resultado.lash(lambda _: Success(imagem))
+
+def _enviar_ao_servico(
+    servico_ia: ServicoIA,
+    imagem: Imagem,
+    prazo: Optional[Prazo],
+    nivel: NivelDetalhe
+) -> Result[DescricaoImagem, ErroIA]:
+    """Envia os bytes já carregados, se houver, ou o caminho original."""
+    if imagem.bytes_envio is not None:
+        return servico_ia.descrever_imagem_bytes(imagem.bytes_envio, imagem.mime_type, prazo, nivel, imagem.resumo)
+    return servico_ia.descrever_imagem(CaminhoImagem(imagem.caminho), prazo, nivel)
+
+def _deve_dividir(servico_ia: ServicoIA, imagem: Imagem) -> bool:
+    """
+    Divide só imagens que perderiam detalhes demais inteiras, e só se a cota
+    do provedor comporta agora todos os blocos e a junção; senão, a imagem
+    vai inteira numa única requisição.
+    """
+    perfil = getattr(servico_ia, 'perfil_imagem', None)
+    if perfil is None or not precisa_dividir(perfil, imagem):
+        return False
+    comporta = getattr(servico_ia, 'comporta', None)
+    if comporta is None:
+        return True
+    lado = lado_blocos(perfil, imagem.largura, imagem.altura)
+    blocos = len(calcular_blocos(imagem.largura, imagem.altura, lado))
+    juncao = 1 if getattr(servico_ia, 'gerar_texto', None) is not None else 0
+    return comporta(blocos + juncao)
+
+def _enviar_bloco(
+    servico_ia: ServicoIA,
+    bloco: Imagem,
+    indice: int,
+    total: int,
+    prazo: Optional[Prazo],
+    nivel: NivelDetalhe
+) -> Result[DescricaoImagem, ErroIA]:
+    """Envia o bloco com a instrução que informa a parte da imagem, se o serviço a oferece."""
+    descrever_bloco = getattr(servico_ia, 'descrever_bloco_bytes', None)
+    if descrever_bloco is None:
+        return _enviar_ao_servico(servico_ia, bloco, prazo, nivel)
+    return descrever_bloco(bloco.bytes_envio, bloco.mime_type, indice, total, prazo, nivel, bloco.resumo)
+
+def _juntar_descricoes(
+    servico_ia: ServicoIA,
+    partes: List[Optional[DescricaoImagem]],
+    prazo: Optional[Prazo],
+    nivel: NivelDetalhe
+) -> Result[DescricaoImagem, ErroIA]:
+    """
+    Junta as descrições dos blocos numa chamada só de texto, se o serviço
+    a oferece; senão, ou se ela falhar, apenas as encadeia em ordem.
+    """
+    total = len(partes)
+    rotuladas = '\n\n'.join(
+        f'Parte {indice} de {total}: {parte if parte is not None else "não foi possível descrever."}'
+        for indice, parte in enumerate(partes, 1)
+    )
+    encadeadas = Success(DescricaoImagem(rotuladas))
+    
+    gerar_texto = getattr(servico_ia, 'gerar_texto', None)
+    if gerar_texto is None:
+        return encadeadas
+    
+    with medir_etapa('juncao_blocos', servico_ia.provedor, lote=total) as medicao:
+        instrucao = INSTRUCAO_JUNCAO.format(formato=FORMATOS_JUNCAO[nivel], partes=rotuladas)
+        resultado = gerar_texto(instrucao, prazo, nivel)
+        medicao['sucesso'] = isinstance(resultado, Success)
+    return resultado.map(DescricaoImagem).lash(lambda _: encadeadas)
+
+def descrever_em_blocos(
+    servico_ia: ServicoIA,
+    imagem: Imagem,
+    prazo: Optional[Prazo] = None,
+    nivel: NivelDetalhe = NivelDetalhe.DETALHADO,
+    cancelamento: Optional[TokenCancelamento] = None
+) -> Result[DescricaoImagem, ErroIA]:
+    """
+    Descreve uma imagem grande demais para o perfil do serviço: os blocos
+    sobrepostos são descritos ao mesmo tempo e as descrições parciais são
+    juntadas em ordem de leitura. O tempo total acompanha o bloco mais
+    lento, e não a área da imagem. Basta um bloco descrito para haver resposta.
+    Com o prazo dos blocos esgotado ou o pedido cancelado, os blocos que
+    ainda não começaram são descartados do pool compartilhado.
+    """
+    perfil = servico_ia.perfil_imagem
+    with medir_etapa('decodificacao_blocos', servico_ia.provedor) as medicao:
+        inteira = abrir_imagem_inteira(imagem)
+        medicao['sucesso'] = isinstance(inteira, Success)
+    if isinstance(inteira, Failure):
+        return Failure(ErroIA(inteira.failure()))
+    inteira = inteira.unwrap()
+    caixas = calcular_blocos(inteira.width, inteira.height, lado_blocos(perfil, inteira.width, inteira.height))
+    
+    def descrever_bloco(indice: int, caixa) -> Result[DescricaoImagem, ErroIA]:
+        # Cada bloco é recortado e codificado na própria thread, junto do envio
+        with medir_etapa('recorte_bloco', servico_ia.provedor):
+            bloco = recortar_bloco(perfil, inteira, caixa, f'{imagem.caminho}#bloco{indice}')
+        return bloco.alt(ErroIA).bind(
+            lambda preparado: _enviar_bloco(servico_ia, preparado, indice, len(caixas), prazo_blocos, nivel)
+        )
+    
+    prazo_blocos = Prazo(prazo.restante * FRACAO_PRAZO_BLOCOS) if prazo is not None else None
+    futuros = [
+        _EXECUTOR_BLOCOS.submit(descrever_bloco, indice, caixa)
+        for indice, caixa in enumerate(caixas, 1)
+    ]
+    try:
+        pendentes = set(futuros)
+        while pendentes:
+            if cancelamento is not None and cancelamento.cancelado:
+                return Failure(ErroIA('Descrição cancelada'))
+            if prazo_blocos is not None and prazo_blocos.expirado:
+                break
+            espera = INTERVALO_VERIFICACAO
+            if prazo_blocos is not None:
+                espera = min(espera, prazo_blocos.restante)
+            _, pendentes = wait(pendentes, timeout=espera)
+    finally:
+        for futuro in futuros:
+            futuro.cancel()
+    
+    # Blocos ainda sem resposta no fim do prazo entram na junção como não descritos
+    resultados = [
+        futuro.result() if futuro.done() and not futuro.cancelled() else None
+        for futuro in futuros
+    ]
+    partes = [resultado.value_or(None) if resultado is not None else None for resultado in resultados]
+    if all(parte is None for parte in partes):
+        falhas = [resultado for resultado in resultados if resultado is not None]
+        if falhas:
+            return falhas[-1]
+        return Failure(ErroIA(
+            f'{servico_ia.provedor.name}: nenhum bloco descrito dentro do prazo',
+            CategoriaErro.TEMPO_ESGOTADO
+        ))
+    return _juntar_descricoes(servico_ia, partes, prazo, nivel)
+
+@curry
+def descrever_com_servico(
+    servico_ia: ServicoIA,
+    imagem: Imagem,
+    prazo: Optional[Prazo] = None,
+    nivel: NivelDetalhe = NivelDetalhe.DETALHADO,
+    cancelamento: Optional[TokenCancelamento] = None
 ) -> Result[Descricao, str]:
-    """Obtém descrição da imagem usando o serviço especificado."""
-    return servico_ia.descrever_imagem(CaminhoImagem(imagem.caminho)).map(
-        lambda descricao: Descricao(
-            texto=descricao,
-            provedor=getattr(servico_ia, 'provedor', ProvedorIA.OCR)
+    """Obtém descrição da imagem usando o serviço especificado, no nível de detalhe pedido."""
+    if prazo is not None and prazo.expirado:
+        return Failure(ErroIA(
+            f'{servico_ia.provedor.name}: sem tempo restante para a tentativa',
+            CategoriaErro.TEMPO_ESGOTADO
+        ))
+    
+    with medir_etapa('tentativa', servico_ia.provedor) as medicao:
+        if _deve_dividir(servico_ia, imagem):
+            enviada = descrever_em_blocos(servico_ia, imagem, prazo, nivel, cancelamento)
+        else:
+            enviada = preparar_imagem_para_servico(servico_ia, imagem).bind(
+                lambda preparada: _enviar_ao_servico(servico_ia, preparada, prazo, nivel)
+            )
+        resultado = enviada.map(
+            lambda descricao: Descricao(
+                texto=descricao,
+                provedor=servico_ia.provedor
+            )
         )
-    )
+        medicao['sucesso'] = isinstance(resultado, Success)
+    return resultado
 
 @curry
 def tentar_servicos_alternativos(
     servicos: List[ServicoIA],
     erro: str,
-    imagem: Imagem
+    imagem: Imagem,
+    cancelamento: Optional[TokenCancelamento] = None,
+    prazo: Optional[Prazo] = None,
+    esgotados: Tuple[str, ...] = (),
+    nivel: NivelDetalhe = NivelDetalhe.DETALHADO
 ) -> Result[Descricao, str]:
-    """Tenta serviços alternativos em caso de falha no serviço primário."""
+    """
+    Tenta serviços alternativos em caso de falha no serviço primário.
+    Com prazo, a tentativa atual recebe a maior parte do tempo restante
+    (FRACAO_TENTATIVA_ATUAL) e a última recebe tudo o que sobrou; esgotados
+    acumula os provedores que ficaram sem resposta a tempo.
+    Se a imagem foi recusada pelo provedor, os demais não são tentados.
+    """
+    if cancelamento is not None and cancelamento.cancelado:
+        return Failure('Descrição cancelada')
+    
+    if _dispensa_fallback(erro):
+        return Failure(erro)
+    
     if not servicos:
-        return Failure(f'Todos os serviços falharam. Último erro: {erro}')
+        if esgotados:
+            return Failure(_mensagem_prazo_esgotado(prazo, esgotados, erro))
+        return Failure(_mensagem_todos_falharam(erro))
     
     # Tenta o próximo serviço na lista
     servico = servicos[0]
-    return descrever_com_servico(servico, imagem).lash(
+    orcamento = prazo.dividir(len(servicos)) if prazo is not None else None
+    return descrever_com_servico(servico, imagem, orcamento, nivel, cancelamento).lash(
         lambda novo_erro: tentar_servicos_alternativos(
             servicos[1:], 
             novo_erro, 
-            imagem
+            imagem,
+            cancelamento,
+            prazo,
+            esgotados + _tentativa_esgotada(servico, orcamento),
+            nivel
         )
     )
 
+def _dispensa_fallback(erro: str) -> bool:
+    """Indica se recorrer a outro provedor seria inútil para este erro."""
+    return categoria_erro(erro) in CATEGORIAS_SEM_FALLBACK
+
+def _tentativa_esgotada(servico: ServicoIA, orcamento: Optional[Prazo]) -> Tuple[str, ...]:
+    """Nome do provedor, se a tentativa terminou por falta de tempo."""
+    if orcamento is not None and orcamento.expirado:
+        return (servico.provedor.name,)
+    return ()
+
+def _mensagem_prazo_esgotado(
+    prazo: Optional[Prazo],
+    esgotados: Sequence[str],
+    ultimo_erro: str
+) -> ErroIA:
+    limite = f' de {prazo.segundos:g} segundos' if prazo is not None else ''
+    return ErroIA(
+        f'Tempo limite{limite} esgotado. Sem resposta a tempo: '
+        f'{", ".join(esgotados)}. Último erro: {ultimo_erro}',
+        CategoriaErro.TEMPO_ESGOTADO
+    )
+
+def _mensagem_todos_falharam(ultimo_erro: str) -> ErroIA:
+    """A categoria do último erro segue com a mensagem, para decidir o último recurso."""
+    return ErroIA(f'Todos os serviços falharam. Último erro: {ultimo_erro}', categoria_erro(ultimo_erro))
+
+def recorrer_ao_ultimo_recurso(
+    servico_local: Optional[ServicoIA],
+    erro: str,
+    imagem: Imagem,
+    cancelamento: Optional[TokenCancelamento] = None,
+    prazo: Optional[Prazo] = None,
+    nivel: NivelDetalhe = NivelDetalhe.DETALHADO
+) -> Result[Descricao, str]:
+    """
+    Tenta o serviço local depois que todos os remotos falharam por rede ou
+    por tempo, com o que resta do prazo. Ele fica fora da divisão do prazo
+    entre os remotos. Se ele também falhar, vale o erro dos remotos.
+    """
+    if (
+        servico_local is None or
+        (cancelamento is not None and cancelamento.cancelado) or
+        categoria_erro(erro) not in CATEGORIAS_ULTIMO_RECURSO
+    ):
+        return Failure(erro)
+    return descrever_com_servico(servico_local, imagem, prazo, nivel, cancelamento).lash(lambda _: Failure(erro))
+
+def _atraso_escalonamento(
+    servico: ServicoIA,
+    historico: Optional[HistoricoLatencias]
+) -> float:
+    """Tempo de espera pelo serviço antes de disparar o próximo em paralelo."""
+    atraso = None
+    if historico is not None:
+        atraso = historico.percentil(servico.provedor, PERCENTIL_ESCALONAMENTO)
+    if atraso is None:
+        return ATRASO_ESCALONAMENTO_PADRAO
+    return max(atraso, ATRASO_ESCALONAMENTO_MINIMO)
+
+def tentar_servicos_concorrentes(
+    servicos: List[ServicoIA],
+    imagem: Imagem,
+    modo: ModoFallback,
+    historico: Optional[HistoricoLatencias] = None,
+    cancelamento: Optional[TokenCancelamento] = None,
+    prazo: Optional[Prazo] = None,
+    nivel: NivelDetalhe = NivelDetalhe.DETALHADO
+) -> Result[Descricao, str]:
+    """
+    Tenta os serviços em paralelo; a primeira descrição bem-sucedida vence
+    e uma imagem recusada encerra o pedido.
+    No modo ESCALONADO o próximo serviço é disparado quando o atual falha ou
+    excede o percentil de latência aprendido; no modo CORRIDA todos são
+    disparados de imediato. As respostas dos demais serviços são ignoradas.
+    Como as tentativas correm em paralelo, todas compartilham o mesmo prazo.
+    O histórico de latências é apenas consultado; quem o alimenta é o
+    MonitorSaude, a cada chamada aos serviços monitorados.
+    """
+    if not servicos:
+        return Failure('Nenhum serviço de descrição disponível')
+    
+    executor = ThreadPoolExecutor(
+        max_workers=len(servicos),
+        thread_name_prefix='CamilleFallback'
+    )
+    pendentes: Dict[Future, ServicoIA] = {}
+    proximo = 0
+    ultimo_erro = ''
+    esgotados: List[str] = []
+    
+    def disparar_proximo() -> float:
+        nonlocal proximo
+        servico = servicos[proximo]
+        proximo += 1
+        pendentes[executor.submit(descrever_com_servico, servico, imagem, prazo, nivel, cancelamento)] = servico
+        return time.monotonic() + _atraso_escalonamento(servico, historico)
+    
+    try:
+        escalonar_em = disparar_proximo()
+        while modo == ModoFallback.CORRIDA and proximo < len(servicos):
+            disparar_proximo()
+        
+        while pendentes:
+            if cancelamento is not None and cancelamento.cancelado:
+                return Failure('Descrição cancelada')
+            if prazo is not None and prazo.expirado:
+                esgotados.extend(servico.provedor.name for servico in pendentes.values())
+                return Failure(_mensagem_prazo_esgotado(prazo, esgotados, ultimo_erro))
+            
+            espera = INTERVALO_VERIFICACAO
+            if proximo < len(servicos):
+                espera = max(0.0, min(escalonar_em - time.monotonic(), espera))
+            concluidos, _ = wait(pendentes, timeout=espera, return_when=FIRST_COMPLETED)
+            
+            for futuro in concluidos:
+                servico = pendentes.pop(futuro)
+                resultado = futuro.result()
+                if isinstance(resultado, Success):
+                    return resultado
+                ultimo_erro = resultado.failure()
+                if _dispensa_fallback(ultimo_erro):
+                    return resultado
+                if prazo is not None and prazo.expirado:
+                    esgotados.append(servico.provedor.name)
+            
+            # Dispara o próximo serviço por falha de todos os pendentes ou por demora
+            if proximo < len(servicos) and (
+                not pendentes or time.monotonic() >= escalonar_em
+            ):
+                escalonar_em = disparar_proximo()
+        
+        if esgotados:
+            return Failure(_mensagem_prazo_esgotado(prazo, esgotados, ultimo_erro))
+        return Failure(_mensagem_todos_falharam(ultimo_erro))
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
 @curry
 def gerar_descricao_imagem(
     servico_primario: ServicoIA,
     servicos_alternativos: List[ServicoIA],
-    caminho_imagem: str
+    caminho_imagem: str,
+    cancelamento: Optional[TokenCancelamento] = None,
+    modo_fallback: ModoFallback = ModoFallback.SEQUENCIAL,
+    historico: Optional[HistoricoLatencias] = None,
+    prazo: Optional[Prazo] = None,
+    baixador: Optional[BaixadorImagens] = None,
+    nivel: NivelDetalhe = NivelDetalhe.DETALHADO,
+    agendar_detalhada: Optional[AgendarDetalhada] = None,
+    ultimo_recurso: Optional[ServicoIA] = None
 ) -> Result[Descricao, str]:
-    """Caso de uso: gera descrição para uma imagem com fallback."""
-    pipeline = pipe(
-        validar_imagem,
-        bind(descrever_com_servico(servico_primario)),
-        lambda result: result.lash(
-            lambda erro: tentar_servicos_alternativos(
-                servicos_alternativos, 
-                erro, 
-                result.unwrap() if result.is_success() else Imagem(caminho_imagem, "")
+    """
+    Caso de uso: gera descrição para uma imagem com fallback.
+    Se um token de cancelamento for informado, nenhum serviço alternativo
+    é chamado depois que o pedido for cancelado. O prazo limita o tempo
+    total do pedido, somando o download, o primário e todos os alternativos.
+    Com agendar_detalhada, a descrição é feita em duas etapas: retorna o
+    texto alternativo e entrega a ele a tarefa da descrição detalhada, para
+    rodar em segundo plano. Se a imagem não puder ser carregada, a tarefa
+    não é entregue. O ultimo_recurso (o modelo local) só é tentado se os
+    demais falharem por rede ou por tempo.
+    """
+    return _gerar_descricao(
+        [servico_primario] + list(servicos_alternativos),
+        caminho_imagem,
+        lambda caminho: validar_imagem(caminho, baixador, prazo),
+        cancelamento,
+        modo_fallback,
+        historico,
+        prazo,
+        nivel,
+        agendar_detalhada,
+        ultimo_recurso
+    )
+
+@curry
+def gerar_descricao_imagem_bytes(
+    servico_primario: ServicoIA,
+    servicos_alternativos: List[ServicoIA],
+    conteudo_imagem: bytes,
+    cancelamento: Optional[TokenCancelamento] = None,
+    modo_fallback: ModoFallback = ModoFallback.SEQUENCIAL,
+    historico: Optional[HistoricoLatencias] = None,
+    prazo: Optional[Prazo] = None,
+    nivel: NivelDetalhe = NivelDetalhe.DETALHADO,
+    agendar_detalhada: Optional[AgendarDetalhada] = None,
+    ultimo_recurso: Optional[ServicoIA] = None
+) -> Result[Descricao, str]:
+    """
+    Caso de uso: gera descrição com fallback para uma imagem já em memória,
+    como uma captura de tela. Nada é lido nem gravado em disco.
+    """
+    return _gerar_descricao(
+        [servico_primario] + list(servicos_alternativos),
+        conteudo_imagem,
+        carregar_imagem_bytes,
+        cancelamento,
+        modo_fallback,
+        historico,
+        prazo,
+        nivel,
+        agendar_detalhada,
+        ultimo_recurso
+    )
+
+def _gerar_descricao(
+    servicos: List[ServicoIA],
+    origem: Any,
+    carregar: Callable[[Any], Result[Imagem, str]],
+    cancelamento: Optional[TokenCancelamento],
+    modo_fallback: ModoFallback,
+    historico: Optional[HistoricoLatencias],
+    prazo: Optional[Prazo],
+    nivel: NivelDetalhe,
+    agendar_detalhada: Optional[AgendarDetalhada] = None,
+    ultimo_recurso: Optional[ServicoIA] = None
+) -> Result[Descricao, str]:
+    """Carrega a imagem da origem e a descreve com fallback, em uma ou duas etapas."""
+    def descrever_com_fallback(
+        imagem: Imagem,
+        nivel: NivelDetalhe,
+        prazo: Optional[Prazo]
+    ) -> Result[Descricao, str]:
+        if modo_fallback != ModoFallback.SEQUENCIAL:
+            resultado = tentar_servicos_concorrentes(
+                servicos,
+                imagem,
+                modo_fallback,
+                historico,
+                cancelamento,
+                prazo,
+                nivel
             )
+        else:
+            resultado = tentar_servicos_alternativos(servicos, '', imagem, cancelamento, prazo, nivel=nivel)
+        return resultado.lash(
+            lambda erro: recorrer_ao_ultimo_recurso(ultimo_recurso, erro, imagem, cancelamento, prazo, nivel)
+        )
+    
+    def descrever(imagem: Imagem) -> Result[Descricao, str]:
+        if agendar_detalhada is None:
+            return descrever_com_fallback(imagem, nivel, prazo)
+        
+        # A segunda etapa tem prazo próprio, do mesmo tamanho, e passa pelo
+        # cache dos serviços; a primeira segue com o prazo do pedido
+        prazo_detalhada = Prazo(prazo.segundos) if prazo is not None else None
+        agendar_detalhada(
+            lambda: _descrever_segunda_etapa(
+                lambda: descrever_com_fallback(imagem, NIVEL_SEGUNDA_ETAPA, prazo_detalhada)
+            )
+        )
+        return descrever_com_fallback(imagem, NIVEL_PRIMEIRA_ETAPA, prazo)
+    
+    pipeline = pipe(
+        carregar,
+        bind(descrever)
+    )
+    
+    with medir_etapa('pedido') as medicao:
+        resultado = pipeline(origem)
+        _registrar_desfecho(medicao, resultado)
+    return resultado
+
+def _descrever_segunda_etapa(descrever: Callable[[], Result[Descricao, str]]) -> Result[Descricao, str]:
+    """Gera a descrição detalhada, medida à parte do pedido da resposta rápida."""
+    with medir_etapa('segunda_etapa') as medicao:
+        resultado = descrever()
+        _registrar_desfecho(medicao, resultado)
+    return resultado
+
+def _registrar_desfecho(medicao: Dict[str, object], resultado: Result[Descricao, str]) -> None:
+    """Anota na medição do pedido se ele teve sucesso e qual provedor respondeu."""
+    medicao['sucesso'] = isinstance(resultado, Success)
+    if isinstance(resultado, Success):
+        medicao['provedor_final'] = resultado.unwrap().provedor.name
+
+def gerar_descricoes_em_lote(
+    servico_primario: ServicoIA,
+    servicos_alternativos: List[ServicoIA],
+    caminhos_imagens: Sequence[str],
+    ao_concluir_imagem: Callable[[int, Result[Descricao, str]], None],
+    cancelamento: Optional[TokenCancelamento] = None,
+    modo_fallback: ModoFallback = ModoFallback.SEQUENCIAL,
+    historico: Optional[HistoricoLatencias] = None,
+    segundos_por_imagem: Optional[float] = None,
+    max_simultaneas: int = MAX_DESCRICOES_SIMULTANEAS,
+    baixador: Optional[BaixadorImagens] = None,
+    nivel: NivelDetalhe = NivelDetalhe.DETALHADO,
+    ultimo_recurso: Optional[ServicoIA] = None
+) -> Result[int, str]:
+    """
+    Caso de uso: descreve várias imagens em paralelo, com no máximo
+    max_simultaneas ao mesmo tempo. As imagens começam na ordem recebida,
+    que deve ser a de prioridade, e cada resultado é entregue a
+    ao_concluir_imagem (com o índice da imagem) assim que fica pronto.
+    Cada imagem tem prazo próprio, contado a partir do início da descrição
+    dela. Retorna quantas imagens foram descritas com sucesso.
+    """
+    if not caminhos_imagens:
+        return Failure('Nenhuma imagem para descrever')
+    
+    def descrever(indice: int) -> Result[Descricao, str]:
+        if cancelamento is not None and cancelamento.cancelado:
+            return Failure('Descrição cancelada')
+        prazo = Prazo(segundos_por_imagem) if segundos_por_imagem is not None else None
+        resultado = gerar_descricao_imagem(
+            servico_primario,
+            servicos_alternativos,
+            caminhos_imagens[indice],
+            cancelamento,
+            modo_fallback,
+            historico,
+            prazo,
+            baixador,
+            nivel,
+            ultimo_recurso=ultimo_recurso
+        )
+        if cancelamento is None or not cancelamento.cancelado:
+            ao_concluir_imagem(indice, resultado)
+        return resultado
+    
+    executor = ThreadPoolExecutor(
+        max_workers=max(1, min(max_simultaneas, len(caminhos_imagens))),
+        thread_name_prefix='CamilleLote'
+    )
+    try:
+        pendentes = {executor.submit(descrever, indice) for indice in range(len(caminhos_imagens))}
+        descritas = 0
+        while pendentes:
+            if cancelamento is not None and cancelamento.cancelado:
+                return Failure('Descrição cancelada')
+            concluidos, pendentes = wait(pendentes, timeout=INTERVALO_VERIFICACAO, return_when=FIRST_COMPLETED)
+            for futuro in concluidos:
+                if isinstance(futuro.result(), Success):
+                    descritas += 1
+        return Success(descritas)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+def _interromper_se_cancelado(
+    fragmentos: Iterator[str],
+    cancelamento: Optional[TokenCancelamento]
+) -> Iterator[str]:
+    """Para de consumir o fluxo assim que o pedido é cancelado."""
+    for fragmento in fragmentos:
+        if cancelamento is not None and cancelamento.cancelado:
+            return
+        yield fragmento
+
+def descrever_em_fluxo_com_servico(
+    servico_ia: ServicoIA,
+    imagem: Imagem,
+    ao_receber_frase: Callable[[str], None],
+    cancelamento: Optional[TokenCancelamento] = None,
+    prazo: Optional[Prazo] = None,
+    nivel: NivelDetalhe = NivelDetalhe.DETALHADO
+) -> Result[Descricao, str]:
+    """
+    Descreve a imagem em fluxo, entregando cada frase assim que ela termina.
+    O cancelamento fecha o fluxo, o que encerra a geração no provedor; o
+    mesmo acontece quando o nível de detalhe atinge seu limite de frases.
+    Imagens divididas em blocos só têm texto após a junção, entregue de uma vez.
+    """
+    limite_frases = max_frases(nivel)
+    
+    def consumir(fragmentos: Iterator[str]) -> Result[Descricao, str]:
+        partes: List[str] = []
+        entregues: List[str] = []
+        
+        def acumular() -> Iterator[str]:
+            for fragmento in _interromper_se_cancelado(fragmentos, cancelamento):
+                partes.append(fragmento)
+                yield fragmento
+        
+        frases = dividir_em_frases(acumular())
+        try:
+            for frase in frases:
+                ao_receber_frase(frase)
+                entregues.append(frase)
+                if limite_frases is not None and len(entregues) >= limite_frases:
+                    # O texto já recebido além das frases entregues é descartado
+                    partes[:] = [' '.join(entregues)]
+                    break
+        except Exception as e:
+            return Failure(classificar_excecao(e, 'Erro durante a descrição em fluxo'))
+        finally:
+            frases.close()
+            fechar = getattr(fragmentos, 'close', None)
+            if fechar is not None:
+                fechar()
+        
+        if cancelamento is not None and cancelamento.cancelado:
+            return Failure('Descrição cancelada')
+        if not partes:
+            return Failure(ErroIA('Resposta vazia do serviço'))
+        return Success(Descricao(texto=''.join(partes), provedor=servico_ia.provedor))
+    
+    def iniciar_fluxo(preparada: Imagem) -> Result[Iterator[str], ErroIA]:
+        dados = preparada.bytes_envio
+        if dados is None:
+            try:
+                with open(preparada.caminho, 'rb') as arquivo:
+                    dados = arquivo.read()
+            except OSError as e:
+                return Failure(ErroIA(f'Não foi possível ler a imagem: {str(e)}'))
+            return descrever_em_fragmentos(servico_ia, dados, preparada.mime_type, prazo, nivel)
+        return descrever_em_fragmentos(servico_ia, dados, preparada.mime_type, prazo, nivel, preparada.resumo)
+    
+    if _deve_dividir(servico_ia, imagem):
+        return descrever_em_blocos(servico_ia, imagem, prazo, nivel, cancelamento).map(
+            lambda texto: iter([texto])
+        ).bind(
+            consumir
         )
+    
+    return preparar_imagem_para_servico(servico_ia, imagem).bind(
+        iniciar_fluxo
+    ).bind(
+        consumir
+    )
+
+@curry
+def gerar_descricao_imagem_em_fluxo(
+    servico_primario: ServicoIA,
+    servicos_alternativos: List[ServicoIA],
+    caminho_imagem: str,
+    ao_receber_frase: Callable[[str], None],
+    cancelamento: Optional[TokenCancelamento] = None,
+    modo_fallback: ModoFallback = ModoFallback.SEQUENCIAL,
+    historico: Optional[HistoricoLatencias] = None,
+    prazo: Optional[Prazo] = None,
+    baixador: Optional[BaixadorImagens] = None,
+    nivel: NivelDetalhe = NivelDetalhe.DETALHADO,
+    ultimo_recurso: Optional[ServicoIA] = None
+) -> Result[Descricao, str]:
+    """
+    Caso de uso: descreve a imagem em fluxo com o serviço primário, falando
+    cada frase assim que ela fica completa. Se o primário falhar antes da
+    primeira frase, os alternativos são tentados conforme o modo de fallback
+    e a descrição completa é entregue de uma vez.
+    """
+    return _gerar_descricao_em_fluxo(
+        servico_primario,
+        servicos_alternativos,
+        caminho_imagem,
+        lambda caminho: validar_imagem(caminho, baixador, prazo),
+        ao_receber_frase,
+        cancelamento,
+        modo_fallback,
+        historico,
+        prazo,
+        nivel,
+        ultimo_recurso
+    )
+
+@curry
+def gerar_descricao_imagem_bytes_em_fluxo(
+    servico_primario: ServicoIA,
+    servicos_alternativos: List[ServicoIA],
+    conteudo_imagem: bytes,
+    ao_receber_frase: Callable[[str], None],
+    cancelamento: Optional[TokenCancelamento] = None,
+    modo_fallback: ModoFallback = ModoFallback.SEQUENCIAL,
+    historico: Optional[HistoricoLatencias] = None,
+    prazo: Optional[Prazo] = None,
+    nivel: NivelDetalhe = NivelDetalhe.DETALHADO,
+    ultimo_recurso: Optional[ServicoIA] = None
+) -> Result[Descricao, str]:
+    """Caso de uso: descrição em fluxo de uma imagem já em memória, como uma captura de tela."""
+    return _gerar_descricao_em_fluxo(
+        servico_primario,
+        servicos_alternativos,
+        conteudo_imagem,
+        carregar_imagem_bytes,
+        ao_receber_frase,
+        cancelamento,
+        modo_fallback,
+        historico,
+        prazo,
+        nivel,
+        ultimo_recurso
     )
+
+def _gerar_descricao_em_fluxo(
+    servico_primario: ServicoIA,
+    servicos_alternativos: List[ServicoIA],
+    origem: Any,
+    carregar: Callable[[Any], Result[Imagem, str]],
+    ao_receber_frase: Callable[[str], None],
+    cancelamento: Optional[TokenCancelamento],
+    modo_fallback: ModoFallback,
+    historico: Optional[HistoricoLatencias],
+    prazo: Optional[Prazo],
+    nivel: NivelDetalhe,
+    ultimo_recurso: Optional[ServicoIA] = None
+) -> Result[Descricao, str]:
+    frases_entregues = 0
+    orcamento_primario: Optional[Prazo] = None
+    
+    inicio = time.perf_counter()
+    
+    def entregar(frase: str) -> None:
+        nonlocal frases_entregues
+        if not frases_entregues:
+            medicao['primeira_frase_ms'] = round((time.perf_counter() - inicio) * 1000, 1)
+        frases_entregues += 1
+        ao_receber_frase(frase)
+    
+    def entregar_completa(descricao: Descricao) -> Descricao:
+        ao_receber_frase(descricao.texto)
+        return descricao
+    
+    def recorrer_aos_alternativos(erro: str, imagem: Imagem) -> Result[Descricao, str]:
+        # Com parte da descrição já falada, recomeçar em outro serviço confundiria
+        if frases_entregues or (cancelamento is not None and cancelamento.cancelado) or _dispensa_fallback(erro):
+            return Failure(erro)
+        
+        if modo_fallback == ModoFallback.SEQUENCIAL or not servicos_alternativos:
+            resultado = tentar_servicos_alternativos(
+                servicos_alternativos, erro, imagem, cancelamento, prazo,
+                _tentativa_esgotada(servico_primario, orcamento_primario), nivel
+            )
+        else:
+            resultado = tentar_servicos_concorrentes(
+                list(servicos_alternativos), imagem, modo_fallback, historico, cancelamento, prazo, nivel
+            )
+        return resultado.lash(
+            lambda erro_alternativos: recorrer_ao_ultimo_recurso(
+                ultimo_recurso, erro_alternativos, imagem, cancelamento, prazo, nivel
+            )
+        ).map(entregar_completa)
+    
+    def descrever(imagem: Imagem) -> Result[Descricao, str]:
+        nonlocal orcamento_primario
+        # Repartido só depois do download, que já consumiu parte do prazo
+        if prazo is not None:
+            orcamento_primario = prazo.dividir(1 + len(servicos_alternativos))
+        return descrever_em_fluxo_com_servico(
+            servico_primario, imagem, entregar, cancelamento, orcamento_primario, nivel
+        ).lash(
+            lambda erro: recorrer_aos_alternativos(erro, imagem)
+        )
     
-    return pipeline(caminho_imagem)
\ No newline at end of file
+    with medir_etapa('pedido_fluxo') as medicao:
+        resultado = carregar(origem).bind(descrever)
+        _registrar_desfecho(medicao, resultado)
+    return resultado
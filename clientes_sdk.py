@@ -0,0 +1,100 @@
+# infraestrutura/clientes_sdk.py
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from entidades import ProvedorIA
+from metricas import medir_etapa
+
+# Conexões do cliente HTTP compartilhado pelos SDKs
+MAX_CONEXOES = 16
+MAX_CONEXOES_OCIOSAS = 8
+# Tempo que uma conexão ociosa fica no pool; os servidores das APIs a mantêm por alguns minutos
+TEMPO_CONEXAO_OCIOSA = 120.0
+# Timeout das requisições feitas sem prazo e do estabelecimento da conexão
+TIMEOUT_PADRAO = 60.0
+TIMEOUT_CONEXAO = 10.0
+
+# Cria o cliente do SDK a partir da chave de API e do cliente HTTP compartilhado
+FabricaCliente = Callable[[str, Any], Any]
+
+class GerenciadorClientes:
+    """
+    Mantém um cliente de SDK por provedor, de vida longa, todos sobre um
+    mesmo cliente HTTP com pool de conexões. Um cliente só é recriado quando
+    a chave do seu provedor muda; salvar as configurações com as mesmas
+    chaves reaproveita clientes e conexões. As conexões podem ser abertas
+    antecipadamente, para que a primeira descrição não pague DNS, TCP e TLS.
+    """
+
+    def __init__(self):
+        self._http = None
+        # provedor -> (chave de API, cliente do SDK)
+        self._clientes: Dict[ProvedorIA, Tuple[str, Any]] = {}
+        self._trava = threading.Lock()
+
+    @property
+    def http(self):
+        """
+        Cliente HTTP compartilhado, criado no primeiro uso. O httpx só é
+        importado aqui, para não pesar na inicialização do NVDA.
+        """
+        if self._http is None:
+            with self._trava:
+                if self._http is None:
+                    import httpx
+
+                    self._http = httpx.Client(
+                        limits=httpx.Limits(
+                            max_connections=MAX_CONEXOES,
+                            max_keepalive_connections=MAX_CONEXOES_OCIOSAS,
+                            keepalive_expiry=TEMPO_CONEXAO_OCIOSA
+                        ),
+                        timeout=httpx.Timeout(TIMEOUT_PADRAO, connect=TIMEOUT_CONEXAO)
+                    )
+        return self._http
+
+    def obter(self, provedor: ProvedorIA, chave_api: str, criar: FabricaCliente) -> Optional[Any]:
+        """Cliente do provedor para a chave; None se ele não puder ser criado."""
+        if not chave_api:
+            return None
+        existente = self._clientes.get(provedor)
+        if existente is not None and existente[0] == chave_api:
+            return existente[1]
+
+        http = self.http
+        with self._trava:
+            existente = self._clientes.get(provedor)
+            if existente is not None and existente[0] == chave_api:
+                return existente[1]
+            try:
+                with medir_etapa('criacao_cliente', provedor):
+                    cliente = criar(chave_api, http)
+            except Exception:
+                return None
+            self._clientes[provedor] = (chave_api, cliente)
+            return cliente
+
+    def aquecer(self, provedor: ProvedorIA, chave_api: str, criar: FabricaCliente, url: str) -> None:
+        """
+        Em segundo plano, cria o cliente (o que importa o SDK) e abre uma
+        conexão com a API, que fica no pool para a primeira descrição.
+        """
+        def aquecer_conexao() -> None:
+            if self.obter(provedor, chave_api, criar) is None:
+                return
+            try:
+                # Qualquer resposta serve: o que importa é a conexão TLS aberta
+                with medir_etapa('aquecimento', provedor):
+                    self.http.head(url, timeout=TIMEOUT_CONEXAO)
+            except Exception:
+                pass
+
+        threading.Thread(target=aquecer_conexao, name='Camille-aquecimento', daemon=True).start()
+
+    def fechar(self) -> None:
+        """Descarta os clientes e fecha as conexões abertas."""
+        with self._trava:
+            self._clientes.clear()
+            http, self._http = self._http, None
+        if http is not None:
+            http.close()
@@ -0,0 +1,152 @@
+# infraestrutura/deduplicacao_pedidos.py
+import hashlib
+import threading
+from concurrent.futures import Future, TimeoutError as TempoEsgotado
+from typing import Callable, Dict, Iterator, Optional
+from returns.result import Result, Success, Failure
+
+from entidades import CaminhoImagem, CategoriaErro, DescricaoImagem, ErroIA, NivelDetalhe, categoria_erro
+from servico_ia import ServicoIA, DecoradorServicoIA, descrever_em_fragmentos
+from cache_descricoes import calcular_chave_cache, parametros_requisicao
+from formato_imagem import tipo_mime
+from metricas import medir_etapa
+from prazo import Prazo
+
+class ServicoIADeduplicado(DecoradorServicoIA):
+    """
+    Decorador que junta pedidos simultâneos da mesma descrição: o primeiro
+    chama o serviço e os que chegam enquanto ele está em andamento aguardam
+    o mesmo resultado, em vez de repetir a chamada ao provedor. A chave é a
+    do cache (conteúdo da imagem, provedor, modelo e instrução do nível).
+    Deve envolver o cache, para que só as faltas sejam compartilhadas.
+    """
+
+    def __init__(self, servico: ServicoIA):
+        super().__init__(servico)
+        # chave -> resultado do pedido em andamento
+        self._em_andamento: Dict[str, 'Future[Result[DescricaoImagem, ErroIA]]'] = {}
+        self._trava = threading.Lock()
+
+    def descrever_imagem(
+        self,
+        caminho_imagem: CaminhoImagem,
+        prazo: Optional[Prazo] = None,
+        nivel: NivelDetalhe = NivelDetalhe.DETALHADO
+    ) -> Result[DescricaoImagem, ErroIA]:
+        """
+        Imagens locais são identificadas pelo conteúdo, e os bytes lidos
+        seguem para o serviço com o resumo calculado aqui; URLs vão direto a ele.
+        """
+        if caminho_imagem.startswith(('http://', 'https://')):
+            return self.servico.descrever_imagem(caminho_imagem, prazo, nivel)
+
+        try:
+            with open(caminho_imagem, 'rb') as arquivo:
+                imagem_bytes = arquivo.read()
+        except OSError:
+            return self.servico.descrever_imagem(caminho_imagem, prazo, nivel)
+
+        resumo = hashlib.sha256(imagem_bytes).digest()
+        return self._compartilhar(
+            self._calcular_chave(imagem_bytes, resumo, nivel),
+            prazo,
+            lambda: self.servico.descrever_imagem_bytes(imagem_bytes, tipo_mime(imagem_bytes), prazo, nivel, resumo)
+        )
+
+    def descrever_imagem_bytes(
+        self,
+        imagem_bytes: bytes,
+        mime_type: str,
+        prazo: Optional[Prazo] = None,
+        nivel: NivelDetalhe = NivelDetalhe.DETALHADO,
+        resumo: Optional[bytes] = None
+    ) -> Result[DescricaoImagem, ErroIA]:
+        return self._compartilhar(
+            self._calcular_chave(imagem_bytes, resumo, nivel),
+            prazo,
+            lambda: self.servico.descrever_imagem_bytes(imagem_bytes, mime_type, prazo, nivel, resumo)
+        )
+
+    def descrever_imagem_bytes_stream(
+        self,
+        imagem_bytes: bytes,
+        mime_type: str,
+        prazo: Optional[Prazo] = None,
+        nivel: NivelDetalhe = NivelDetalhe.DETALHADO,
+        resumo: Optional[bytes] = None
+    ) -> Result[Iterator[str], ErroIA]:
+        """
+        Se a mesma descrição já está sendo gerada (por exemplo, pelo
+        pré-carregamento), ela é entregue como um único fragmento. Um fluxo
+        não é compartilhado: ele pode ser encerrado antes do fim.
+        """
+        chave = self._calcular_chave(imagem_bytes, resumo, nivel)
+        with self._trava:
+            em_andamento = self._em_andamento.get(chave)
+        if em_andamento is not None:
+            resultado = self._aguardar(em_andamento, prazo)
+            if not self._repetir_chamada(resultado, prazo):
+                return resultado.map(lambda texto: iter([texto]))
+        return descrever_em_fragmentos(self.servico, imagem_bytes, mime_type, prazo, nivel, resumo)
+
+    def _calcular_chave(self, imagem_bytes: bytes, resumo: Optional[bytes], nivel: NivelDetalhe) -> str:
+        return calcular_chave_cache(imagem_bytes, *parametros_requisicao(self.servico, nivel), resumo)
+
+    def _compartilhar(
+        self,
+        chave: str,
+        prazo: Optional[Prazo],
+        descrever: Callable[[], Result[DescricaoImagem, ErroIA]]
+    ) -> Result[DescricaoImagem, ErroIA]:
+        """Chama o serviço se ninguém mais o fez para a chave; senão, aguarda o pedido em andamento."""
+        with self._trava:
+            em_andamento = self._em_andamento.get(chave)
+            if em_andamento is None:
+                futuro: Future = Future()
+                self._em_andamento[chave] = futuro
+
+        if em_andamento is not None:
+            resultado = self._aguardar(em_andamento, prazo)
+            if not self._repetir_chamada(resultado, prazo):
+                return resultado
+            return descrever()
+
+        try:
+            resultado = descrever()
+        except Exception as e:
+            resultado = Failure(ErroIA(f'Erro inesperado: {str(e)}'))
+        finally:
+            with self._trava:
+                del self._em_andamento[chave]
+        futuro.set_result(resultado)
+        return resultado
+
+    def _aguardar(
+        self,
+        em_andamento: 'Future[Result[DescricaoImagem, ErroIA]]',
+        prazo: Optional[Prazo]
+    ) -> Result[DescricaoImagem, ErroIA]:
+        """Resultado do pedido em andamento, esperado até o fim do prazo de quem aguarda."""
+        with medir_etapa('pedido_compartilhado', self.servico.provedor) as medicao:
+            try:
+                resultado = em_andamento.result(timeout=prazo.restante if prazo is not None else None)
+            except TempoEsgotado:
+                resultado = Failure(ErroIA(
+                    f'{self.servico.provedor.name}: tempo esgotado aguardando a descrição em andamento',
+                    CategoriaErro.TEMPO_ESGOTADO
+                ))
+            medicao['sucesso'] = isinstance(resultado, Success)
+        return resultado
+
+    @staticmethod
+    def _repetir_chamada(resultado: Result[DescricaoImagem, ErroIA], prazo: Optional[Prazo]) -> bool:
+        """
+        Uma falta de tempo do pedido em andamento não vale para quem aguardava,
+        que pode ter prazo maior e chama o serviço por conta própria; as
+        demais falhas são compartilhadas.
+        """
+        return (
+            isinstance(resultado, Failure) and
+            categoria_erro(resultado.failure()) == CategoriaErro.TEMPO_ESGOTADO and
+            (prazo is None or not prazo.expirado)
+        )
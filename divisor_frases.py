@@ -0,0 +1,38 @@
+# dominio/divisor_frases.py
+import re
+from typing import Iterable, Iterator
+
+# Pontuação final, aspas ou parênteses de fechamento opcionais e espaço em branco
+FIM_FRASE = re.compile(r'[.!?…]+["\'”’)\]]*\s+|\n+')
+
+# Frases mais curtas que isso são emendadas à seguinte, evitando cortes
+# em números de lista ("1. ") e abreviações ("Sr. ", "p. ex. ")
+TAMANHO_MINIMO_FRASE = 20
+
+def dividir_em_frases(fragmentos: Iterable[str]) -> Iterator[str]:
+    """
+    Reagrupa fragmentos de texto em frases completas.
+    Cada frase é entregue assim que seu fim chega, sem esperar o texto todo.
+    """
+    pendente = ''
+    for fragmento in fragmentos:
+        pendente += fragmento
+        inicio_busca = 0
+        while True:
+            fim = FIM_FRASE.search(pendente, inicio_busca)
+            if fim is None:
+                break
+
+            frase = pendente[:fim.end()].strip()
+            if len(frase) < TAMANHO_MINIMO_FRASE and '\n' not in fim.group():
+                inicio_busca = fim.end()
+                continue
+
+            pendente = pendente[fim.end():]
+            inicio_busca = 0
+            if frase:
+                yield frase
+
+    resto = pendente.strip()
+    if resto:
+        yield resto
@@ -1,5 +1,7 @@
 # dominio/entidades.py
-from dataclasses import dataclass
+import hashlib
+from dataclasses import dataclass, field, replace
+from functools import cached_property
 from typing import Optional, NewType, Dict, Any
 from enum import Enum, auto
 
@@ -7,13 +9,69 @@ from enum import Enum, auto
 CaminhoImagem = NewType('CaminhoImagem', str)
 DescricaoImagem = NewType('DescricaoImagem', str)
 ChaveAPI = NewType('ChaveAPI', str)
-ErroIA = NewType('ErroIA', str)
 ErroConfiguracao = NewType('ErroConfiguracao', str)
 
+# Tipos MIME por extensão/formato de imagem
+MIME_TYPES = {
+    'jpg': 'image/jpeg',
+    'jpeg': 'image/jpeg',
+    'png': 'image/png',
+    'gif': 'image/gif',
+    'bmp': 'image/bmp',
+    'webp': 'image/webp'
+}
+
 class ProvedorIA(Enum):
     """Enumera os provedores de IA disponíveis."""
     GEMINI = auto()
     MISTRAL = auto()
+    LOCAL = auto()  # Modelo que roda na CPU, sem rede nem chave de API
+
+class NivelDetalhe(Enum):
+    """Quanto a descrição se estende; níveis menores respondem mais rápido."""
+    TEXTO_ALTERNATIVO = auto()  # Uma frase curta, como o alt de uma imagem
+    CURTO = auto()              # Poucas frases, do mais importante ao menos
+    DETALHADO = auto()          # Descrição completa
+
+class CategoriaErro(Enum):
+    """Natureza de uma falha do provedor, que decide novas tentativas e fallback."""
+    AUTENTICACAO = auto()        # Chave inválida ou sem permissão: repetir não adianta
+    COTA = auto()                # Excesso de requisições (429): vale esperar e repetir
+    TRANSITORIO = auto()         # Rede, erro 5xx ou provedor sobrecarregado: vale repetir
+    ENTRADA_INVALIDA = auto()    # A imagem ou o pedido foi recusado: os demais provedores também recusariam
+    CONTEUDO_BLOQUEADO = auto()  # Filtro de conteúdo do provedor: outro provedor pode responder
+    TEMPO_ESGOTADO = auto()      # Sem resposta dentro do prazo
+    DESCONHECIDO = auto()
+
+class ErroIA(str):
+    """
+    Mensagem de erro de um serviço de IA com sua categoria e, quando o
+    provedor informa, os segundos de espera antes de tentar de novo
+    (Retry-After). Continua sendo uma string, para quem só exibe a mensagem.
+    """
+    categoria: CategoriaErro
+    espera: Optional[float]
+    
+    def __new__(
+        cls,
+        mensagem: str,
+        categoria: CategoriaErro = CategoriaErro.DESCONHECIDO,
+        espera: Optional[float] = None
+    ):
+        erro = super().__new__(cls, mensagem)
+        erro.categoria = categoria
+        erro.espera = espera
+        return erro
+
+def categoria_erro(erro: object) -> CategoriaErro:
+    """Categoria do erro; mensagens simples, sem categoria, são DESCONHECIDO."""
+    return getattr(erro, 'categoria', CategoriaErro.DESCONHECIDO)
+
+class ModoFallback(Enum):
+    """Estratégias para recorrer aos serviços alternativos."""
+    SEQUENCIAL = auto()  # Tenta o próximo serviço só depois da falha do anterior
+    ESCALONADO = auto()  # Dispara o próximo serviço se o atual demorar além do esperado
+    CORRIDA = auto()     # Dispara todos os serviços ao mesmo tempo
 
 @dataclass(frozen=True)
 class Imagem:
@@ -22,6 +80,49 @@ class Imagem:
     tipo: str
     largura: Optional[int] = None
     altura: Optional[int] = None
+    dados: Optional[bytes] = None  # Conteúdo já preparado para envio, se houver
+    # Conteúdo original, lido uma única vez e compartilhado por todas as tentativas
+    conteudo: Optional[bytes] = field(default=None, compare=False, repr=False)
+    
+    @property
+    def mime_type(self) -> str:
+        """Tipo MIME correspondente ao formato da imagem."""
+        return MIME_TYPES.get(self.tipo, 'image/jpeg')
+    
+    @property
+    def bytes_envio(self) -> Optional[bytes]:
+        """Bytes a enviar ao provedor: os preparados ou, na falta deles, os originais."""
+        return self.dados if self.dados is not None else self.conteudo
+    
+    @cached_property
+    def resumo(self) -> Optional[bytes]:
+        """
+        SHA-256 dos bytes de envio, calculado na primeira consulta e repassado
+        aos serviços: vale para todas as tentativas do pedido e some com a imagem.
+        """
+        dados = self.bytes_envio
+        return hashlib.sha256(dados).digest() if dados is not None else None
+
+@dataclass(frozen=True)
+class RegiaoTela:
+    """Retângulo da tela, em pixels, como o location dos objetos do NVDA."""
+    esquerda: int
+    topo: int
+    largura: int
+    altura: int
+
+@dataclass(frozen=True)
+class PerfilImagem:
+    """Parâmetros de preparação da imagem antes do envio a um provedor."""
+    lado_maximo: int   # Maior lado, em pixels, após a redução
+    formato: str       # Formato do PIL para a recodificação (JPEG, WEBP)
+    qualidade: int     # Qualidade da compressão, de 1 a 100
+
+@dataclass(frozen=True)
+class LimiteTaxa:
+    """Cota de requisições de um provedor e modelo."""
+    requisicoes_por_minuto: float
+    rajada: int  # Requisições que podem sair de uma vez com o balde cheio
 
 @dataclass(frozen=True)
 class Descricao:
@@ -37,14 +138,16 @@ class Configuracao:
     timeout_api: int
     modo_offline: bool
     chaves_api: Dict[ProvedorIA, Optional[str]]
+    modo_fallback: ModoFallback = ModoFallback.SEQUENCIAL
+    descricao_em_fluxo: bool = True  # Fala cada frase assim que é gerada
+    descricao_em_duas_etapas: bool = False  # Fala o texto alternativo e prepara a descrição detalhada em segundo plano
+    distancia_semelhanca: int = 0  # Bits de diferença aceitos entre imagens quase idênticas; 0 (padrão) desativa, pois uma imagem parecida pode ter outro conteúdo
+    pre_carregamento: bool = False  # Descreve em segundo plano a imagem em foco, antes do comando
+    limite_pre_carregamento_hora: int = 30  # Pré-carregamentos permitidos por hora
+    nivel_detalhe: NivelDetalhe = NivelDetalhe.DETALHADO  # Nível do comando principal de descrição
     
     def com_chave_alterada(self, provedor: ProvedorIA, chave: str) -> 'Configuracao':
         """Retorna uma nova configuração com a chave API alterada."""
         novas_chaves = dict(self.chaves_api)
         novas_chaves[provedor] = chave
-        return Configuracao(
-            provedor_primario=self.provedor_primario,
-            timeout_api=self.timeout_api,
-            modo_offline=self.modo_offline,
-            chaves_api=novas_chaves
-        )
\ No newline at end of file
+        return replace(self, chaves_api=novas_chaves)
\ No newline at end of file
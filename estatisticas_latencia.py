@@ -0,0 +1,48 @@
+# infraestrutura/estatisticas_latencia.py
+import math
+import threading
+from collections import deque
+from typing import Dict, List, Optional
+
+from entidades import ProvedorIA
+
+class JanelaLatencia:
+    """Janela deslizante com as latências mais recentes, em segundos."""
+
+    def __init__(self, tamanho: int = 50):
+        self._amostras: deque = deque(maxlen=tamanho)
+
+    def __len__(self) -> int:
+        return len(self._amostras)
+
+    def registrar(self, segundos: float) -> None:
+        """Acrescenta uma amostra, descartando a mais antiga se a janela estiver cheia."""
+        self._amostras.append(segundos)
+
+    def percentil(self, fracao: float) -> Optional[float]:
+        """Percentil pelo método do posto mais próximo; None se não houver amostras."""
+        if not self._amostras:
+            return None
+        ordenadas: List[float] = sorted(self._amostras)
+        posto = max(1, math.ceil(fracao * len(ordenadas)))
+        return ordenadas[posto - 1]
+
+class HistoricoLatencias:
+    """Latências recentes de cada provedor, seguro para uso entre threads."""
+
+    def __init__(self, tamanho_janela: int = 50):
+        self._tamanho_janela = tamanho_janela
+        self._janelas: Dict[ProvedorIA, JanelaLatencia] = {}
+        self._trava = threading.Lock()
+
+    def registrar(self, provedor: ProvedorIA, segundos: float) -> None:
+        """Registra a latência de uma resposta bem-sucedida do provedor."""
+        with self._trava:
+            janela = self._janelas.setdefault(provedor, JanelaLatencia(self._tamanho_janela))
+            janela.registrar(segundos)
+
+    def percentil(self, provedor: ProvedorIA, fracao: float) -> Optional[float]:
+        """Percentil das latências do provedor; None se ainda não houver histórico."""
+        with self._trava:
+            janela = self._janelas.get(provedor)
+            return janela.percentil(fracao) if janela is not None else None
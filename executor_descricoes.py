@@ -0,0 +1,116 @@
+# infraestrutura/executor_descricoes.py
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
+from returns.result import Result, Failure
+
+from cancelamento import TokenCancelamento
+
+T = TypeVar('T')
+
+class ExecutorDescricoes:
+    """
+    Executa pedidos de descrição em um pool limitado de threads de fundo.
+    Mantém no máximo um pedido ativo: um novo pedido cancela o anterior,
+    e o resultado de um pedido cancelado nunca é entregue.
+    """
+
+    def __init__(self, despachar: Callable[..., Any], max_trabalhadores: int = 3):
+        """
+        despachar agenda a entrega do resultado na thread da interface
+        (no NVDA, wx.CallAfter). Com três threads, um pedido novo não espera
+        o cancelado terminar nem a segunda etapa de uma descrição anterior.
+        """
+        self._despachar = despachar
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_trabalhadores,
+            thread_name_prefix='CamilleDescricao'
+        )
+        self._trava = threading.Lock()
+        self._atual: Optional[TokenCancelamento] = None
+
+    @property
+    def ocupado(self) -> bool:
+        """Indica se há um pedido em andamento."""
+        with self._trava:
+            return self._atual is not None and not self._atual.cancelado
+
+    def submeter(
+        self,
+        tarefa: Callable[[TokenCancelamento], Result[T, str]],
+        ao_concluir: Callable[[Result[T, str]], None]
+    ) -> TokenCancelamento:
+        """Cancela o pedido ativo e agenda a tarefa em segundo plano."""
+        cancelamento = TokenCancelamento()
+        with self._trava:
+            if self._atual is not None:
+                self._atual.cancelar()
+            self._atual = cancelamento
+
+        self._executor.submit(self._executar, tarefa, ao_concluir, cancelamento)
+        return cancelamento
+
+    def executar_em_segundo_plano(
+        self,
+        tarefa: Callable[[], Result[T, str]],
+        ao_concluir: Callable[[Result[T, str]], None]
+    ) -> None:
+        """
+        Agenda uma tarefa que acompanha o pedido ativo sem substituí-lo, como
+        a segunda etapa de uma descrição: ela não cancela o pedido ativo nem é
+        cancelada por um novo. ao_concluir é chamado na thread de fundo.
+        """
+        def executar() -> None:
+            try:
+                resultado = tarefa()
+            except Exception as e:
+                resultado = Failure(f'Erro inesperado: {str(e)}')
+            ao_concluir(resultado)
+
+        self._executor.submit(executar)
+
+    def cancelar_atual(self) -> bool:
+        """Cancela o pedido ativo, se houver. Retorna True se algo foi cancelado."""
+        with self._trava:
+            atual, self._atual = self._atual, None
+        if atual is None or atual.cancelado:
+            return False
+        atual.cancelar()
+        return True
+
+    def encerrar(self) -> None:
+        """Cancela o pedido ativo e libera as threads do pool."""
+        self.cancelar_atual()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _executar(
+        self,
+        tarefa: Callable[[TokenCancelamento], Result[T, str]],
+        ao_concluir: Callable[[Result[T, str]], None],
+        cancelamento: TokenCancelamento
+    ) -> None:
+        if cancelamento.cancelado:
+            return
+
+        try:
+            resultado = tarefa(cancelamento)
+        except Exception as e:
+            resultado = Failure(f'Erro inesperado: {str(e)}')
+
+        if not cancelamento.cancelado:
+            self._despachar(self._entregar, resultado, ao_concluir, cancelamento)
+
+    def _entregar(
+        self,
+        resultado: Result[T, str],
+        ao_concluir: Callable[[Result[T, str]], None],
+        cancelamento: TokenCancelamento
+    ) -> None:
+        # Conferido de novo na thread da interface: o cancelamento pode ter
+        # ocorrido enquanto a entrega aguardava na fila de eventos
+        with self._trava:
+            if cancelamento.cancelado:
+                return
+            if self._atual is cancelamento:
+                self._atual = None
+        ao_concluir(resultado)
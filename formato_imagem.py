@@ -0,0 +1,79 @@
+# infraestrutura/formato_imagem.py
+import base64
+import struct
+from typing import Optional, Tuple
+
+from entidades import MIME_TYPES
+
+# Marcadores JPEG de início de quadro (SOF), que trazem as dimensões
+MARCADORES_SOF = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+def identificar_formato(conteudo: bytes) -> Optional[Tuple[str, Optional[int], Optional[int]]]:
+    """
+    Identifica o formato pelos bytes iniciais e lê largura e altura do
+    cabeçalho, sem decodificar a imagem. Retorna (tipo, largura, altura),
+    com dimensões None se o cabeçalho não as trouxer, ou None se o formato
+    não for suportado.
+    """
+    try:
+        if conteudo.startswith(b'\x89PNG\r\n\x1a\n'):
+            largura, altura = struct.unpack('>II', conteudo[16:24])
+            return 'png', largura, altura
+        if conteudo.startswith(b'\xff\xd8'):
+            return ('jpeg',) + _dimensoes_jpeg(conteudo)
+        if conteudo[:6] in (b'GIF87a', b'GIF89a'):
+            largura, altura = struct.unpack('<HH', conteudo[6:10])
+            return 'gif', largura, altura
+        if conteudo.startswith(b'BM'):
+            largura, altura = struct.unpack('<ii', conteudo[18:26])
+            return 'bmp', largura, abs(altura)
+        if conteudo[:4] == b'RIFF' and conteudo[8:12] == b'WEBP':
+            return ('webp',) + _dimensoes_webp(conteudo)
+    except struct.error:
+        return None
+    return None
+
+def _dimensoes_jpeg(conteudo: bytes) -> Tuple[Optional[int], Optional[int]]:
+    """Percorre os segmentos até o primeiro SOF."""
+    posicao = 2
+    while posicao + 9 <= len(conteudo):
+        if conteudo[posicao] != 0xFF:
+            return None, None
+        marcador = conteudo[posicao + 1]
+        if marcador == 0xFF:
+            # Bytes de preenchimento entre segmentos
+            posicao += 1
+            continue
+        if marcador in MARCADORES_SOF:
+            altura, largura = struct.unpack('>HH', conteudo[posicao + 5:posicao + 9])
+            return largura, altura
+        tamanho, = struct.unpack('>H', conteudo[posicao + 2:posicao + 4])
+        posicao += 2 + tamanho
+    return None, None
+
+def _dimensoes_webp(conteudo: bytes) -> Tuple[Optional[int], Optional[int]]:
+    pedaco = conteudo[12:16]
+    if pedaco == b'VP8 ':
+        largura, altura = struct.unpack('<HH', conteudo[26:30])
+        return largura & 0x3FFF, altura & 0x3FFF
+    if pedaco == b'VP8L':
+        bits, = struct.unpack('<I', conteudo[21:25])
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if pedaco == b'VP8X':
+        largura = int.from_bytes(conteudo[24:27], 'little') + 1
+        altura = int.from_bytes(conteudo[27:30], 'little') + 1
+        return largura, altura
+    return None, None
+
+def tipo_mime(conteudo: bytes) -> str:
+    """Tipo MIME identificado pelos bytes; JPEG se o formato não for reconhecido."""
+    formato = identificar_formato(conteudo)
+    return MIME_TYPES.get(formato[0], 'image/jpeg') if formato is not None else 'image/jpeg'
+
+def codificar_data_url(dados: bytes, mime_type: str) -> str:
+    """
+    Data URL em base64 dos bytes da imagem. Não é memorizada: cada string
+    ocupa 4/3 da imagem, e guardar cópias custaria mais memória do que a
+    codificação custa em tempo.
+    """
+    return f'data:{mime_type};base64,{base64.b64encode(dados).decode("ascii")}'
@@ -0,0 +1,109 @@
+# infraestrutura/hash_perceptual.py
+import io
+from typing import Dict, List, Optional, Set, Tuple
+
+# O dHash compara cada pixel com o vizinho à direita numa miniatura 9x8,
+# resultando em 64 bits estáveis a recompressão, antialiasing e pequenos cortes
+LADO_DHASH = 8
+BITS_DHASH = LADO_DHASH * LADO_DHASH
+
+def calcular_dhash(imagem_bytes: bytes) -> Optional[int]:
+    """
+    Calcula o hash perceptual (dHash) da imagem; None se ela não puder ser
+    lida. Não é memorizado: quem chama calcula uma vez e reaproveita o valor.
+    """
+    try:
+        # PIL é importado sob demanda para não pesar na inicialização do NVDA
+        from PIL import Image
+
+        with Image.open(io.BytesIO(imagem_bytes)) as original:
+            # Em JPEGs, o modo draft decodifica direto numa escala reduzida
+            original.draft('L', (LADO_DHASH * 8, LADO_DHASH * 8))
+            miniatura = original.convert('L').resize((LADO_DHASH + 1, LADO_DHASH), Image.BOX)
+
+        pixels = list(miniatura.getdata())
+    except Exception:
+        return None
+
+    valor = 0
+    for linha in range(LADO_DHASH):
+        inicio = linha * (LADO_DHASH + 1)
+        for coluna in range(LADO_DHASH):
+            valor = (valor << 1) | (pixels[inicio + coluna] > pixels[inicio + coluna + 1])
+    return valor
+
+def distancia_hamming(a: int, b: int) -> int:
+    """Número de bits diferentes entre dois hashes."""
+    return bin(a ^ b).count('1')
+
+class IndiceHashPerceptual:
+    """
+    Índice de hashes de 64 bits com busca por distância de Hamming
+    (multi-index hashing). O hash é dividido em distancia_maxima + 1 blocos;
+    pelo princípio da casa dos pombos, todo hash a essa distância ou menos
+    coincide com o consultado em pelo menos um bloco, então só os hashes que
+    compartilham algum bloco são comparados. Com blocos de 10 bits ou mais,
+    isso mantém a busca em poucas dezenas de comparações mesmo com dezenas
+    de milhares de entradas.
+    """
+
+    def __init__(self, distancia_maxima: int):
+        self.distancia_maxima = distancia_maxima
+        self._blocos = self._dividir_em_blocos(distancia_maxima + 1)
+        self._tabelas: List[Dict[int, Set[int]]] = [{} for _ in self._blocos]
+        self._chaves: Dict[int, Set[str]] = {}
+
+    def __len__(self) -> int:
+        return sum(len(chaves) for chaves in self._chaves.values())
+
+    @staticmethod
+    def _dividir_em_blocos(quantidade: int) -> List[Tuple[int, int]]:
+        """Deslocamento e máscara de cada bloco, com tamanhos o mais iguais possível."""
+        blocos = []
+        inicio = 0
+        for indice in range(quantidade):
+            tamanho = BITS_DHASH // quantidade + (1 if indice < BITS_DHASH % quantidade else 0)
+            blocos.append((inicio, (1 << tamanho) - 1))
+            inicio += tamanho
+        return blocos
+
+    def adicionar(self, valor: int, chave: str) -> None:
+        """Associa a chave ao hash."""
+        chaves = self._chaves.get(valor)
+        if chaves is None:
+            chaves = self._chaves[valor] = set()
+            for tabela, (deslocamento, mascara) in zip(self._tabelas, self._blocos):
+                tabela.setdefault((valor >> deslocamento) & mascara, set()).add(valor)
+        chaves.add(chave)
+
+    def remover(self, valor: int, chave: str) -> None:
+        """Desassocia a chave do hash; o hash sai do índice quando fica sem chaves."""
+        chaves = self._chaves.get(valor)
+        if chaves is None:
+            return
+        chaves.discard(chave)
+        if chaves:
+            return
+
+        del self._chaves[valor]
+        for tabela, (deslocamento, mascara) in zip(self._tabelas, self._blocos):
+            bloco = (valor >> deslocamento) & mascara
+            valores = tabela.get(bloco)
+            if valores is not None:
+                valores.discard(valor)
+                if not valores:
+                    del tabela[bloco]
+
+    def buscar(self, valor: int) -> List[Tuple[int, str]]:
+        """Chaves dos hashes dentro da distância máxima, da mais próxima à mais distante."""
+        candidatos: Set[int] = set()
+        for tabela, (deslocamento, mascara) in zip(self._tabelas, self._blocos):
+            candidatos.update(tabela.get((valor >> deslocamento) & mascara, ()))
+
+        encontrados = []
+        for candidato in candidatos:
+            distancia = distancia_hamming(valor, candidato)
+            if distancia <= self.distancia_maxima:
+                encontrados.extend((distancia, chave) for chave in self._chaves[candidato])
+        encontrados.sort()
+        return encontrados
@@ -1,26 +1,47 @@
 # interface_nvda.py
 import os
+import threading
+from dataclasses import replace
+from itertools import zip_longest
+from concurrent.futures import Future, TimeoutError as TempoEsgotado
 import globalPluginHandler
 import addonHandler
 import gui
 import wx
-from typing import Dict, List, Any, Optional
+from typing import Callable, Dict, Iterator, List, Any, Optional, Sequence, Tuple
 import globalVars
 import ui
 import api
 import controlTypes
 import scriptHandler
+import inputCore
 import config
+from logHandler import log
 
 from returns.result import Result, Success, Failure
 
-from casos_uso import gerar_descricao_imagem
-from entidades import Configuracao, ProvedorIA
+from casos_uso import (
+    gerar_descricao_imagem, gerar_descricao_imagem_em_fluxo, gerar_descricoes_em_lote,
+    gerar_descricao_imagem_bytes, gerar_descricao_imagem_bytes_em_fluxo, AgendarDetalhada
+)
+from entidades import Configuracao, Descricao, ModoFallback, NivelDetalhe, ProvedorIA, RegiaoTela
 from servico_ia import ServicoIA
+from cache_descricoes import CacheDescricoes, ServicoIAComCache
+from deduplicacao_pedidos import ServicoIADeduplicado
+from baixador_imagens_http import BaixadorImagensHTTP
+from captura_tela_windows import CapturaTelaWindows
+from executor_descricoes import ExecutorDescricoes
+from cancelamento import TokenCancelamento
+from prazo import Prazo
+from saude_provedores import MonitorSaude, ServicoIAMonitorado
+from limitador_taxa import ServicoIALimitado
+from pre_carregamento import PreCarregador
+from clientes_sdk import GerenciadorClientes
+from metricas import REGISTRO_METRICAS
 from adaptador_gemini import AdaptadorGemini
 from adaptador_mistral import AdaptadorMistral
-from adaptador_ocr import AdaptadorOCR
-from repositorio_configuracao_nvda import RepositorioConfiguracaoNVDA
+from adaptador_local import AdaptadorLocal, ARQUIVOS_MODELO, DIRETORIO_MODELO_LOCAL
+from repositorio_configuracao_nvda import RepositorioConfiguracaoNVDA, TIMEOUT_API_PADRAO
 from gerenciador_configuracao import (
     obter_configuracao, obter_chave_api_para_provedor,
     salvar_configuracao
@@ -28,6 +49,23 @@ from gerenciador_configuracao import (
 
 addonHandler.initTranslation()
 
+# Rótulos exibidos no diálogo para cada modo de fallback
+ROTULOS_MODO_FALLBACK = {
+    ModoFallback.SEQUENCIAL: _("Sequencial (menor custo)"),
+    ModoFallback.ESCALONADO: _("Escalonado (dispara o próximo provedor se o atual demorar)"),
+    ModoFallback.CORRIDA: _("Corrida (todos os provedores ao mesmo tempo)"),
+}
+
+# Rótulos exibidos no diálogo para cada nível de detalhe
+ROTULOS_NIVEL_DETALHE = {
+    NivelDetalhe.TEXTO_ALTERNATIVO: _("Texto alternativo (uma frase)"),
+    NivelDetalhe.CURTO: _("Curto (até três frases)"),
+    NivelDetalhe.DETALHADO: _("Detalhado"),
+}
+
+# Limite de imagens coletadas do documento para a descrição em lote
+MAX_IMAGENS_LOTE = 50
+
 class ConfiguracaoDialog(wx.Dialog):
     """Diálogo de configuração para o complemento."""
     
@@ -80,7 +118,7 @@ class ConfiguracaoDialog(wx.Dialog):
         self.label_timeout = wx.StaticText(painel_principal, label=_("Timeout API (segundos):"))
         sizer_timeout.Add(self.label_timeout, 0, wx.ALL, 5)
         
-        self.spin_timeout = wx.SpinCtrl(painel_principal, min=1, max=30, initial=configuracao_atual.timeout_api)
+        self.spin_timeout = wx.SpinCtrl(painel_principal, min=1, max=60, initial=configuracao_atual.timeout_api)
         sizer_timeout.Add(self.spin_timeout, 0, wx.ALL, 5)
         sizer.Add(sizer_timeout, 0, wx.EXPAND, 5)
         
@@ -89,6 +127,69 @@ class ConfiguracaoDialog(wx.Dialog):
         self.check_modo_offline.SetValue(configuracao_atual.modo_offline)
         sizer.Add(self.check_modo_offline, 0, wx.ALL, 5)
         
+        # Descrição em fluxo
+        self.check_em_fluxo = wx.CheckBox(painel_principal, label=_("Falar a descrição à medida que é gerada"))
+        self.check_em_fluxo.SetValue(configuracao_atual.descricao_em_fluxo)
+        sizer.Add(self.check_em_fluxo, 0, wx.ALL, 5)
+        
+        # Descrição em duas etapas
+        self.check_duas_etapas = wx.CheckBox(
+            painel_principal,
+            label=_("Falar primeiro o texto alternativo e preparar a descrição detalhada (NVDA+Alt+M)")
+        )
+        self.check_duas_etapas.SetValue(configuracao_atual.descricao_em_duas_etapas)
+        sizer.Add(self.check_duas_etapas, 0, wx.ALL, 5)
+        
+        # Semelhança para reaproveitar descrições
+        sizer_semelhanca = wx.BoxSizer(wx.HORIZONTAL)
+        self.label_semelhanca = wx.StaticText(
+            painel_principal,
+            label=_("Diferença aceita para reaproveitar descrição de imagem parecida (0 desativa):")
+        )
+        sizer_semelhanca.Add(self.label_semelhanca, 0, wx.ALL, 5)
+        
+        self.spin_semelhanca = wx.SpinCtrl(painel_principal, min=0, max=10, initial=configuracao_atual.distancia_semelhanca)
+        sizer_semelhanca.Add(self.spin_semelhanca, 0, wx.ALL, 5)
+        sizer.Add(sizer_semelhanca, 0, wx.EXPAND, 5)
+        
+        # Pré-carregamento da imagem em foco
+        self.check_pre_carregamento = wx.CheckBox(
+            painel_principal,
+            label=_("Descrever antecipadamente a imagem em foco")
+        )
+        self.check_pre_carregamento.SetValue(configuracao_atual.pre_carregamento)
+        sizer.Add(self.check_pre_carregamento, 0, wx.ALL, 5)
+        
+        sizer_limite_pre = wx.BoxSizer(wx.HORIZONTAL)
+        self.label_limite_pre = wx.StaticText(painel_principal, label=_("Descrições antecipadas por hora:"))
+        sizer_limite_pre.Add(self.label_limite_pre, 0, wx.ALL, 5)
+        
+        self.spin_limite_pre = wx.SpinCtrl(
+            painel_principal, min=1, max=500, initial=configuracao_atual.limite_pre_carregamento_hora
+        )
+        sizer_limite_pre.Add(self.spin_limite_pre, 0, wx.ALL, 5)
+        sizer.Add(sizer_limite_pre, 0, wx.EXPAND, 5)
+        
+        # Modo de fallback
+        sizer_fallback = wx.BoxSizer(wx.HORIZONTAL)
+        self.label_fallback = wx.StaticText(painel_principal, label=_("Modo de fallback:"))
+        sizer_fallback.Add(self.label_fallback, 0, wx.ALL, 5)
+        
+        self.choice_fallback = wx.Choice(painel_principal, choices=[ROTULOS_MODO_FALLBACK[m] for m in ModoFallback])
+        self.choice_fallback.SetSelection(list(ModoFallback).index(configuracao_atual.modo_fallback))
+        sizer_fallback.Add(self.choice_fallback, 0, wx.ALL, 5)
+        sizer.Add(sizer_fallback, 0, wx.EXPAND, 5)
+        
+        # Nível de detalhe do comando de descrição
+        sizer_nivel = wx.BoxSizer(wx.HORIZONTAL)
+        self.label_nivel = wx.StaticText(painel_principal, label=_("Nível de detalhe:"))
+        sizer_nivel.Add(self.label_nivel, 0, wx.ALL, 5)
+        
+        self.choice_nivel = wx.Choice(painel_principal, choices=[ROTULOS_NIVEL_DETALHE[n] for n in NivelDetalhe])
+        self.choice_nivel.SetSelection(list(NivelDetalhe).index(configuracao_atual.nivel_detalhe))
+        sizer_nivel.Add(self.choice_nivel, 0, wx.ALL, 5)
+        sizer.Add(sizer_nivel, 0, wx.EXPAND, 5)
+        
         # Botões
         sizer_botoes = wx.StdDialogButtonSizer()
         self.btn_ok = wx.Button(painel_principal, wx.ID_OK)
@@ -115,18 +216,47 @@ class ConfiguracaoDialog(wx.Dialog):
         chave_mistral = self.text_chave_mistral.GetValue()
         timeout_api = self.spin_timeout.GetValue()
         modo_offline = self.check_modo_offline.GetValue()
+        modo_fallback = list(ModoFallback)[self.choice_fallback.GetSelection()]
+        nivel_detalhe = list(NivelDetalhe)[self.choice_nivel.GetSelection()]
+        descricao_em_fluxo = self.check_em_fluxo.GetValue()
+        descricao_em_duas_etapas = self.check_duas_etapas.GetValue()
+        distancia_semelhanca = self.spin_semelhanca.GetValue()
+        pre_carregamento = self.check_pre_carregamento.GetValue()
+        limite_pre_carregamento_hora = self.spin_limite_pre.GetValue()
+        
+        # O modo offline e o provedor local dependem do modelo instalado
+        if (modo_offline or provedor_primario == ProvedorIA.LOCAL) and not AdaptadorLocal.disponivel():
+            gui.messageBox(
+                _(
+                    "O modelo local não está instalado. Para usar o modo offline ou o provedor LOCAL, "
+                    "copie para a pasta {pasta} os arquivos {arquivos} de um modelo de descrição "
+                    "exportado para ONNX e instale no NVDA os pacotes Python numpy, onnxruntime e tokenizers."
+                ).format(pasta=DIRETORIO_MODELO_LOCAL, arquivos=", ".join(ARQUIVOS_MODELO)),
+                _("Modelo local indisponível"),
+                wx.OK | wx.ICON_WARNING,
+                self
+            )
+            return
         
         # Atualiza chaves de API
         chaves_api = dict(self.configuracao_atual.chaves_api)
         chaves_api[ProvedorIA.GEMINI] = chave_gemini if chave_gemini else None
         chaves_api[ProvedorIA.MISTRAL] = chave_mistral if chave_mistral else None
         
-        # Cria nova configuração
-        nova_configuracao = Configuracao(
+        # Cria nova configuração, preservando campos que o diálogo não exibe
+        nova_configuracao = replace(
+            self.configuracao_atual,
             provedor_primario=provedor_primario,
             timeout_api=timeout_api,
             modo_offline=modo_offline,
-            chaves_api=chaves_api
+            chaves_api=chaves_api,
+            modo_fallback=modo_fallback,
+            descricao_em_fluxo=descricao_em_fluxo,
+            descricao_em_duas_etapas=descricao_em_duas_etapas,
+            distancia_semelhanca=distancia_semelhanca,
+            pre_carregamento=pre_carregamento,
+            limite_pre_carregamento_hora=limite_pre_carregamento_hora,
+            nivel_detalhe=nivel_detalhe
         )
         
         # Chama o callback de salvar
@@ -135,76 +265,277 @@ class ConfiguracaoDialog(wx.Dialog):
         # Fecha o diálogo
         self.EndModal(wx.ID_OK)
 
+class DescricoesLoteDialog(wx.Dialog):
+    """Lista navegável com as descrições das imagens do documento, preenchida à medida que ficam prontas."""
+    
+    def __init__(self, parent, rotulos: Sequence[str], ao_fechar: Callable[[], None]):
+        super(DescricoesLoteDialog, self).__init__(
+            parent,
+            title=_("Descrições das imagens do documento"),
+            style=wx.DEFAULT_DIALOG_STYLE | wx.RESIZE_BORDER
+        )
+        self.rotulos = list(rotulos)
+        self.descricoes: List[Optional[str]] = [None] * len(self.rotulos)
+        self.ao_fechar = ao_fechar
+        
+        sizer = wx.BoxSizer(wx.VERTICAL)
+        
+        # Lista de imagens, da mais próxima do cursor à mais distante
+        self.label_imagens = wx.StaticText(self, label=_("&Imagens:"))
+        sizer.Add(self.label_imagens, 0, wx.ALL, 5)
+        self.lista_imagens = wx.ListBox(
+            self,
+            choices=[self._item_lista(indice) for indice in range(len(self.rotulos))]
+        )
+        sizer.Add(self.lista_imagens, 1, wx.EXPAND | wx.ALL, 5)
+        
+        # Descrição completa da imagem selecionada
+        self.label_descricao = wx.StaticText(self, label=_("&Descrição:"))
+        sizer.Add(self.label_descricao, 0, wx.ALL, 5)
+        self.text_descricao = wx.TextCtrl(self, style=wx.TE_MULTILINE | wx.TE_READONLY, size=(500, 200))
+        sizer.Add(self.text_descricao, 1, wx.EXPAND | wx.ALL, 5)
+        
+        self.btn_fechar = wx.Button(self, wx.ID_CLOSE)
+        sizer.Add(self.btn_fechar, 0, wx.ALIGN_CENTER | wx.ALL, 5)
+        
+        self.SetSizer(sizer)
+        sizer.Fit(self)
+        self.SetEscapeId(wx.ID_CLOSE)
+        
+        # Eventos
+        self.lista_imagens.Bind(wx.EVT_LISTBOX, self.on_selecionar)
+        self.btn_fechar.Bind(wx.EVT_BUTTON, lambda evt: self.Close())
+        self.Bind(wx.EVT_CLOSE, self.on_fechar)
+        
+        self.lista_imagens.SetSelection(0)
+        self.on_selecionar(None)
+    
+    def _item_lista(self, indice: int) -> str:
+        descricao = self.descricoes[indice]
+        estado = descricao if descricao is not None else _("aguardando descrição")
+        return f"{self.rotulos[indice]}: {estado}"
+    
+    def atualizar(self, indice: int, resultado: Result[Descricao, str]) -> None:
+        """Mostra o resultado de uma imagem; chamado na thread principal."""
+        if isinstance(resultado, Success):
+            self.descricoes[indice] = resultado.unwrap().texto
+        else:
+            self.descricoes[indice] = _("Erro: {0}").format(resultado.failure())
+        self.lista_imagens.SetString(indice, self._item_lista(indice))
+        if self.lista_imagens.GetSelection() == indice:
+            self.on_selecionar(None)
+    
+    def concluir(self, resultado: Result[int, str]) -> None:
+        """Anuncia o fim do lote; chamado na thread principal."""
+        if isinstance(resultado, Success):
+            ui.message(_("{0} de {1} imagens descritas").format(resultado.unwrap(), len(self.rotulos)))
+        else:
+            ui.message(_("Erro ao descrever imagens: ") + resultado.failure())
+    
+    def on_selecionar(self, event) -> None:
+        indice = self.lista_imagens.GetSelection()
+        if indice != wx.NOT_FOUND:
+            self.text_descricao.SetValue(self._item_lista(indice))
+    
+    def on_fechar(self, event) -> None:
+        """Cancela as descrições pendentes ao fechar a lista."""
+        self.ao_fechar()
+        self.Destroy()
+
 class GlobalPlugin(globalPluginHandler.GlobalPlugin):
     """Plugin global NVDA para descrição de imagens por IA."""
     
     def __init__(self):
         super(GlobalPlugin, self).__init__()
         
-        # Inicializa o repositório de configuração
+        # Configuração padrão até o repositório ser carregado em segundo plano
+        self.configuracao = Configuracao(
+            provedor_primario=ProvedorIA.GEMINI,
+            timeout_api=TIMEOUT_API_PADRAO,
+            modo_offline=False,
+            chaves_api={}
+        )
         caminho_config = os.path.join(globalVars.appArgs.configPath, 'addons', 'Camille', 'config.json')
-        self.repositorio = RepositorioConfiguracaoNVDA(caminho_config)
+        self.repositorio: Optional[RepositorioConfiguracaoNVDA] = None
+        
+        # Cache de descrições compartilhado entre os provedores
+        self.cache = CacheDescricoes(
+            os.path.join(os.path.dirname(caminho_config), 'cache'),
+            distancia_semelhanca=self.configuracao.distancia_semelhanca
+        )
+        
+        # Imagens remotas baixadas uma vez e entregues a todos os provedores
+        self.baixador = BaixadorImagensHTTP(
+            os.path.join(os.path.dirname(caminho_config), 'imagens_remotas')
+        )
+        
+        # Clientes dos SDKs, de vida longa e com conexões compartilhadas entre os provedores
+        self.clientes = GerenciadorClientes()
+        
+        # Imagens sem caminho utilizável são capturadas da tela, só na região do objeto
+        self.captura = CapturaTelaWindows()
+        
+        # Executa as descrições fora da thread principal do NVDA
+        self.executor = ExecutorDescricoes(wx.CallAfter)
+        
+        # Descrições antecipadas da imagem em foco, que alimentam o cache
+        self.pre_carregador = PreCarregador(
+            self.configuracao.limite_pre_carregamento_hora,
+            lambda: self.executor.ocupado
+        )
+        
+        # Saúde de cada provedor: ordena os serviços e alimenta o fallback escalonado
+        self.monitor_saude = MonitorSaude()
+        
+        # Pedido em fluxo ativo, interrompido ao pressionar qualquer tecla
+        self._cancelamento_fluxo: Optional[TokenCancelamento] = None
+        
+        # Descrição detalhada da última imagem descrita em duas etapas
+        self._descricao_detalhada: Optional[Future] = None
+        
+        # Lista da descrição em lote aberta; a mudança de foco para ela não cancela o lote
+        self._dialogo_lote: Optional[DescricoesLoteDialog] = None
+        self._cancelamento_lote: Optional[TokenCancelamento] = None
+        inputCore.decide_executeGesture.register(self._ao_executar_gesto)
         
         # Inicializa adaptadores
         self.adaptadores: Dict[ProvedorIA, Optional[ServicoIA]] = {
             ProvedorIA.GEMINI: None,
-            ProvedorIA.MISTRAL: None
+            ProvedorIA.MISTRAL: None,
+            ProvedorIA.LOCAL: None
         }
         
-        # Carrega configurações e inicializa serviços
-        self._inicializar_servicos()
+        # Carrega configurações e inicializa serviços sem atrasar a inicialização do NVDA
+        self._prontidao: Future = Future()
+        threading.Thread(
+            target=self._inicializar_em_segundo_plano,
+            args=(caminho_config,),
+            name='Camille-inicializacao',
+            daemon=True
+        ).start()
         
         # Adiciona item de menu
         self._criar_menu()
     
+    def _inicializar_em_segundo_plano(self, caminho_config: str) -> None:
+        """Lê a configuração e cria os serviços; conclui o futuro de prontidão."""
+        try:
+            self.repositorio = RepositorioConfiguracaoNVDA(caminho_config)
+            self._inicializar_servicos()
+        except Exception as e:
+            self._prontidao.set_exception(e)
+        else:
+            self._prontidao.set_result(None)
+    
+    def _aguardar_prontidao(self, prazo: Prazo) -> Result[List[ServicoIA], str]:
+        """Espera a inicialização dentro do prazo e retorna os serviços disponíveis."""
+        try:
+            self._prontidao.result(timeout=prazo.restante)
+        except TempoEsgotado:
+            return Failure(_("Tempo esgotado aguardando a inicialização do complemento"))
+        except Exception as e:
+            return Failure(_("Falha ao inicializar o complemento: {0}").format(e))
+        
+        servicos = self._obter_servicos_disponiveis()
+        if not servicos:
+            return Failure(_("Nenhum serviço de descrição disponível"))
+        return Success(servicos)
+    
+    def _avisar_se_inicializando(self) -> bool:
+        """Avisa o usuário e retorna True se a inicialização ainda não terminou."""
+        if self._prontidao.done():
+            return False
+        ui.message(_("O complemento ainda está inicializando, tente novamente em instantes"))
+        return True
+    
     def _inicializar_servicos(self) -> None:
         """Inicializa os serviços de IA com base nas configurações."""
         resultado_config = obter_configuracao(self.repositorio)
         if isinstance(resultado_config, Success):
             self.configuracao = resultado_config.unwrap()
+            self.cache.definir_distancia_semelhanca(self.configuracao.distancia_semelhanca)
+            self.pre_carregador.definir_limite_por_hora(self.configuracao.limite_pre_carregamento_hora)
             
             # Se não estiver no modo offline, inicializa os serviços
             if not self.configuracao.modo_offline:
                 self._inicializar_servico(ProvedorIA.GEMINI)
                 self._inicializar_servico(ProvedorIA.MISTRAL)
+            
+            # O modelo local atende o modo offline e é o último recurso sem rede
+            self._inicializar_servico_local()
         else:
             # Fallback para configuração padrão em caso de erro
             self.configuracao = Configuracao(
                 provedor_primario=ProvedorIA.GEMINI,
-                timeout_api=3,
+                timeout_api=TIMEOUT_API_PADRAO,
                 modo_offline=False,
-                usar_fallback_ocr=True,
                 chaves_api={}
             )
     
+    def _inicializar_servico_local(self) -> None:
+        """Cria o serviço local, se o modelo estiver instalado, e o carrega em segundo plano."""
+        if self.adaptadores.get(ProvedorIA.LOCAL) is not None or not AdaptadorLocal.disponivel():
+            return
+        
+        adaptador = AdaptadorLocal()
+        adaptador.aquecer()
+        # Sem cota a respeitar, o serviço local dispensa o limitador
+        self.adaptadores[ProvedorIA.LOCAL] = ServicoIADeduplicado(
+            ServicoIAComCache(
+                ServicoIAMonitorado(adaptador, self.monitor_saude),
+                self.cache
+            )
+        )
+    
     def _inicializar_servico(self, provedor: ProvedorIA) -> None:
-        """Inicializa um serviço de IA específico."""
+        """
+        Inicializa um serviço de IA específico. Se a chave não mudou, o serviço
+        atual é mantido, com seu cliente, suas conexões e seu histórico de cota.
+        """
         resultado_chave = obter_chave_api_para_provedor(self.repositorio, provedor)
         
         if isinstance(resultado_chave, Success):
             chave_api = resultado_chave.unwrap()
+            atual = self.adaptadores.get(provedor)
+            if atual is not None and atual.chave_api == chave_api:
+                return
             
             if provedor == ProvedorIA.GEMINI:
-                self.adaptadores[provedor] = AdaptadorGemini(chave_api)
+                adaptador = AdaptadorGemini(chave_api, self.clientes)
             elif provedor == ProvedorIA.MISTRAL:
-                self.adaptadores[provedor] = AdaptadorMistral(chave_api)
-    
-def _criar_menu(self) -> None:
-    """Cria o item de menu para as configurações do plugin."""
-    try:
-        self.menu = gui.mainFrame.sysTrayIcon.preferencesMenu
-        self.item_menu = self.menu.Append(
-            wx.ID_ANY, 
-            _("&Descrição de Imagem por IA..."),
-            _("Configurar o complemento de descrição de imagem por IA")
-        )
-        gui.mainFrame.sysTrayIcon.Bind(wx.EVT_MENU, self.on_exibir_configuracoes, self.item_menu)
-        print("Menu de configurações criado com sucesso.")
-    except Exception as e:
-        print(f"Erro ao criar menu: {e}")
+                adaptador = AdaptadorMistral(chave_api, self.clientes)
+            else:
+                return
+            
+            # Abre a conexão já, para que a primeira descrição não pague o handshake
+            adaptador.aquecer()
+            # Pedidos repetidos da mesma imagem (comando e pré-carregamento) viram uma só chamada
+            self.adaptadores[provedor] = ServicoIADeduplicado(
+                ServicoIAComCache(
+                    ServicoIALimitado(ServicoIAMonitorado(adaptador, self.monitor_saude)),
+                    self.cache
+                )
+            )
+    
+    def _criar_menu(self) -> None:
+        """Cria o item de menu para as configurações do plugin."""
+        try:
+            self.menu = gui.mainFrame.sysTrayIcon.preferencesMenu
+            self.item_menu = self.menu.Append(
+                wx.ID_ANY, 
+                _("&Descrição de Imagem por IA..."),
+                _("Configurar o complemento de descrição de imagem por IA")
+            )
+            gui.mainFrame.sysTrayIcon.Bind(wx.EVT_MENU, self.on_exibir_configuracoes, self.item_menu)
+            print("Menu de configurações criado com sucesso.")
+        except Exception as e:
+            print(f"Erro ao criar menu: {e}")
     
     def on_exibir_configuracoes(self, evt) -> None:
         """Exibe o diálogo de configurações."""
+        if self._avisar_se_inicializando():
+            return
+        
         dialog = ConfiguracaoDialog(
             gui.mainFrame, 
             self.configuracao, 
@@ -216,70 +547,496 @@ def _criar_menu(self) -> None:
     
     def on_salvar_configuracoes(self, nova_configuracao: Configuracao) -> None:
         """Salva a nova configuração e reinicializa os serviços."""
+        if self._avisar_se_inicializando():
+            return
+        
         resultado = salvar_configuracao(self.repositorio, nova_configuracao)
         
         if isinstance(resultado, Success):
             # Atualiza a configuração local
             self.configuracao = nova_configuracao
+            self.cache.definir_distancia_semelhanca(nova_configuracao.distancia_semelhanca)
+            self.pre_carregador.definir_limite_por_hora(nova_configuracao.limite_pre_carregamento_hora)
             
             # Reinicializa os serviços
             if not nova_configuracao.modo_offline:
                 self._inicializar_servico(ProvedorIA.GEMINI)
                 self._inicializar_servico(ProvedorIA.MISTRAL)
             
+            # O modelo pode ter sido instalado depois da inicialização
+            self._inicializar_servico_local()
+            
             ui.message(_("Configurações salvas com sucesso."))
         else:
             ui.message(_("Erro ao salvar configurações: {0}").format(resultado.failure()))
     
     @scriptHandler.script(
-        description=_("Descreve a imagem em foco usando IA"),
+        description=_("Descreve a imagem em foco usando IA, no nível de detalhe configurado"),
         gesture="kb:NVDA+alt+d"
     )
     def script_descrever_imagem(self, gesture) -> None:
         """Manipulador de comando para descrever a imagem em foco."""
+        self._descrever_foco(self.configuracao.nivel_detalhe, self.configuracao.descricao_em_duas_etapas)
+    
+    @scriptHandler.script(
+        description=_("Informa o texto alternativo da imagem em foco, numa única frase"),
+        gesture="kb:NVDA+alt+t"
+    )
+    def script_descrever_texto_alternativo(self, gesture) -> None:
+        self._descrever_foco(NivelDetalhe.TEXTO_ALTERNATIVO)
+    
+    @scriptHandler.script(
+        description=_("Descreve brevemente a imagem em foco, em até três frases"),
+        gesture="kb:NVDA+alt+r"
+    )
+    def script_descrever_resumo(self, gesture) -> None:
+        self._descrever_foco(NivelDetalhe.CURTO)
+    
+    @scriptHandler.script(
+        description=_("Lê a descrição detalhada da última imagem descrita em duas etapas"),
+        gesture="kb:NVDA+alt+m"
+    )
+    def script_ler_descricao_detalhada(self, gesture) -> None:
+        """Fala a descrição detalhada já pronta ou, se ainda não estiver, assim que ficar."""
+        detalhada = self._descricao_detalhada
+        if detalhada is None:
+            ui.message(_("Nenhuma descrição detalhada disponível"))
+            return
+        if detalhada.done():
+            self._anunciar_resultado(detalhada.result())
+            return
+        ui.message(_("Descrição detalhada em andamento, aguarde..."))
+        detalhada.add_done_callback(lambda futuro: wx.CallAfter(self._anunciar_detalhada, futuro))
+    
+    def _anunciar_detalhada(self, detalhada: Future) -> None:
+        """Fala a descrição detalhada, se ela ainda for a da última imagem descrita."""
+        if self._descricao_detalhada is detalhada:
+            self._anunciar_resultado(detalhada.result())
+    
+    def _descrever_foco(self, nivel: NivelDetalhe, duas_etapas: bool = False) -> None:
+        """Descreve a imagem em foco no nível de detalhe pedido, ou em duas etapas."""
+        # Pressionar o comando durante uma descrição cancela o pedido em andamento
+        if self.executor.cancelar_atual():
+            ui.message(_("Descrição cancelada"))
+            return
+        
         obj = api.getFocusObject()
         
         # Verifica se o objeto é uma imagem
-        if (
-            controlTypes.State.GRAPHIC in obj.states or
-            obj.role == controlTypes.Role.GRAPHIC
-        ):
+        if self._eh_imagem(obj):
             # Aqui você obteria o caminho/URL da imagem do objeto NVDA
             # Isso é um placeholder - a implementação real dependeria da API do NVDA
             caminho_imagem = self._obter_caminho_imagem(obj)
             
-            if not caminho_imagem:
+            # Sem caminho, a imagem é capturada da área que o objeto ocupa na tela
+            regiao = None if caminho_imagem else self._obter_regiao_objeto(obj)
+            if not caminho_imagem and regiao is None:
                 ui.message(_("Não foi possível encontrar a imagem para descrever"))
                 return
             
-            # Obtém os serviços disponíveis
-            servicos = self._obter_servicos_disponiveis()
-            if not servicos:
-                ui.message(_("Nenhum serviço de descrição disponível"))
-                return
-            
-            servico_primario = servicos[0]
-            servicos_alternativos = servicos[1:] if len(servicos) > 1 else []
-            
             # Informa que está processando
             ui.message(_("Processando imagem, aguarde..."))
             
-            # Gera a descrição
-            resultado = gerar_descricao_imagem(
-                servico_primario,
-                servicos_alternativos,
-                caminho_imagem
-            )
+            # O prazo conta a partir do comando e vale para todas as tentativas
+            prazo = Prazo(self.configuracao.timeout_api)
             
-            # Processa o resultado
-            if isinstance(resultado, Success):
-                descricao = resultado.unwrap()
-                ui.message(descricao.texto)
+            # Gera a descrição em segundo plano, depois que a inicialização terminar
+            if duas_etapas:
+                detalhada: Future = Future()
+                self._descricao_detalhada = detalhada
+                self.executor.submeter(
+                    lambda cancelamento: self._descrever_em_duas_etapas(
+                        caminho_imagem, regiao, cancelamento, prazo, detalhada
+                    ),
+                    self._anunciar_resultado
+                )
+            elif self.configuracao.descricao_em_fluxo:
+                self._cancelamento_fluxo = self.executor.submeter(
+                    lambda cancelamento: self._descrever_em_fluxo(caminho_imagem, regiao, cancelamento, prazo, nivel),
+                    self._anunciar_falha
+                )
             else:
-                ui.message(_("Erro ao descrever imagem: ") + resultado.failure())
+                self.executor.submeter(
+                    lambda cancelamento: self._descrever(caminho_imagem, regiao, cancelamento, prazo, nivel),
+                    self._anunciar_resultado
+                )
         else:
             ui.message(_("Não há imagem em foco"))
     
+    def _descrever(
+        self,
+        caminho_imagem: Optional[str],
+        regiao: Optional[RegiaoTela],
+        cancelamento: TokenCancelamento,
+        prazo: Prazo,
+        nivel: NivelDetalhe,
+        agendar_detalhada: Optional[AgendarDetalhada] = None
+    ) -> Result[Descricao, str]:
+        """Descreve a imagem pelo caminho ou, sem ele, pela captura da região."""
+        if caminho_imagem:
+            return self._aguardar_prontidao(prazo).bind(
+                lambda servicos: gerar_descricao_imagem(
+                    servicos[0],
+                    servicos[1:],
+                    caminho_imagem,
+                    cancelamento,
+                    self.configuracao.modo_fallback,
+                    self.monitor_saude.latencias,
+                    prazo,
+                    self.baixador,
+                    nivel,
+                    agendar_detalhada,
+                    ultimo_recurso=self._obter_ultimo_recurso(servicos)
+                )
+            )
+        
+        # A captura vem antes da espera pela inicialização, com a tela que o usuário tem agora
+        return self.captura.capturar(regiao).bind(
+            lambda conteudo: self._aguardar_prontidao(prazo).bind(
+                lambda servicos: gerar_descricao_imagem_bytes(
+                    servicos[0],
+                    servicos[1:],
+                    conteudo,
+                    cancelamento,
+                    self.configuracao.modo_fallback,
+                    self.monitor_saude.latencias,
+                    prazo,
+                    nivel,
+                    agendar_detalhada,
+                    ultimo_recurso=self._obter_ultimo_recurso(servicos)
+                )
+            )
+        )
+    
+    def _descrever_em_duas_etapas(
+        self,
+        caminho_imagem: Optional[str],
+        regiao: Optional[RegiaoTela],
+        cancelamento: TokenCancelamento,
+        prazo: Prazo,
+        detalhada: Future
+    ) -> Result[Descricao, str]:
+        """
+        Retorna o texto alternativo e deixa a descrição detalhada em detalhada,
+        preenchida só pela segunda etapa, no executor de fundo. A falha da
+        primeira etapa só vale para a detalhada se a segunda nem começou
+        (imagem que não pôde ser capturada ou carregada).
+        """
+        iniciada = threading.Event()
+        
+        def agendar_detalhada(descrever: Callable[[], Result[Descricao, str]]) -> None:
+            iniciada.set()
+            self.executor.executar_em_segundo_plano(descrever, detalhada.set_result)
+        
+        resultado = self._descrever(
+            caminho_imagem, regiao, cancelamento, prazo, NivelDetalhe.TEXTO_ALTERNATIVO,
+            agendar_detalhada
+        )
+        if isinstance(resultado, Failure) and not iniciada.is_set():
+            detalhada.set_result(resultado)
+        return resultado
+    
+    def _descrever_em_fluxo(
+        self,
+        caminho_imagem: Optional[str],
+        regiao: Optional[RegiaoTela],
+        cancelamento: TokenCancelamento,
+        prazo: Prazo,
+        nivel: NivelDetalhe
+    ) -> Result[Descricao, str]:
+        """Como _descrever, falando cada frase assim que ela fica pronta."""
+        def ao_receber_frase(frase: str) -> None:
+            wx.CallAfter(self._falar_frase, frase, cancelamento)
+        
+        if caminho_imagem:
+            return self._aguardar_prontidao(prazo).bind(
+                lambda servicos: gerar_descricao_imagem_em_fluxo(
+                    servicos[0],
+                    servicos[1:],
+                    caminho_imagem,
+                    ao_receber_frase,
+                    cancelamento,
+                    self.configuracao.modo_fallback,
+                    self.monitor_saude.latencias,
+                    prazo,
+                    self.baixador,
+                    nivel,
+                    ultimo_recurso=self._obter_ultimo_recurso(servicos)
+                )
+            )
+        
+        return self.captura.capturar(regiao).bind(
+            lambda conteudo: self._aguardar_prontidao(prazo).bind(
+                lambda servicos: gerar_descricao_imagem_bytes_em_fluxo(
+                    servicos[0],
+                    servicos[1:],
+                    conteudo,
+                    ao_receber_frase,
+                    cancelamento,
+                    self.configuracao.modo_fallback,
+                    self.monitor_saude.latencias,
+                    prazo,
+                    nivel,
+                    ultimo_recurso=self._obter_ultimo_recurso(servicos)
+                )
+            )
+        )
+    
+    @staticmethod
+    def _obter_regiao_objeto(obj) -> Optional[RegiaoTela]:
+        """Retângulo do objeto na tela; None se ele não tiver área visível."""
+        try:
+            esquerda, topo, largura, altura = obj.location
+        except Exception:
+            return None
+        if largura <= 0 or altura <= 0:
+            return None
+        return RegiaoTela(esquerda, topo, largura, altura)
+    
+    @scriptHandler.script(
+        description=_("Descreve todas as imagens da página ou documento atual usando IA"),
+        gesture="kb:NVDA+alt+shift+d"
+    )
+    def script_descrever_imagens_documento(self, gesture) -> None:
+        """Descreve em paralelo as imagens do documento, começando pelas mais próximas do cursor."""
+        if self.executor.cancelar_atual():
+            ui.message(_("Descrição cancelada"))
+            return
+        
+        imagens = self._coletar_imagens_documento()
+        if not imagens:
+            ui.message(_("Nenhuma imagem encontrada no documento"))
+            return
+        
+        rotulos = [rotulo for rotulo, _caminho in imagens]
+        caminhos = [caminho for _rotulo, caminho in imagens]
+        
+        dialogo = DescricoesLoteDialog(gui.mainFrame, rotulos, self._ao_fechar_lote)
+        self._dialogo_lote = dialogo
+        
+        ui.message(_("Descrevendo {0} imagens").format(len(caminhos)))
+        prazo_inicializacao = Prazo(self.configuracao.timeout_api)
+        self._cancelamento_lote = self.executor.submeter(
+            lambda cancelamento: self._aguardar_prontidao(prazo_inicializacao).bind(
+                lambda servicos: gerar_descricoes_em_lote(
+                    servicos[0],
+                    servicos[1:],
+                    caminhos,
+                    lambda indice, resultado: wx.CallAfter(self._atualizar_lote, dialogo, indice, resultado),
+                    cancelamento,
+                    self.configuracao.modo_fallback,
+                    self.monitor_saude.latencias,
+                    self.configuracao.timeout_api,
+                    baixador=self.baixador,
+                    nivel=self.configuracao.nivel_detalhe,
+                    ultimo_recurso=self._obter_ultimo_recurso(servicos)
+                )
+            ),
+            lambda resultado: self._concluir_lote(dialogo, resultado)
+        )
+        
+        gui.mainFrame.prePopup()
+        dialogo.Show()
+        gui.mainFrame.postPopup()
+    
+    @scriptHandler.script(
+        description=_(
+            "Informa a latência e a taxa de acertos do cache; "
+            "pressionado duas vezes, grava as medições no log do NVDA"
+        ),
+        gesture="kb:NVDA+alt+e"
+    )
+    def script_informar_estatisticas(self, gesture) -> None:
+        """Fala p50/p95 por provedor e a taxa de acertos do cache, ou grava as medições no log."""
+        if scriptHandler.getLastScriptRepeatCount() == 1:
+            linhas = list(REGISTRO_METRICAS.linhas_json())
+            log.info("Camille: medições de desempenho\n" + "\n".join(linhas))
+            ui.message(_("{0} linhas de medição gravadas no log").format(len(linhas)))
+            return
+        
+        ui.message(self._resumo_estatisticas())
+    
+    def _resumo_estatisticas(self) -> str:
+        partes = []
+        for provedor in ProvedorIA:
+            tentativas = REGISTRO_METRICAS.contagem('tentativa', provedor)
+            if not tentativas:
+                continue
+            partes.append(_("{provedor}: mediana {p50:.1f} segundos, p95 {p95:.1f} segundos, {n} tentativas").format(
+                provedor=provedor.name.capitalize(),
+                p50=REGISTRO_METRICAS.percentil('tentativa', provedor, 0.5),
+                p95=REGISTRO_METRICAS.percentil('tentativa', provedor, 0.95),
+                n=tentativas
+            ))
+        if not partes:
+            partes.append(_("Nenhuma descrição medida ainda"))
+        
+        consultas = self.cache.acertos + self.cache.falhas
+        if consultas:
+            partes.append(_("Cache: {taxa:.0%} de acertos em {n} consultas").format(
+                taxa=self.cache.acertos / consultas,
+                n=consultas
+            ))
+        return ". ".join(partes)
+    
+    def _coletar_imagens_documento(self) -> List[Tuple[str, str]]:
+        """
+        Coleta rótulo e caminho das imagens do documento em modo de navegação,
+        alternando entre a próxima e a anterior ao cursor para que as mais
+        próximas sejam descritas primeiro.
+        """
+        documento = getattr(api.getFocusObject(), 'treeInterceptor', None)
+        if documento is None or not hasattr(documento, '_iterNodesByType'):
+            return []
+        
+        try:
+            cursor = documento.selection
+        except Exception:
+            cursor = None
+        
+        def percorrer(direcao: str) -> Iterator[Any]:
+            try:
+                for item in documento._iterNodesByType('graphic', direcao, cursor):
+                    yield item.obj
+            except Exception:
+                return
+        
+        imagens: List[Tuple[str, str]] = []
+        vistos = set()
+        for par in zip_longest(percorrer('next'), percorrer('previous')):
+            for obj in par:
+                if obj is None:
+                    continue
+                caminho = self._obter_caminho_imagem(obj)
+                if not caminho or caminho in vistos:
+                    continue
+                vistos.add(caminho)
+                imagens.append((obj.name or _("Imagem {0}").format(len(imagens) + 1), caminho))
+            if len(imagens) >= MAX_IMAGENS_LOTE:
+                break
+        return imagens[:MAX_IMAGENS_LOTE]
+    
+    def _atualizar_lote(self, dialogo: DescricoesLoteDialog, indice: int, resultado: Result[Descricao, str]) -> None:
+        """Entrega o resultado de uma imagem à lista, se ela ainda estiver aberta."""
+        if self._dialogo_lote is dialogo:
+            dialogo.atualizar(indice, resultado)
+    
+    def _concluir_lote(self, dialogo: DescricoesLoteDialog, resultado: Result[int, str]) -> None:
+        if self._dialogo_lote is dialogo:
+            dialogo.concluir(resultado)
+    
+    def _ao_fechar_lote(self) -> None:
+        """Fechar a lista cancela as descrições que ainda não terminaram."""
+        self._dialogo_lote = None
+        if self._cancelamento_lote is not None:
+            self._cancelamento_lote.cancelar()
+            self._cancelamento_lote = None
+    
+    def _anunciar_resultado(self, resultado: Result[Descricao, str]) -> None:
+        """Fala o resultado de uma descrição; chamado na thread principal."""
+        if isinstance(resultado, Success):
+            descricao = resultado.unwrap()
+            ui.message(descricao.texto)
+        else:
+            ui.message(_("Erro ao descrever imagem: ") + resultado.failure())
+    
+    def _anunciar_falha(self, resultado: Result[Descricao, str]) -> None:
+        """Fala apenas falhas; no modo em fluxo as frases já foram faladas."""
+        if not isinstance(resultado, Success):
+            ui.message(_("Erro ao descrever imagem: ") + resultado.failure())
+    
+    def _falar_frase(self, frase: str, cancelamento: TokenCancelamento) -> None:
+        """Fala uma frase da descrição em fluxo, se o pedido ainda estiver ativo."""
+        if not cancelamento.cancelado:
+            ui.message(frase)
+    
+    def _ao_executar_gesto(self, gesture) -> bool:
+        """Interrompe a descrição em fluxo quando o usuário pressiona uma tecla."""
+        cancelamento = self._cancelamento_fluxo
+        if (
+            cancelamento is not None and
+            not cancelamento.cancelado and
+            not getattr(gesture, 'isModifier', False) and
+            # Os próprios comandos de descrição tratam o cancelamento
+            getattr(gesture, 'script', None) not in (
+                self.script_descrever_imagem,
+                self.script_descrever_texto_alternativo,
+                self.script_descrever_resumo
+            )
+        ):
+            cancelamento.cancelar()
+        return True
+    
+    def event_gainFocus(self, obj, nextHandler) -> None:
+        """Cancela a descrição em andamento quando o foco muda, exceto com a lista do lote aberta."""
+        if self._dialogo_lote is None:
+            self.executor.cancelar_atual()
+        self._agendar_pre_carregamento(obj)
+        nextHandler()
+    
+    def _agendar_pre_carregamento(self, obj) -> None:
+        """Com o pré-carregamento ativo, agenda a descrição da imagem que recebeu o foco."""
+        self.pre_carregador.cancelar()
+        if not self.configuracao.pre_carregamento or not self._eh_imagem(obj):
+            return
+        
+        caminho_imagem = self._obter_caminho_imagem(obj)
+        if caminho_imagem:
+            self.pre_carregador.agendar(
+                caminho_imagem,
+                lambda cancelamento: self._pre_carregar(caminho_imagem, cancelamento)
+            )
+            return
+        
+        # Sem caminho, a região do objeto é capturada quando o atraso termina
+        regiao = self._obter_regiao_objeto(obj)
+        if regiao is None:
+            return
+        self.pre_carregador.agendar_captura(
+            lambda: self.captura.capturar(regiao),
+            self._pre_carregar_captura
+        )
+    
+    def _pre_carregar(self, caminho_imagem: str, cancelamento: TokenCancelamento) -> Result[Descricao, str]:
+        """
+        Descreve a imagem só para guardar no cache, no nível de detalhe
+        configurado. Usa o fallback sequencial, o mais barato, e nada é falado.
+        """
+        prazo = Prazo(self.configuracao.timeout_api)
+        return self._aguardar_prontidao(prazo).bind(
+            lambda servicos: gerar_descricao_imagem(
+                servicos[0],
+                servicos[1:],
+                caminho_imagem,
+                cancelamento,
+                ModoFallback.SEQUENCIAL,
+                self.monitor_saude.latencias,
+                prazo,
+                self.baixador,
+                self.configuracao.nivel_detalhe
+            )
+        )
+    
+    def _pre_carregar_captura(self, conteudo: bytes, cancelamento: TokenCancelamento) -> Result[Descricao, str]:
+        """Como _pre_carregar, para a imagem capturada da tela."""
+        prazo = Prazo(self.configuracao.timeout_api)
+        return self._aguardar_prontidao(prazo).bind(
+            lambda servicos: gerar_descricao_imagem_bytes(
+                servicos[0],
+                servicos[1:],
+                conteudo,
+                cancelamento,
+                ModoFallback.SEQUENCIAL,
+                self.monitor_saude.latencias,
+                prazo,
+                self.configuracao.nivel_detalhe
+            )
+        )
+    
+    @staticmethod
+    def _eh_imagem(obj) -> bool:
+        return controlTypes.State.GRAPHIC in obj.states or obj.role == controlTypes.Role.GRAPHIC
+    
     def _obter_caminho_imagem(self, obj) -> Optional[str]:
         """
         Obtém o caminho da imagem do objeto NVDA.
@@ -311,6 +1068,7 @@ def _criar_menu(self) -> None:
     def _obter_servicos_disponiveis(self) -> List[ServicoIA]:
         """Obtém a lista de serviços disponíveis de acordo com a configuração."""
         servicos: List[ServicoIA] = []
+        servico_local = self.adaptadores.get(ProvedorIA.LOCAL)
         
         # Se não estiver no modo offline e o serviço primário estiver configurado
         if not self.configuracao.modo_offline:
@@ -322,15 +1080,38 @@ def _criar_menu(self) -> None:
             for provedor, servico in self.adaptadores.items():
                 if (
                     provedor != self.configuracao.provedor_primario and 
+                    provedor != ProvedorIA.LOCAL and
                     servico is not None
                 ):
                     servicos.append(servico)
         
+        # Provedores lentos ou com o circuito aberto vão para o fim da fila
+        servicos = self.monitor_saude.ordenar(servicos)
+        
+        # O modelo local responde sozinho no modo offline ou sem provedores
+        # remotos configurados; fora disso, é o último recurso, à parte
+        if not servicos and servico_local is not None:
+            servicos.append(servico_local)
         return servicos
     
+    def _obter_ultimo_recurso(self, servicos: List[ServicoIA]) -> Optional[ServicoIA]:
+        """
+        Modelo local tentado só depois que os serviços remotos falharem por
+        rede ou por tempo, fora da divisão do prazo entre eles.
+        """
+        servico_local = self.adaptadores.get(ProvedorIA.LOCAL)
+        if servico_local is None or servico_local in servicos:
+            return None
+        return servico_local
+    
     def terminate(self):
         """Finaliza o plugin."""
         super(GlobalPlugin, self).terminate()
+        inputCore.decide_executeGesture.unregister(self._ao_executar_gesto)
+        self.executor.encerrar()
+        self.pre_carregador.encerrar()
+        self.baixador.fechar()
+        self.clientes.fechar()
         # Remove o item de menu
         try:
             self.menu.Remove(self.item_menu)
@@ -0,0 +1,278 @@
+# infraestrutura/limitador_taxa.py
+import time
+import random
+import threading
+from itertools import chain
+from typing import Callable, Iterator, Optional
+from returns.result import Result, Success, Failure
+
+from entidades import (
+    CaminhoImagem, CategoriaErro, DescricaoImagem, ErroIA, LimiteTaxa, NivelDetalhe, categoria_erro
+)
+from servico_ia import ServicoIA, DecoradorServicoIA, descrever_em_fragmentos
+from tratador_erros import classificar_excecao
+from prazo import Prazo
+
+# Chamadas simultâneas por provedor; pedidos em lote esperam a vez em fila
+MAX_CHAMADAS_SIMULTANEAS = 3
+# Tentativas por categoria de erro, dentro do prazo do pedido. As demais
+# categorias (chave inválida, imagem recusada, conteúdo bloqueado, tempo
+# esgotado) não são repetidas: outra tentativa daria o mesmo resultado
+MAX_TENTATIVAS = {
+    CategoriaErro.COTA: 3,
+    CategoriaErro.TRANSITORIO: 2,
+}
+# Base e teto do backoff exponencial quando o provedor não informa a espera
+ESPERA_BASE_COTA = 0.5
+ESPERA_MAXIMA_COTA = 8.0
+
+class BaldeTokens:
+    """
+    Balde de tokens: enche à taxa da cota até a capacidade da rajada e cada
+    requisição consome um token. Um pedido sem token disponível reserva o
+    próximo e espera por ele, em vez de falhar.
+    """
+
+    def __init__(self, limite: LimiteTaxa):
+        self.taxa = limite.requisicoes_por_minuto / 60.0
+        self.capacidade = float(max(1, limite.rajada))
+        self._tokens = self.capacidade
+        self._atualizado_em = time.monotonic()
+        self._bloqueado_ate = 0.0
+        self._trava = threading.Lock()
+
+    def reservar(self, espera_maxima: Optional[float] = None) -> Optional[float]:
+        """
+        Reserva um token e retorna quantos segundos esperar por ele.
+        Retorna None, sem reservar, se a espera passar de espera_maxima.
+        """
+        with self._trava:
+            agora = time.monotonic()
+            self._tokens = min(
+                self.capacidade,
+                self._tokens + (agora - self._atualizado_em) * self.taxa
+            )
+            self._atualizado_em = agora
+
+            # Tokens negativos são reservas de quem já está na fila
+            espera = max(0.0, (1.0 - self._tokens) / self.taxa, self._bloqueado_ate - agora)
+            if espera_maxima is not None and espera > espera_maxima:
+                return None
+            self._tokens -= 1.0
+            return espera
+
+    def disponiveis(self) -> float:
+        """Tokens que podem ser consumidos agora, sem esperar."""
+        with self._trava:
+            agora = time.monotonic()
+            if self._bloqueado_ate > agora:
+                return 0.0
+            return min(self.capacidade, self._tokens + (agora - self._atualizado_em) * self.taxa)
+
+    def bloquear(self, segundos: float) -> None:
+        """Suspende as requisições pelo tempo pedido pelo provedor."""
+        with self._trava:
+            self._bloqueado_ate = max(self._bloqueado_ate, time.monotonic() + segundos)
+
+class _FluxoLimitado:
+    """
+    Repassa os fragmentos de um fluxo e libera a vaga do provedor quando o
+    fluxo termina, falha ou é fechado, mesmo que nunca tenha sido lido.
+    """
+
+    def __init__(self, fragmentos: Iterator[str], original: Iterator[str], liberar: Callable[[], None]):
+        self._fragmentos = fragmentos
+        self._original = original
+        self._liberar: Optional[Callable[[], None]] = liberar
+
+    def __iter__(self) -> '_FluxoLimitado':
+        return self
+
+    def __next__(self) -> str:
+        try:
+            return next(self._fragmentos)
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self) -> None:
+        liberar, self._liberar = self._liberar, None
+        if liberar is None:
+            return
+        try:
+            fechar = getattr(self._original, 'close', None)
+            if fechar is not None:
+                fechar()
+        finally:
+            liberar()
+
+    def __del__(self):
+        self.close()
+
+class ServicoIALimitado(DecoradorServicoIA):
+    """
+    Decorador que respeita a cota do provedor: limita as chamadas
+    simultâneas, espaça as requisições com um balde de tokens (se o serviço
+    declarar limite_taxa) e, após uma resposta 429 ou uma falha transitória,
+    espera o Retry-After ou um backoff exponencial com jitter e tenta de
+    novo. Toda espera respeita o prazo do pedido; quando não cabe nele, a
+    falha é devolvida na hora.
+    """
+
+    def __init__(self, servico: ServicoIA, max_simultaneas: int = MAX_CHAMADAS_SIMULTANEAS):
+        super().__init__(servico)
+        self._vagas = threading.BoundedSemaphore(max_simultaneas)
+        limite = getattr(servico, 'limite_taxa', None)
+        self.balde: Optional[BaldeTokens] = BaldeTokens(limite) if limite is not None else None
+
+    def descrever_imagem(self, caminho_imagem: CaminhoImagem, prazo: Optional[Prazo] = None, nivel: NivelDetalhe = NivelDetalhe.DETALHADO) -> Result[DescricaoImagem, ErroIA]:
+        return self._com_novas_tentativas(
+            lambda: self._limitar(lambda: self.servico.descrever_imagem(caminho_imagem, prazo, nivel), prazo),
+            prazo
+        )
+
+    def descrever_imagem_bytes(self, imagem_bytes: bytes, mime_type: str, prazo: Optional[Prazo] = None, nivel: NivelDetalhe = NivelDetalhe.DETALHADO, resumo: Optional[bytes] = None) -> Result[DescricaoImagem, ErroIA]:
+        return self._com_novas_tentativas(
+            lambda: self._limitar(lambda: self.servico.descrever_imagem_bytes(imagem_bytes, mime_type, prazo, nivel, resumo), prazo),
+            prazo
+        )
+
+    def descrever_bloco_bytes(self, imagem_bytes: bytes, mime_type: str, indice: int, total: int, prazo: Optional[Prazo] = None, nivel: NivelDetalhe = NivelDetalhe.DETALHADO, resumo: Optional[bytes] = None) -> Result[DescricaoImagem, ErroIA]:
+        return self._com_novas_tentativas(
+            lambda: self._limitar(lambda: self.servico.descrever_bloco_bytes(imagem_bytes, mime_type, indice, total, prazo, nivel, resumo), prazo),
+            prazo
+        )
+
+    def comporta(self, requisicoes: int) -> bool:
+        """
+        Indica se a cota permite tantas requisições agora, sem espera. Usado
+        antes de dividir uma imagem em blocos: cada bloco e a junção consomem
+        um token, e uma divisão que esvaziaria o balde não compensa.
+        """
+        return self.balde is None or self.balde.disponiveis() >= requisicoes
+
+    def gerar_texto(self, instrucao: str, prazo: Optional[Prazo] = None, nivel: NivelDetalhe = NivelDetalhe.DETALHADO) -> Result[str, ErroIA]:
+        """Chamadas só de texto consomem a mesma cota das descrições."""
+        return self._com_novas_tentativas(
+            lambda: self._limitar(lambda: self.servico.gerar_texto(instrucao, prazo, nivel), prazo),
+            prazo
+        )
+
+    def descrever_imagem_bytes_stream(self, imagem_bytes: bytes, mime_type: str, prazo: Optional[Prazo] = None, nivel: NivelDetalhe = NivelDetalhe.DETALHADO, resumo: Optional[bytes] = None) -> Result[Iterator[str], ErroIA]:
+        """
+        A vaga fica ocupada até o fluxo terminar, não só até ele ser aberto.
+        O primeiro fragmento é lido aqui: alguns SDKs só enviam a requisição
+        nesse momento, e um 429 ainda pode ser tentado de novo sem que nada
+        tenha sido falado.
+        """
+        return self._com_novas_tentativas(lambda: self._abrir_fluxo(imagem_bytes, mime_type, prazo, nivel, resumo), prazo)
+
+    def _abrir_fluxo(
+        self,
+        imagem_bytes: bytes,
+        mime_type: str,
+        prazo: Optional[Prazo],
+        nivel: NivelDetalhe,
+        resumo: Optional[bytes]
+    ) -> Result[Iterator[str], ErroIA]:
+        if not self._aguardar_cota(prazo):
+            return self._sem_cota()
+        if not self._ocupar_vaga(prazo):
+            return self._sem_vaga()
+
+        try:
+            resultado = descrever_em_fragmentos(self.servico, imagem_bytes, mime_type, prazo, nivel, resumo)
+            if not isinstance(resultado, Success):
+                self._vagas.release()
+                return resultado
+
+            fragmentos = resultado.unwrap()
+            try:
+                primeiro = [next(fragmentos)]
+            except StopIteration:
+                primeiro = []
+            except Exception as e:
+                fechar = getattr(fragmentos, 'close', None)
+                if fechar is not None:
+                    fechar()
+                self._vagas.release()
+                return Failure(classificar_excecao(e, self.servico.provedor.name))
+        except BaseException:
+            self._vagas.release()
+            raise
+
+        return Success(_FluxoLimitado(chain(primeiro, fragmentos), fragmentos, self._vagas.release))
+
+    def _aguardar_cota(self, prazo: Optional[Prazo]) -> bool:
+        """Espera um token do balde; recusa de imediato se a espera não couber no prazo."""
+        if self.balde is None:
+            return True
+        espera = self.balde.reservar(prazo.restante if prazo is not None else None)
+        if espera is None:
+            return False
+        if espera > 0:
+            time.sleep(espera)
+        return True
+
+    def _ocupar_vaga(self, prazo: Optional[Prazo]) -> bool:
+        return self._vagas.acquire(timeout=prazo.restante if prazo is not None else None)
+
+    def _sem_cota(self) -> Result:
+        # A espera pela cota não cabe no prazo: repetir dentro dele não adianta
+        return Failure(ErroIA(
+            f'{self.servico.provedor.name}: cota de requisições esgotada até o fim do prazo',
+            CategoriaErro.TEMPO_ESGOTADO
+        ))
+
+    def _sem_vaga(self) -> Result:
+        return Failure(ErroIA(
+            f'{self.servico.provedor.name}: tempo esgotado aguardando vaga no provedor',
+            CategoriaErro.TEMPO_ESGOTADO
+        ))
+
+    def _limitar(self, chamar: Callable[[], Result], prazo: Optional[Prazo]) -> Result:
+        if not self._aguardar_cota(prazo):
+            return self._sem_cota()
+        if not self._ocupar_vaga(prazo):
+            return self._sem_vaga()
+        try:
+            return chamar()
+        finally:
+            self._vagas.release()
+
+    def _com_novas_tentativas(self, chamar: Callable[[], Result], prazo: Optional[Prazo]) -> Result:
+        """
+        Repete a chamada só quando outra tentativa pode dar certo (cota
+        excedida ou falha transitória), enquanto a espera couber no prazo.
+        """
+        tentativa = 0
+        while True:
+            resultado = chamar()
+            if isinstance(resultado, Success):
+                return resultado
+
+            erro = resultado.failure()
+            categoria = categoria_erro(erro)
+            if categoria not in MAX_TENTATIVAS:
+                return resultado
+
+            tentativa += 1
+            espera_pedida = getattr(erro, 'espera', None)
+            bloquear_balde = (
+                categoria == CategoriaErro.COTA and espera_pedida is not None and self.balde is not None
+            )
+            if bloquear_balde:
+                # A espera pedida pelo provedor vale para todos os pedidos, não só este
+                self.balde.bloquear(espera_pedida)
+
+            if espera_pedida is not None:
+                espera = espera_pedida
+            else:
+                # Backoff exponencial com jitter completo
+                espera = random.uniform(0, min(ESPERA_MAXIMA_COTA, ESPERA_BASE_COTA * 2 ** tentativa))
+
+            if tentativa >= MAX_TENTATIVAS[categoria] or (prazo is not None and espera >= prazo.restante):
+                return resultado
+            # Com o balde bloqueado, a próxima tentativa já espera por ele
+            if not bloquear_balde:
+                time.sleep(espera)
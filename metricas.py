@@ -0,0 +1,132 @@
+# infraestrutura/metricas.py
+import json
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from entidades import ProvedorIA
+from estatisticas_latencia import JanelaLatencia
+
+# Amostras mantidas por etapa e provedor
+TAMANHO_JANELA_METRICAS = 100
+# Medições individuais mantidas para exportação ao log
+MAX_MEDICOES_RECENTES = 200
+
+class _HistogramaEtapa:
+    """Durações recentes de uma etapa de um provedor e os totais acumulados."""
+
+    def __init__(self):
+        self.duracoes = JanelaLatencia(TAMANHO_JANELA_METRICAS)
+        self.contagem = 0
+        self.falhas = 0
+        self.bytes_enviados = 0
+        self.bytes_resposta = 0
+
+class RegistroMetricas:
+    """
+    Registra a duração de cada etapa de um pedido (leitura, preprocessamento,
+    codificação, requisição...), agrupada por etapa e provedor, além dos
+    bytes enviados e recebidos. Seguro para uso entre threads.
+    """
+
+    def __init__(self):
+        self._histogramas: Dict[Tuple[str, Optional[ProvedorIA]], _HistogramaEtapa] = {}
+        self._recentes: deque = deque(maxlen=MAX_MEDICOES_RECENTES)
+        self._trava = threading.Lock()
+
+    def registrar(
+        self,
+        etapa: str,
+        provedor: Optional[ProvedorIA],
+        segundos: float,
+        dados: Dict[str, Any]
+    ) -> None:
+        """Acrescenta a medição de uma etapa."""
+        sucesso = dados.get('sucesso', True)
+        with self._trava:
+            histograma = self._histogramas.get((etapa, provedor))
+            if histograma is None:
+                histograma = self._histogramas[(etapa, provedor)] = _HistogramaEtapa()
+            histograma.duracoes.registrar(segundos)
+            histograma.contagem += 1
+            histograma.falhas += 0 if sucesso else 1
+            histograma.bytes_enviados += dados.get('bytes_enviados', 0)
+            histograma.bytes_resposta += dados.get('bytes_resposta', 0)
+
+            self._recentes.append({
+                'etapa': etapa,
+                'provedor': provedor.name if provedor is not None else None,
+                'momento': round(time.time(), 3),
+                'duracao_ms': round(segundos * 1000, 1),
+                **dados,
+            })
+
+    def percentil(self, etapa: str, provedor: Optional[ProvedorIA], fracao: float) -> Optional[float]:
+        """Percentil das durações da etapa, em segundos; None se não houver medições."""
+        with self._trava:
+            histograma = self._histogramas.get((etapa, provedor))
+            return histograma.duracoes.percentil(fracao) if histograma is not None else None
+
+    def contagem(self, etapa: str, provedor: Optional[ProvedorIA]) -> int:
+        with self._trava:
+            histograma = self._histogramas.get((etapa, provedor))
+            return histograma.contagem if histograma is not None else 0
+
+    def resumo(self) -> List[Dict[str, Any]]:
+        """Resumo de cada etapa e provedor: contagem, falhas, p50, p95 e bytes."""
+        with self._trava:
+            itens = list(self._histogramas.items())
+            resumos = []
+            for (etapa, provedor), histograma in itens:
+                p50 = histograma.duracoes.percentil(0.5)
+                p95 = histograma.duracoes.percentil(0.95)
+                resumos.append({
+                    'etapa': etapa,
+                    'provedor': provedor.name if provedor is not None else None,
+                    'contagem': histograma.contagem,
+                    'falhas': histograma.falhas,
+                    'p50_ms': round(p50 * 1000, 1) if p50 is not None else None,
+                    'p95_ms': round(p95 * 1000, 1) if p95 is not None else None,
+                    'bytes_enviados': histograma.bytes_enviados,
+                    'bytes_resposta': histograma.bytes_resposta,
+                })
+            return resumos
+
+    def linhas_json(self) -> Iterator[str]:
+        """Resumo e medições recentes, uma linha JSON por item."""
+        for resumo in self.resumo():
+            yield json.dumps({'tipo': 'resumo', **resumo}, ensure_ascii=False)
+        with self._trava:
+            recentes = list(self._recentes)
+        for medicao in recentes:
+            yield json.dumps({'tipo': 'medicao', **medicao}, ensure_ascii=False)
+
+    def limpar(self) -> None:
+        with self._trava:
+            self._histogramas.clear()
+            self._recentes.clear()
+
+# Registro único do complemento: adaptadores e casos de uso registram nele
+REGISTRO_METRICAS = RegistroMetricas()
+
+@contextmanager
+def medir_etapa(etapa: str, provedor: Optional[ProvedorIA] = None, **dados: Any) -> Iterator[Dict[str, Any]]:
+    """
+    Mede a duração do bloco e a registra em REGISTRO_METRICAS. O dicionário
+    retornado aceita dados da medição, como bytes_enviados, bytes_resposta
+    e sucesso; uma exceção no bloco marca a etapa como falha.
+    """
+    inicio = time.perf_counter()
+    try:
+        yield dados
+    except GeneratorExit:
+        # Fluxo fechado antes do fim, em geral por cancelamento do usuário
+        dados['interrompido'] = True
+        raise
+    except BaseException:
+        dados['sucesso'] = False
+        raise
+    finally:
+        REGISTRO_METRICAS.registrar(etapa, provedor, time.perf_counter() - inicio, dados)
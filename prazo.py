@@ -0,0 +1,41 @@
+# dominio/prazo.py
+import time
+
+# Fração do tempo restante dada à tentativa atual quando outras ainda podem
+# vir depois dela: o primário, que quase sempre responde, fica com a maior parte
+FRACAO_TENTATIVA_ATUAL = 0.7
+
+class Prazo:
+    """
+    Prazo de um pedido, medido no relógio monotônico.
+    Criado uma vez por pedido e repartido entre as tentativas.
+    """
+
+    def __init__(self, segundos: float):
+        self.segundos = segundos
+        self._limite = time.monotonic() + segundos
+
+    @property
+    def restante(self) -> float:
+        """Segundos que ainda restam, nunca negativo."""
+        return max(0.0, self._limite - time.monotonic())
+
+    @property
+    def expirado(self) -> bool:
+        """Indica se o prazo já se esgotou."""
+        return time.monotonic() >= self._limite
+
+    @property
+    def milissegundos_restantes(self) -> int:
+        """Tempo restante em milissegundos, no formato dos timeouts dos SDKs."""
+        return max(1, int(self.restante * 1000))
+
+    def dividir(self, tentativas_restantes: int) -> 'Prazo':
+        """
+        Orçamento de uma tentativa: a maior parte do tempo restante, ou todo
+        ele na última tentativa. O tempo que uma tentativa não usar fica para
+        as seguintes, e a soma nunca ultrapassa o prazo do pedido.
+        """
+        if tentativas_restantes <= 1:
+            return Prazo(self.restante)
+        return Prazo(self.restante * FRACAO_TENTATIVA_ATUAL)
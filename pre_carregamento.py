@@ -0,0 +1,193 @@
+# infraestrutura/pre_carregamento.py
+import os
+import time
+import hashlib
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Deque, Optional
+from returns.result import Result, Success
+
+from cancelamento import TokenCancelamento
+
+# Tempo que o foco precisa permanecer na imagem antes do pré-carregamento
+ATRASO_PRE_CARREGAMENTO = 0.8
+# Janela do orçamento de pré-carregamentos, em segundos
+JANELA_ORCAMENTO = 3600.0
+# Imagens já pré-carregadas com sucesso, que não são pedidas de novo
+MAX_PRE_CARREGADAS_LEMBRADAS = 64
+
+def chave_caminho(caminho: str) -> str:
+    """
+    Identifica a versão atual do arquivo pelo caminho, data de modificação
+    e tamanho. URLs e caminhos que não podem ser consultados ficam só com o caminho.
+    """
+    try:
+        estado = os.stat(caminho)
+    except (OSError, ValueError):
+        return caminho
+    return f'{caminho}|{estado.st_mtime_ns}|{estado.st_size}'
+
+class OrcamentoPorHora:
+    """Limita quantas ações são feitas na última hora (janela deslizante)."""
+
+    def __init__(self, limite: int):
+        self.limite = limite
+        self._momentos: Deque[float] = deque()
+        self._trava = threading.Lock()
+
+    def consumir(self) -> bool:
+        """Registra uma ação se ainda houver orçamento; retorna se ela pode ser feita."""
+        with self._trava:
+            agora = time.monotonic()
+            while self._momentos and agora - self._momentos[0] >= JANELA_ORCAMENTO:
+                self._momentos.popleft()
+            if len(self._momentos) >= self.limite:
+                return False
+            self._momentos.append(agora)
+            return True
+
+class PreCarregador:
+    """
+    Pré-carrega descrições enquanto o foco está numa imagem, para que o
+    comando de descrição seja respondido pelo cache. O pedido só parte se
+    o foco ficar na imagem pelo atraso configurado, se não houver pedido
+    do usuário em andamento e se o orçamento por hora permitir. Roda numa
+    única thread própria, sem disputar o executor dos pedidos do usuário.
+    """
+
+    def __init__(
+        self,
+        limite_por_hora: int,
+        ocupado: Callable[[], bool] = lambda: False,
+        atraso: float = ATRASO_PRE_CARREGAMENTO
+    ):
+        """ocupado indica se há um pedido do usuário em andamento."""
+        self.orcamento = OrcamentoPorHora(limite_por_hora)
+        self.atraso = atraso
+        self._ocupado = ocupado
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='CamillePreCarregamento')
+        self._trava = threading.Lock()
+        # Cada agendamento ou cancelamento invalida os temporizadores anteriores
+        self._geracao = 0
+        self._temporizador: Optional[threading.Timer] = None
+        self._atual: Optional[TokenCancelamento] = None
+        self._em_andamento: Optional[str] = None
+        self._concluidas: Deque[str] = deque(maxlen=MAX_PRE_CARREGADAS_LEMBRADAS)
+
+    def definir_limite_por_hora(self, limite: int) -> None:
+        self.orcamento.limite = limite
+
+    def agendar(self, caminho: str, tarefa: Callable[[TokenCancelamento], Result[Any, str]]) -> None:
+        """
+        Agenda o pré-carregamento da imagem no caminho, cancelando o
+        agendamento anterior. A imagem é identificada pelo caminho junto da
+        data de modificação e do tamanho do arquivo, lidos depois do atraso:
+        um arquivo regravado no mesmo caminho é pré-carregado de novo.
+        """
+        with self._trava:
+            self._cancelar_pendente()
+            temporizador = threading.Timer(self.atraso, self._disparar_caminho, args=(self._geracao, caminho, tarefa))
+            temporizador.daemon = True
+            self._temporizador = temporizador
+        temporizador.start()
+
+    def agendar_captura(
+        self,
+        capturar: Callable[[], Result[bytes, str]],
+        tarefa: Callable[[bytes, TokenCancelamento], Result[Any, str]]
+    ) -> None:
+        """
+        Agenda o pré-carregamento de uma imagem sem caminho. A tela só é
+        capturada depois do atraso, e a imagem é identificada pelo hash do
+        conteúdo capturado, já que a mesma região pode mostrar outra imagem.
+        """
+        with self._trava:
+            self._cancelar_pendente()
+            temporizador = threading.Timer(self.atraso, self._disparar_captura, args=(self._geracao, capturar, tarefa))
+            temporizador.daemon = True
+            self._temporizador = temporizador
+        temporizador.start()
+
+    def cancelar(self) -> None:
+        """Cancela o agendamento e o pré-carregamento em andamento."""
+        with self._trava:
+            self._cancelar_pendente()
+            if self._atual is not None:
+                self._atual.cancelar()
+
+    def encerrar(self) -> None:
+        self.cancelar()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _cancelar_pendente(self) -> None:
+        self._geracao += 1
+        if self._temporizador is not None:
+            self._temporizador.cancel()
+            self._temporizador = None
+
+    def _ja_pedida(self, chave: str) -> bool:
+        return chave in self._concluidas or chave == self._em_andamento
+
+    def _disparar_caminho(
+        self,
+        geracao: int,
+        caminho: str,
+        tarefa: Callable[[TokenCancelamento], Result[Any, str]]
+    ) -> None:
+        with self._trava:
+            if geracao != self._geracao:
+                return
+        self._disparar(geracao, chave_caminho(caminho), tarefa)
+
+    def _disparar_captura(
+        self,
+        geracao: int,
+        capturar: Callable[[], Result[bytes, str]],
+        tarefa: Callable[[bytes, TokenCancelamento], Result[Any, str]]
+    ) -> None:
+        with self._trava:
+            if geracao != self._geracao:
+                return
+        captura = capturar()
+        if not isinstance(captura, Success):
+            return
+        conteudo = captura.unwrap()
+        chave = hashlib.sha256(conteudo).hexdigest()
+        self._disparar(geracao, chave, lambda cancelamento: tarefa(conteudo, cancelamento))
+
+    def _disparar(self, geracao: int, chave: str, tarefa: Callable[[TokenCancelamento], Result[Any, str]]) -> None:
+        with self._trava:
+            if geracao != self._geracao or self._ja_pedida(chave):
+                return
+            self._temporizador = None
+            # Pedidos do usuário têm prioridade sobre o pré-carregamento
+            if self._ocupado() or not self.orcamento.consumir():
+                return
+            if self._atual is not None:
+                self._atual.cancelar()
+            cancelamento = TokenCancelamento()
+            self._atual = cancelamento
+            self._em_andamento = chave
+        self._executor.submit(self._executar, chave, tarefa, cancelamento)
+
+    def _executar(
+        self,
+        chave: str,
+        tarefa: Callable[[TokenCancelamento], Result[Any, str]],
+        cancelamento: TokenCancelamento
+    ) -> None:
+        if cancelamento.cancelado:
+            resultado = None
+        else:
+            try:
+                resultado = tarefa(cancelamento)
+            except Exception:
+                resultado = None
+
+        with self._trava:
+            if isinstance(resultado, Success):
+                self._concluidas.append(chave)
+            if self._atual is cancelamento:
+                self._atual = None
+                self._em_andamento = None
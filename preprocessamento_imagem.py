@@ -0,0 +1,271 @@
+# infraestrutura/preprocessamento_imagem.py
+import io
+import os
+import math
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import replace
+from typing import Hashable, List, Optional, Tuple
+from returns.result import Result, Success, Failure
+
+from entidades import Imagem, PerfilImagem
+
+# Abaixo deste tamanho, imagens que já cabem no perfil são enviadas como estão
+TAMANHO_MAXIMO_SEM_RECODIFICAR = 256 * 1024
+
+# Formatos que não suportam transparência e precisam de fundo opaco
+FORMATOS_SEM_ALFA = {'JPEG'}
+
+# Imagens preprocessadas mantidas em memória e o total de bytes que elas podem reter
+MAX_PREPROCESSADAS = 8
+MAX_BYTES_PREPROCESSADAS = 16 * 1024 * 1024
+
+# Acima desta redução nem o texto de uma captura de tela comum continua
+# legível e a imagem é dividida em blocos; capturas 4K ainda são enviadas inteiras
+FATOR_MAXIMO_REDUCAO = 4.0
+# Imagens muito alongadas (páginas roladas, faixas) perdem o lado menor na
+# redução: a partir desta proporção, a redução tolerada é bem menor
+PROPORCAO_EXTREMA = 2.5
+FATOR_MAXIMO_REDUCAO_ALONGADA = 2.0
+# Sobreposição entre blocos vizinhos, para não perder o que fica na divisa
+FRACAO_SOBREPOSICAO = 0.1
+MAX_BLOCOS = 8
+# Crescimento do lado dos blocos quando a grade passa de MAX_BLOCOS
+FATOR_CRESCIMENTO_BLOCO = 1.25
+
+# Esquerda, topo, direita e base de um bloco, em pixels
+Caixa = Tuple[int, int, int, int]
+
+class _MemoriaPreprocessamento:
+    """
+    Últimas imagens preprocessadas, para que os fallbacks com o mesmo perfil
+    não repitam o trabalho. Limitada em entradas e nos bytes que as imagens
+    guardadas retêm; falhas não são guardadas, e o pedido seguinte tenta de novo.
+    """
+
+    def __init__(self, max_entradas: int = MAX_PREPROCESSADAS, max_bytes: int = MAX_BYTES_PREPROCESSADAS):
+        self.max_entradas = max_entradas
+        self.max_bytes = max_bytes
+        # chave -> (imagem preprocessada, bytes retidos por ela)
+        self._entradas: 'OrderedDict[Hashable, Tuple[Imagem, int]]' = OrderedDict()
+        self._bytes = 0
+        self._trava = threading.Lock()
+
+    def obter(self, chave: Hashable) -> Optional[Imagem]:
+        with self._trava:
+            entrada = self._entradas.get(chave)
+            if entrada is None:
+                return None
+            self._entradas.move_to_end(chave)
+            return entrada[0]
+
+    def guardar(self, chave: Hashable, imagem: Imagem) -> None:
+        tamanho = len(imagem.dados or b'') + len(imagem.conteudo or b'')
+        if tamanho > self.max_bytes:
+            return
+        with self._trava:
+            anterior = self._entradas.pop(chave, None)
+            if anterior is not None:
+                self._bytes -= anterior[1]
+            self._entradas[chave] = (imagem, tamanho)
+            self._bytes += tamanho
+            while len(self._entradas) > self.max_entradas or self._bytes > self.max_bytes:
+                _, (_, removidos) = self._entradas.popitem(last=False)
+                self._bytes -= removidos
+
+    def limpar(self) -> None:
+        with self._trava:
+            self._entradas.clear()
+            self._bytes = 0
+
+_memoria_preprocessamento = _MemoriaPreprocessamento()
+
+def preprocessar_imagem(perfil: PerfilImagem, imagem: Imagem) -> Result[Imagem, str]:
+    """
+    Reduz a imagem ao lado máximo do perfil, recodifica no formato do perfil
+    e descarta metadados (EXIF, ICC, comentários).
+    Retorna a imagem original quando o envio direto já é mais barato.
+    """
+    if imagem.conteudo is not None:
+        # O SHA-256 dos bytes identifica a versão: vale para imagens baixadas e
+        # capturas de tela, que não têm arquivo, e para arquivos alterados
+        versao: Hashable = imagem.resumo if imagem.dados is None else hashlib.sha256(imagem.conteudo).digest()
+        tamanho = len(imagem.conteudo)
+    else:
+        try:
+            estado = os.stat(imagem.caminho)
+        except OSError as e:
+            return Failure(f'Erro ao preprocessar imagem: {str(e)}')
+        # A chave inclui mtime e tamanho para não reaproveitar um arquivo alterado
+        versao = (estado.st_mtime_ns, estado.st_size)
+        tamanho = estado.st_size
+    
+    chave = (perfil, imagem.caminho, imagem.tipo, versao)
+    memorizada = _memoria_preprocessamento.obter(chave)
+    if memorizada is not None:
+        return Success(memorizada)
+    
+    resultado = _preprocessar_arquivo(perfil, imagem, tamanho)
+    resultado.map(lambda preparada: _memoria_preprocessamento.guardar(chave, preparada))
+    return resultado
+
+def _preprocessar_arquivo(
+    perfil: PerfilImagem,
+    imagem: Imagem,
+    tamanho: int
+) -> Result[Imagem, str]:
+    """Preprocessa a imagem, lida dos bytes já carregados ou do arquivo."""
+    try:
+        # PIL é importado sob demanda para não pesar na inicialização do NVDA
+        from PIL import Image, ImageOps
+        
+        # Com as dimensões lidas do cabeçalho, nem é preciso abrir a imagem
+        if (
+            imagem.largura and imagem.altura and
+            max(imagem.largura, imagem.altura) <= perfil.lado_maximo and
+            tamanho <= TAMANHO_MAXIMO_SEM_RECODIFICAR
+        ):
+            return Success(imagem)
+        
+        # Usa os bytes já carregados; o BytesIO compartilha o buffer sem copiá-lo
+        origem = io.BytesIO(imagem.conteudo) if imagem.conteudo is not None else imagem.caminho
+        with Image.open(origem) as original:
+            largura, altura = original.size
+            if max(largura, altura) <= perfil.lado_maximo and tamanho <= TAMANHO_MAXIMO_SEM_RECODIFICAR:
+                return Success(replace(imagem, largura=largura, altura=altura))
+            
+            # Em JPEGs, o modo draft faz o decodificador reduzir a imagem por
+            # um fator de 1/2, 1/4 ou 1/8 já na leitura, sem decodificar tudo
+            if original.format == 'JPEG':
+                escala = perfil.lado_maximo / max(largura, altura)
+                original.draft('RGB', (int(largura * escala) + 1, int(altura * escala) + 1))
+            
+            reduzida = ImageOps.exif_transpose(original)
+            reduzida.thumbnail((perfil.lado_maximo, perfil.lado_maximo), Image.LANCZOS)
+            reduzida = _converter_modo(reduzida, perfil.formato)
+            
+            # Salvar sem exif/icc_profile descarta os metadados da imagem original
+            saida = io.BytesIO()
+            reduzida.save(saida, format=perfil.formato, quality=perfil.qualidade)
+            dados = saida.getvalue()
+        
+        if len(dados) >= tamanho and max(largura, altura) <= perfil.lado_maximo:
+            return Success(replace(imagem, largura=largura, altura=altura))
+        
+        return Success(replace(
+            imagem,
+            tipo=perfil.formato.lower(),
+            largura=reduzida.width,
+            altura=reduzida.height,
+            dados=dados
+        ))
+    except Exception as e:
+        return Failure(f'Erro ao preprocessar imagem: {str(e)}')
+
+def _converter_modo(imagem: 'Image.Image', formato: str) -> 'Image.Image':
+    """Converte a imagem para um modo de cor aceito pelo formato de destino."""
+    from PIL import Image
+    
+    possui_alfa = imagem.mode in ('RGBA', 'LA') or (imagem.mode == 'P' and 'transparency' in imagem.info)
+    
+    if formato in FORMATOS_SEM_ALFA and possui_alfa:
+        # Compõe a transparência sobre fundo branco
+        rgba = imagem.convert('RGBA')
+        fundo = Image.new('RGB', rgba.size, (255, 255, 255))
+        fundo.paste(rgba, mask=rgba.getchannel('A'))
+        return fundo
+    
+    if possui_alfa:
+        return imagem.convert('RGBA')
+    return imagem.convert('RGB') if imagem.mode != 'RGB' else imagem
+
+
+def precisa_dividir(perfil: PerfilImagem, imagem: Imagem) -> bool:
+    """
+    Indica se a imagem perderia detalhes demais ao ser reduzida inteira ao
+    perfil: só imagens enormes ou de proporção extrema são divididas.
+    """
+    if not imagem.largura or not imagem.altura:
+        return False
+    maior, menor = max(imagem.largura, imagem.altura), min(imagem.largura, imagem.altura)
+    reducao = maior / perfil.lado_maximo
+    if maior / menor >= PROPORCAO_EXTREMA:
+        return reducao > FATOR_MAXIMO_REDUCAO_ALONGADA
+    return reducao > FATOR_MAXIMO_REDUCAO
+
+def lado_blocos(perfil: PerfilImagem, largura: int, altura: int) -> int:
+    """
+    Lado dos blocos: o do perfil ou, em imagens alongadas cujo lado menor
+    cabe com pouca redução, o lado menor inteiro, dividindo só o maior.
+    """
+    menor = min(largura, altura)
+    if menor <= perfil.lado_maximo * FATOR_MAXIMO_REDUCAO_ALONGADA:
+        return max(perfil.lado_maximo, menor)
+    return perfil.lado_maximo
+
+def _inicios_blocos(dimensao: int, lado: int, sobreposicao: int) -> List[int]:
+    """Início de cada bloco numa dimensão, espaçados por igual e com a sobreposição mínima."""
+    if dimensao <= lado:
+        return [0]
+    quantidade = math.ceil((dimensao - sobreposicao) / (lado - sobreposicao))
+    passo = (dimensao - lado) / (quantidade - 1)
+    return [round(indice * passo) for indice in range(quantidade)]
+
+def calcular_blocos(largura: int, altura: int, lado: int, max_blocos: int = MAX_BLOCOS) -> List[Caixa]:
+    """
+    Caixas dos blocos em ordem de leitura: linhas de cima para baixo, cada
+    uma da esquerda para a direita. Se a grade passar de max_blocos, os
+    blocos crescem até caber, e o perfil os reduz um pouco no envio.
+    """
+    while True:
+        sobreposicao = int(lado * FRACAO_SOBREPOSICAO)
+        colunas = _inicios_blocos(largura, lado, sobreposicao)
+        linhas = _inicios_blocos(altura, lado, sobreposicao)
+        if len(colunas) * len(linhas) <= max_blocos:
+            break
+        lado = int(lado * FATOR_CRESCIMENTO_BLOCO) + 1
+    return [
+        (esquerda, topo, min(esquerda + lado, largura), min(topo + lado, altura))
+        for topo in linhas
+        for esquerda in colunas
+    ]
+
+def abrir_imagem_inteira(imagem: Imagem) -> Result['Image.Image', str]:
+    """Decodifica a imagem inteira, já na orientação do EXIF, para recortar os blocos."""
+    try:
+        from PIL import Image, ImageOps
+        
+        origem = io.BytesIO(imagem.conteudo) if imagem.conteudo is not None else imagem.caminho
+        with Image.open(origem) as original:
+            return Success(ImageOps.exif_transpose(original))
+    except Exception as e:
+        return Failure(f'Erro ao dividir imagem em blocos: {str(e)}')
+
+def recortar_bloco(
+    perfil: PerfilImagem,
+    inteira: 'Image.Image',
+    caixa: Caixa,
+    origem: str
+) -> Result[Imagem, str]:
+    """
+    Recorta um bloco, já reduzido e recodificado conforme o perfil. Pode
+    rodar em paralelo para os vários blocos: a PIL libera o GIL na codificação.
+    """
+    try:
+        from PIL import Image
+        
+        bloco = inteira.crop(caixa)
+        bloco.thumbnail((perfil.lado_maximo, perfil.lado_maximo), Image.LANCZOS)
+        bloco = _converter_modo(bloco, perfil.formato)
+        saida = io.BytesIO()
+        bloco.save(saida, format=perfil.formato, quality=perfil.qualidade)
+        return Success(Imagem(
+            caminho=origem,
+            tipo=perfil.formato.lower(),
+            largura=bloco.width,
+            altura=bloco.height,
+            dados=saida.getvalue()
+        ))
+    except Exception as e:
+        return Failure(f'Erro ao recortar bloco da imagem: {str(e)}')
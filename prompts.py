@@ -0,0 +1,76 @@
+# dominio/prompts.py
+from typing import Optional
+
+from entidades import NivelDetalhe, ProvedorIA
+
+# Instrução enviada com a imagem em cada nível de detalhe
+INSTRUCOES = {
+    NivelDetalhe.TEXTO_ALTERNATIVO: (
+        "Escreva o texto alternativo desta imagem para uma pessoa com deficiência visual: "
+        "uma única frase curta, sem introdução."
+    ),
+    NivelDetalhe.CURTO: (
+        "Descreva brevemente esta imagem para uma pessoa com deficiência visual, "
+        "em no máximo três frases, começando pelo mais importante."
+    ),
+    NivelDetalhe.DETALHADO: "Descreva detalhadamente esta imagem para uma pessoa com deficiência visual.",
+}
+
+# Tokens de saída por provedor e nível. O tempo de geração cresce com o
+# tamanho da resposta; o tokenizador do Mistral gasta mais tokens por
+# palavra em português, e o modelo local gera só legendas curtas
+MAX_TOKENS_SAIDA = {
+    ProvedorIA.GEMINI: {
+        NivelDetalhe.TEXTO_ALTERNATIVO: 60,
+        NivelDetalhe.CURTO: 160,
+        NivelDetalhe.DETALHADO: 1024,
+    },
+    ProvedorIA.MISTRAL: {
+        NivelDetalhe.TEXTO_ALTERNATIVO: 80,
+        NivelDetalhe.CURTO: 200,
+        NivelDetalhe.DETALHADO: 1200,
+    },
+    ProvedorIA.LOCAL: {
+        NivelDetalhe.TEXTO_ALTERNATIVO: 16,
+        NivelDetalhe.CURTO: 32,
+        NivelDetalhe.DETALHADO: 32,
+    },
+}
+
+# Frases faladas antes de encerrar o fluxo, o que interrompe a geração no provedor
+MAX_FRASES = {
+    NivelDetalhe.TEXTO_ALTERNATIVO: 1,
+    NivelDetalhe.CURTO: 3,
+    NivelDetalhe.DETALHADO: None,
+}
+
+# Complemento da instrução enviada com cada bloco de uma imagem dividida
+INSTRUCAO_BLOCO = (
+    "Esta imagem é a parte {indice} de {total} de uma imagem maior, recortada em ordem "
+    "de leitura (de cima para baixo e da esquerda para a direita), e pode cortar "
+    "elementos nas bordas. Descreva só o que aparece nesta parte, sem supor o resto "
+    "da imagem, e transcreva o texto visível, mesmo que cortado."
+)
+
+# Complemento da instrução que junta as descrições dos blocos de uma imagem dividida
+FORMATOS_JUNCAO = {
+    NivelDetalhe.TEXTO_ALTERNATIVO: 'Responda com uma única frase curta.',
+    NivelDetalhe.CURTO: 'Responda em no máximo três frases.',
+    NivelDetalhe.DETALHADO: '',
+}
+
+def instrucao_nivel(nivel: NivelDetalhe) -> str:
+    """Instrução enviada com a imagem no nível pedido."""
+    return INSTRUCOES[nivel]
+
+def instrucao_bloco(nivel: NivelDetalhe, indice: int, total: int) -> str:
+    """Instrução enviada com o bloco indice de total de uma imagem dividida."""
+    return f'{INSTRUCOES[nivel]}\n\n{INSTRUCAO_BLOCO.format(indice=indice, total=total)}'
+
+def max_tokens_saida(provedor: ProvedorIA, nivel: NivelDetalhe) -> int:
+    """Orçamento de tokens da resposta do provedor no nível pedido."""
+    return MAX_TOKENS_SAIDA[provedor][nivel]
+
+def max_frases(nivel: NivelDetalhe) -> Optional[int]:
+    """Frases entregues no fluxo antes de encerrá-lo; None não limita."""
+    return MAX_FRASES[nivel]
@@ -1,26 +1,44 @@
 # adaptadores/repositorio_configuracao_nvda.py
 import os
 import json
+import threading
 from typing import Dict, Any, Optional
 from returns.result import Result, Success, Failure
-from cryptography.fernet import Fernet
 
 from entidades import (
     ProvedorIA, ChaveAPI, ErroConfiguracao,
-    Configuracao
+    Configuracao, ModoFallback, NivelDetalhe
 )
 from repositorio_configuracao import RepositorioConfiguracao
 
+# Prazo padrão de um pedido, em segundos, do comando até a descrição; uma
+# descrição detalhada de um modelo de visão na nuvem leva vários segundos
+TIMEOUT_API_PADRAO = 15
+# Padrão antigo, gravado automaticamente nas configurações existentes e curto
+# demais para um prazo de ponta a ponta; a migração o troca pelo atual
+TIMEOUT_API_PADRAO_ANTIGO = 3
+# Versão do formato do arquivo; arquivos sem ela são da versão 1
+VERSAO_CONFIGURACOES = 2
+
 class RepositorioConfiguracaoNVDA(RepositorioConfiguracao):
     """Adaptador para armazenamento de configurações no NVDA."""
     
     def __init__(self, caminho_configuracao: str):
         self.caminho_configuracao = caminho_configuracao
+        # Leituras vêm de threads de segundo plano; a trava protege o
+        # dicionário, a visão descriptografada e a escrita do arquivo
+        self._trava = threading.RLock()
+        self._mtime_carregado: Optional[int] = None
+        self._chaves_descriptografadas: Optional[Dict[ProvedorIA, ChaveAPI]] = None
+        self._configuracao: Optional[Configuracao] = None
         self._inicializar_criptografia()
         self._carregar_ou_criar_configuracoes()
     
     def _inicializar_criptografia(self) -> None:
         """Inicializa ou carrega a chave de criptografia."""
+        # Importado aqui para não pesar na importação do complemento
+        from cryptography.fernet import Fernet
+        
         caminho_chave = os.path.join(os.path.dirname(self.caminho_configuracao), 'crypto.key')
         
         if os.path.exists(caminho_chave):
@@ -37,104 +55,194 @@ class RepositorioConfiguracaoNVDA(RepositorioConfiguracao):
     def _carregar_ou_criar_configuracoes(self) -> None:
         """Carrega configurações existentes ou cria novas."""
         self.configuracoes_dict = {
+            'versao': VERSAO_CONFIGURACOES,
             'chaves_api': {},
             'configuracoes': {
                 'provedor_primario': ProvedorIA.GEMINI.name,
-                'timeout_api': 3,
-                'modo_offline': False
+                'timeout_api': TIMEOUT_API_PADRAO,
+                'modo_offline': False,
+                'modo_fallback': ModoFallback.SEQUENCIAL.name,
+                'descricao_em_fluxo': True,
+                'descricao_em_duas_etapas': False,
+                'distancia_semelhanca': 0,
+                'pre_carregamento': False,
+                'limite_pre_carregamento_hora': 30,
+                'nivel_detalhe': NivelDetalhe.DETALHADO.name
             }
         }
         
         if os.path.exists(self.caminho_configuracao):
             try:
-                with open(self.caminho_configuracao, 'r', encoding='utf-8') as arquivo:
-                    self.configuracoes_dict = json.load(arquivo)
+                self._ler_arquivo()
             except Exception:
                 self._salvar_configuracoes_dict()
+                return
+            self._migrar()
         else:
             self._salvar_configuracoes_dict()
     
+    def _migrar(self) -> None:
+        """
+        Atualiza uma única vez um arquivo de versão anterior. Na versão 1, o
+        prazo padrão antigo era gravado sem escolha do usuário e passa a ser o
+        atual; depois disso, qualquer prazo salvo é respeitado.
+        """
+        if self.configuracoes_dict.get('versao', 1) >= VERSAO_CONFIGURACOES:
+            return
+        configuracoes = self.configuracoes_dict.get('configuracoes', {})
+        if configuracoes.get('timeout_api') == TIMEOUT_API_PADRAO_ANTIGO:
+            configuracoes['timeout_api'] = TIMEOUT_API_PADRAO
+        self.configuracoes_dict['versao'] = VERSAO_CONFIGURACOES
+        self._salvar_configuracoes_dict()
+    
+    def _mtime_arquivo(self) -> Optional[int]:
+        try:
+            return os.stat(self.caminho_configuracao).st_mtime_ns
+        except OSError:
+            return None
+    
+    def _ler_arquivo(self) -> None:
+        """Lê o arquivo e descarta a visão descriptografada anterior."""
+        mtime = self._mtime_arquivo()
+        with open(self.caminho_configuracao, 'r', encoding='utf-8') as arquivo:
+            self.configuracoes_dict = json.load(arquivo)
+        self._mtime_carregado = mtime
+        self._chaves_descriptografadas = None
+        self._configuracao = None
+    
+    def _recarregar_se_alterado(self) -> None:
+        """Relê o arquivo apenas se ele foi alterado por fora desde a última leitura."""
+        mtime = self._mtime_arquivo()
+        if mtime is not None and mtime != self._mtime_carregado:
+            try:
+                self._ler_arquivo()
+            except Exception:
+                # Arquivo corrompido ou em escrita: mantém a última versão válida
+                pass
+    
     def _salvar_configuracoes_dict(self) -> Result[bool, ErroConfiguracao]:
-        """Salva as configurações no arquivo."""
+        """Salva as configurações em um arquivo temporário e o renomeia sobre o original."""
+        temporario = f'{self.caminho_configuracao}.tmp'
         try:
             os.makedirs(os.path.dirname(self.caminho_configuracao), exist_ok=True)
-            with open(self.caminho_configuracao, 'w', encoding='utf-8') as arquivo:
+            with open(temporario, 'w', encoding='utf-8') as arquivo:
                 json.dump(self.configuracoes_dict, arquivo, indent=2)
+                arquivo.flush()
+                os.fsync(arquivo.fileno())
+            os.replace(temporario, self.caminho_configuracao)
+            self._mtime_carregado = self._mtime_arquivo()
             return Success(True)
         except Exception as e:
+            try:
+                os.remove(temporario)
+            except OSError:
+                pass
             return Failure(ErroConfiguracao(f'Erro ao salvar configurações: {str(e)}'))
     
+    def _obter_chaves_descriptografadas(self) -> Dict[ProvedorIA, ChaveAPI]:
+        """Descriptografa as chaves uma única vez por versão do arquivo."""
+        if self._chaves_descriptografadas is None:
+            chaves = {}
+            for provedor_str, chave_criptografada in self.configuracoes_dict['chaves_api'].items():
+                try:
+                    provedor = ProvedorIA[provedor_str]
+                    chaves[provedor] = ChaveAPI(
+                        self.cipher.decrypt(chave_criptografada.encode()).decode('utf-8')
+                    )
+                except Exception:
+                    # Ignorar chaves que não podem ser descriptografadas
+                    pass
+            self._chaves_descriptografadas = chaves
+        return self._chaves_descriptografadas
+    
+    def _atualizar_chave(self, provedor: ProvedorIA, chave: ChaveAPI) -> None:
+        """Criptografa a chave no dicionário, se ela mudou, e atualiza a visão em memória."""
+        chaves = self._obter_chaves_descriptografadas()
+        if chaves.get(provedor) == chave and provedor.name in self.configuracoes_dict['chaves_api']:
+            return
+        self.configuracoes_dict['chaves_api'][provedor.name] = self.cipher.encrypt(chave.encode()).decode('utf-8')
+        chaves[provedor] = chave
+        self._configuracao = None
+    
     def salvar_chave_api(self, provedor: ProvedorIA, chave: ChaveAPI) -> Result[bool, ErroConfiguracao]:
         """Salva a chave de API de forma criptografada."""
-        try:
-            chave_criptografada = self.cipher.encrypt(chave.encode()).decode('utf-8')
-            self.configuracoes_dict['chaves_api'][provedor.name] = chave_criptografada
+        with self._trava:
+            self._recarregar_se_alterado()
+            try:
+                self._atualizar_chave(provedor, chave)
+            except Exception as e:
+                return Failure(ErroConfiguracao(f'Erro ao criptografar chave: {str(e)}'))
             return self._salvar_configuracoes_dict()
-        except Exception as e:
-            return Failure(ErroConfiguracao(f'Erro ao criptografar chave: {str(e)}'))
     
     def obter_chave_api(self, provedor: ProvedorIA) -> Result[ChaveAPI, ErroConfiguracao]:
-        """Recupera e descriptografa a chave de API."""
-        try:
+        """Recupera a chave de API já descriptografada."""
+        with self._trava:
+            self._recarregar_se_alterado()
             provedor_str = provedor.name
             if provedor_str not in self.configuracoes_dict['chaves_api']:
                 return Failure(ErroConfiguracao(f'Chave API para {provedor_str} não encontrada'))
             
-            chave_criptografada = self.configuracoes_dict['chaves_api'][provedor_str]
-            chave_descriptografada = self.cipher.decrypt(chave_criptografada.encode()).decode('utf-8')
-            return Success(ChaveAPI(chave_descriptografada))
-        except Exception as e:
-            return Failure(ErroConfiguracao(f'Erro ao descriptografar chave: {str(e)}'))
+            chave = self._obter_chaves_descriptografadas().get(provedor)
+            if chave is None:
+                return Failure(ErroConfiguracao(f'Erro ao descriptografar chave de {provedor_str}'))
+            return Success(chave)
     
     def obter_configuracoes(self) -> Result[Configuracao, ErroConfiguracao]:
         """Obtém todas as configurações."""
-        try:
-            config_dict = self.configuracoes_dict['configuracoes']
-            chaves_api = {}
-            
-            # Converter strings de enum para valores de enum
-            provedor_primario = ProvedorIA[config_dict['provedor_primario']]
-            
-            # Inicializar todas as chaves como None
-            for provedor in ProvedorIA:
-                chaves_api[provedor] = None
-            
-            # Carregar chaves existentes
-            for provedor_str, chave_criptografada in self.configuracoes_dict['chaves_api'].items():
-                try:
-                    provedor = ProvedorIA[provedor_str]
-                    chave_descriptografada = self.cipher.decrypt(chave_criptografada.encode()).decode('utf-8')
-                    chaves_api[provedor] = chave_descriptografada
-                except Exception:
-                    # Ignorar chaves que não podem ser descriptografadas
-                    pass
+        with self._trava:
+            self._recarregar_se_alterado()
+            if self._configuracao is not None:
+                return Success(self._configuracao)
             
-            return Success(Configuracao(
-                provedor_primario=provedor_primario,
-                timeout_api=config_dict['timeout_api'],
-                modo_offline=config_dict['modo_offline'],
-                chaves_api=chaves_api
-            ))
-        except Exception as e:
-            return Failure(ErroConfiguracao(f'Erro ao obter configurações: {str(e)}'))
+            try:
+                config_dict = self.configuracoes_dict['configuracoes']
+                
+                # Inicializar todas as chaves como None e preencher as existentes
+                chaves_api = {provedor: None for provedor in ProvedorIA}
+                chaves_api.update(self._obter_chaves_descriptografadas())
+                
+                self._configuracao = Configuracao(
+                    provedor_primario=ProvedorIA[config_dict['provedor_primario']],
+                    timeout_api=config_dict['timeout_api'],
+                    modo_offline=config_dict['modo_offline'],
+                    chaves_api=chaves_api,
+                    modo_fallback=ModoFallback[config_dict.get('modo_fallback', ModoFallback.SEQUENCIAL.name)],
+                    descricao_em_fluxo=config_dict.get('descricao_em_fluxo', True),
+                    descricao_em_duas_etapas=config_dict.get('descricao_em_duas_etapas', False),
+                    distancia_semelhanca=config_dict.get('distancia_semelhanca', 0),
+                    pre_carregamento=config_dict.get('pre_carregamento', False),
+                    limite_pre_carregamento_hora=config_dict.get('limite_pre_carregamento_hora', 30),
+                    nivel_detalhe=NivelDetalhe[config_dict.get('nivel_detalhe', NivelDetalhe.DETALHADO.name)]
+                )
+                return Success(self._configuracao)
+            except Exception as e:
+                return Failure(ErroConfiguracao(f'Erro ao obter configurações: {str(e)}'))
     
     def salvar_configuracoes(self, config: Configuracao) -> Result[bool, ErroConfiguracao]:
-        """Salva todas as configurações."""
-        try:
-            # Atualizar configurações gerais
-            self.configuracoes_dict['configuracoes'] = {
-                'provedor_primario': config.provedor_primario.name,
-                'timeout_api': config.timeout_api,
-                'modo_offline': config.modo_offline
-            }
-            
-            # Atualizar chaves API (apenas as que não são None)
-            for provedor, chave in config.chaves_api.items():
-                if chave is not None:
-                    resultado = self.salvar_chave_api(provedor, ChaveAPI(chave))
-                    if resultado.is_failure():
-                        return resultado
+        """Salva todas as configurações em uma única escrita do arquivo."""
+        with self._trava:
+            self._recarregar_se_alterado()
+            try:
+                # Atualizar configurações gerais
+                self.configuracoes_dict['configuracoes'] = {
+                    'provedor_primario': config.provedor_primario.name,
+                    'timeout_api': config.timeout_api,
+                    'modo_offline': config.modo_offline,
+                    'modo_fallback': config.modo_fallback.name,
+                    'descricao_em_fluxo': config.descricao_em_fluxo,
+                    'descricao_em_duas_etapas': config.descricao_em_duas_etapas,
+                    'distancia_semelhanca': config.distancia_semelhanca,
+                    'pre_carregamento': config.pre_carregamento,
+                    'limite_pre_carregamento_hora': config.limite_pre_carregamento_hora,
+                    'nivel_detalhe': config.nivel_detalhe.name
+                }
+                
+                # Atualizar chaves API (apenas as que não são None)
+                for provedor, chave in config.chaves_api.items():
+                    if chave is not None:
+                        self._atualizar_chave(provedor, ChaveAPI(chave))
+            except Exception as e:
+                return Failure(ErroConfiguracao(f'Erro ao salvar configurações: {str(e)}'))
             
+            self._configuracao = None
             return self._salvar_configuracoes_dict()
-        except Exception as e:
-            return Failure(ErroConfiguracao(f'Erro ao salvar configurações: {str(e)}'))
\ No newline at end of file
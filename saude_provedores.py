@@ -0,0 +1,267 @@
+# infraestrutura/saude_provedores.py
+import time
+import threading
+from collections import deque
+from enum import Enum, auto
+from typing import Callable, Dict, Iterator, List, Optional
+from returns.result import Result, Success, Failure
+
+from entidades import (
+    CaminhoImagem, CategoriaErro, DescricaoImagem, ErroIA, NivelDetalhe, ProvedorIA, categoria_erro
+)
+from servico_ia import ServicoIA, DecoradorServicoIA, descrever_em_fragmentos
+from estatisticas_latencia import HistoricoLatencias
+from tratador_erros import classificar_excecao
+from prazo import Prazo
+
+# Falhas causadas pelo pedido, e não pelo provedor, que não afetam a saúde dele
+CATEGORIAS_FALHA_DO_PEDIDO = {CategoriaErro.ENTRADA_INVALIDA, CategoriaErro.CONTEUDO_BLOQUEADO}
+# Tempo restante abaixo do qual um tempo esgotado é atribuído ao prazo do
+# próprio pedido: o timeout do SDK é o que restava dele, e não uma demora do provedor
+MARGEM_PRAZO_ESGOTADO = 0.25
+
+class EstadoCircuito(Enum):
+    """Estados do disjuntor de um provedor."""
+    FECHADO = auto()      # Provedor saudável, chamadas liberadas
+    ABERTO = auto()       # Falhas recentes, chamadas recusadas de imediato
+    SEMI_ABERTO = auto()  # Uma chamada de sondagem decide se o circuito fecha
+
+class _SaudeProvedor:
+    """Estado de saúde de um provedor; protegido pela trava do monitor."""
+
+    def __init__(self, tamanho_janela: int):
+        self.resultados: deque = deque(maxlen=tamanho_janela)
+        self.falhas_consecutivas = 0
+        self.estado = EstadoCircuito.FECHADO
+        self.aberto_em = 0.0
+        self.sonda_em = 0.0
+
+    @property
+    def taxa_erro(self) -> float:
+        if not self.resultados:
+            return 0.0
+        return self.resultados.count(False) / len(self.resultados)
+
+class MonitorSaude:
+    """
+    Acompanha latência e taxa de erro de cada provedor e mantém um disjuntor
+    por provedor. O circuito abre após falhas consecutivas ou taxa de erro
+    alta; depois da espera, uma única chamada de sondagem é liberada e o
+    resultado dela fecha ou reabre o circuito.
+    """
+
+    def __init__(
+        self,
+        tamanho_janela: int = 20,
+        falhas_para_abrir: int = 3,
+        taxa_erro_para_abrir: float = 0.5,
+        minimo_amostras: int = 6,
+        espera_sondagem: float = 30.0,
+        fator_preferencia: float = 0.8
+    ):
+        self.tamanho_janela = tamanho_janela
+        self.falhas_para_abrir = falhas_para_abrir
+        self.taxa_erro_para_abrir = taxa_erro_para_abrir
+        self.minimo_amostras = minimo_amostras
+        self.espera_sondagem = espera_sondagem
+        # Desconto na pontuação do provedor configurado como primário,
+        # para que a ordem não alterne a cada pequena variação de latência
+        self.fator_preferencia = fator_preferencia
+
+        self.latencias = HistoricoLatencias(tamanho_janela)
+        self._provedores: Dict[ProvedorIA, _SaudeProvedor] = {}
+        self._trava = threading.Lock()
+
+    def _saude(self, provedor: ProvedorIA) -> _SaudeProvedor:
+        saude = self._provedores.get(provedor)
+        if saude is None:
+            saude = self._provedores[provedor] = _SaudeProvedor(self.tamanho_janela)
+        return saude
+
+    def estado(self, provedor: ProvedorIA) -> EstadoCircuito:
+        """Estado atual do circuito do provedor."""
+        with self._trava:
+            return self._saude(provedor).estado
+
+    def permitir(self, provedor: ProvedorIA) -> bool:
+        """Indica se uma chamada ao provedor deve ser feita agora."""
+        agora = time.monotonic()
+        with self._trava:
+            saude = self._saude(provedor)
+            if saude.estado == EstadoCircuito.FECHADO:
+                return True
+
+            if saude.estado == EstadoCircuito.ABERTO:
+                if agora - saude.aberto_em < self.espera_sondagem:
+                    return False
+                saude.estado = EstadoCircuito.SEMI_ABERTO
+                saude.sonda_em = agora
+                return True
+
+            # Semiaberto: só libera nova sonda se a anterior nunca respondeu
+            if agora - saude.sonda_em >= self.espera_sondagem:
+                saude.sonda_em = agora
+                return True
+            return False
+
+    def espera_restante(self, provedor: ProvedorIA) -> float:
+        """Segundos até o circuito aberto liberar a próxima sondagem."""
+        with self._trava:
+            saude = self._saude(provedor)
+            if saude.estado != EstadoCircuito.ABERTO:
+                return 0.0
+            return max(0.0, self.espera_sondagem - (time.monotonic() - saude.aberto_em))
+
+    def registrar_sucesso(self, provedor: ProvedorIA, latencia: Optional[float]) -> None:
+        """Registra uma resposta bem-sucedida e fecha o circuito; sem latência, só o desfecho conta."""
+        if latencia is not None:
+            self.latencias.registrar(provedor, latencia)
+        with self._trava:
+            saude = self._saude(provedor)
+            saude.resultados.append(True)
+            saude.falhas_consecutivas = 0
+            saude.estado = EstadoCircuito.FECHADO
+
+    def registrar_falha(self, provedor: ProvedorIA) -> None:
+        """Registra uma falha e abre o circuito se o provedor estiver degradado."""
+        with self._trava:
+            saude = self._saude(provedor)
+            saude.resultados.append(False)
+            saude.falhas_consecutivas += 1
+
+            degradado = (
+                saude.falhas_consecutivas >= self.falhas_para_abrir or
+                (
+                    len(saude.resultados) >= self.minimo_amostras and
+                    saude.taxa_erro >= self.taxa_erro_para_abrir
+                )
+            )
+            if saude.estado == EstadoCircuito.SEMI_ABERTO or degradado:
+                saude.estado = EstadoCircuito.ABERTO
+                saude.aberto_em = time.monotonic()
+
+    def percentil(self, provedor: ProvedorIA, fracao: float) -> Optional[float]:
+        """Percentil das latências recentes do provedor."""
+        return self.latencias.percentil(provedor, fracao)
+
+    def ordenar(self, servicos: List[ServicoIA]) -> List[ServicoIA]:
+        """
+        Ordena os serviços do mais promissor ao menos promissor: circuitos
+        abertos por último e, entre os demais, o menor tempo esperado até uma
+        resposta válida (mediana da latência corrigida pela taxa de erro).
+        Serviços sem histórico mantêm a ordem configurada; o primeiro da
+        lista recebida é tratado como o primário preferido.
+        """
+        def pontuacao(indice_servico):
+            indice, servico = indice_servico
+            provedor = servico.provedor
+            with self._trava:
+                saude = self._saude(provedor)
+                aberto = saude.estado == EstadoCircuito.ABERTO
+                taxa_erro = saude.taxa_erro
+
+            mediana = self.latencias.percentil(provedor, 0.5)
+            if mediana is None:
+                esperado = float('inf')
+            else:
+                esperado = mediana / max(0.05, 1.0 - taxa_erro)
+                if indice == 0:
+                    esperado *= self.fator_preferencia
+            return (aberto, esperado, indice)
+
+        return [servico for _, servico in sorted(enumerate(servicos), key=pontuacao)]
+
+class ServicoIAMonitorado(DecoradorServicoIA):
+    """
+    Decorador que alimenta o MonitorSaude com cada chamada ao serviço e
+    recusa chamadas de imediato enquanto o circuito do provedor está aberto.
+    """
+
+    def __init__(self, servico: ServicoIA, monitor: MonitorSaude):
+        super().__init__(servico)
+        self.monitor = monitor
+
+    def descrever_imagem(self, caminho_imagem: CaminhoImagem, prazo: Optional[Prazo] = None, nivel: NivelDetalhe = NivelDetalhe.DETALHADO) -> Result[DescricaoImagem, ErroIA]:
+        return self._monitorar(lambda: self.servico.descrever_imagem(caminho_imagem, prazo, nivel), prazo)
+
+    def descrever_imagem_bytes(self, imagem_bytes: bytes, mime_type: str, prazo: Optional[Prazo] = None, nivel: NivelDetalhe = NivelDetalhe.DETALHADO, resumo: Optional[bytes] = None) -> Result[DescricaoImagem, ErroIA]:
+        return self._monitorar(lambda: self.servico.descrever_imagem_bytes(imagem_bytes, mime_type, prazo, nivel, resumo), prazo)
+
+    def descrever_bloco_bytes(self, imagem_bytes: bytes, mime_type: str, indice: int, total: int, prazo: Optional[Prazo] = None, nivel: NivelDetalhe = NivelDetalhe.DETALHADO, resumo: Optional[bytes] = None) -> Result[DescricaoImagem, ErroIA]:
+        return self._monitorar(lambda: self.servico.descrever_bloco_bytes(imagem_bytes, mime_type, indice, total, prazo, nivel, resumo), prazo)
+
+    def descrever_imagem_bytes_stream(self, imagem_bytes: bytes, mime_type: str, prazo: Optional[Prazo] = None, nivel: NivelDetalhe = NivelDetalhe.DETALHADO, resumo: Optional[bytes] = None) -> Result[Iterator[str], ErroIA]:
+        provedor = self.servico.provedor
+        if not self.monitor.permitir(provedor):
+            return self._circuito_aberto()
+
+        inicio = time.monotonic()
+        resultado = descrever_em_fragmentos(self.servico, imagem_bytes, mime_type, prazo, nivel, resumo)
+        if not isinstance(resultado, Success):
+            self._registrar_falha(resultado.failure(), prazo)
+        return resultado.map(lambda fragmentos: self._monitorar_fluxo(fragmentos, inicio, prazo))
+
+    def _circuito_aberto(self) -> Result:
+        provedor = self.servico.provedor
+        return Failure(ErroIA(
+            f'{provedor.name}: provedor temporariamente desativado após falhas recentes',
+            CategoriaErro.TRANSITORIO,
+            self.monitor.espera_restante(provedor)
+        ))
+
+    def _registrar_falha(self, erro: object, prazo: Optional[Prazo]) -> None:
+        """
+        Imagem recusada, conteúdo bloqueado e o fim da fatia do prazo dada a
+        esta tentativa não indicam problema no provedor.
+        """
+        categoria = categoria_erro(erro)
+        if categoria in CATEGORIAS_FALHA_DO_PEDIDO:
+            return
+        if (
+            categoria == CategoriaErro.TEMPO_ESGOTADO and
+            prazo is not None and
+            prazo.restante <= MARGEM_PRAZO_ESGOTADO
+        ):
+            return
+        self.monitor.registrar_falha(self.servico.provedor)
+
+    def _monitorar(self, chamar: Callable[[], Result], prazo: Optional[Prazo]) -> Result:
+        provedor = self.servico.provedor
+        if not self.monitor.permitir(provedor):
+            return self._circuito_aberto()
+
+        inicio = time.monotonic()
+        resultado = chamar()
+        if isinstance(resultado, Success):
+            self.monitor.registrar_sucesso(provedor, time.monotonic() - inicio)
+        else:
+            self._registrar_falha(resultado.failure(), prazo)
+        return resultado
+
+    def _monitorar_fluxo(self, fragmentos: Iterator[str], inicio: float, prazo: Optional[Prazo]) -> Iterator[str]:
+        """
+        O primeiro fragmento já mostra que o provedor responde e fecha o
+        circuito, mesmo que o fluxo seja encerrado depois pelo limite de
+        frases ou pelo usuário. A duração total só entra no histórico de
+        latências quando o fluxo chega ao fim, como nas chamadas comuns.
+        """
+        provedor = self.servico.provedor
+        respondeu = False
+        try:
+            for fragmento in fragmentos:
+                if not respondeu:
+                    respondeu = True
+                    self.monitor.registrar_sucesso(provedor, None)
+                yield fragmento
+        except Exception as e:
+            self._registrar_falha(classificar_excecao(e, 'Erro durante o fluxo'), prazo)
+            raise
+        finally:
+            fechar = getattr(fragmentos, 'close', None)
+            if fechar is not None:
+                fechar()
+
+        if respondeu:
+            self.monitor.latencias.registrar(provedor, time.monotonic() - inicio)
+        else:
+            self.monitor.registrar_sucesso(provedor, time.monotonic() - inicio)
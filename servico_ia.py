@@ -1,15 +1,113 @@
 # portas/servico_ia.py
 from abc import ABC
-from typing import Protocol
+from typing import Iterator, Optional, Protocol
 from returns.result import Result
 
-from .entidades import CaminhoImagem, DescricaoImagem, ErroIA
+from entidades import CaminhoImagem, DescricaoImagem, ErroIA, NivelDetalhe
+from prazo import Prazo
 
 class ServicoIA(Protocol):
     """
     Porta que define a interface para serviços de descrição de imagem.
     Seguindo o paradigma funcional, retorna Result[DescricaoImagem, ErroIA].
+    O prazo opcional limita o tempo da chamada, inclusive o timeout HTTP;
+    o nível de detalhe escolhe a instrução e o orçamento de tokens da resposta.
+    Os métodos que recebem bytes aceitam também o resumo (SHA-256) deles,
+    calculado uma vez por pedido; os decoradores que identificam a imagem
+    pelo conteúdo o usam em vez de percorrer os bytes de novo.
     """
-    def descrever_imagem(self, caminho_imagem: CaminhoImagem) -> Result[DescricaoImagem, ErroIA]:
+    def descrever_imagem(
+        self,
+        caminho_imagem: CaminhoImagem,
+        prazo: Optional[Prazo] = None,
+        nivel: NivelDetalhe = NivelDetalhe.DETALHADO
+    ) -> Result[DescricaoImagem, ErroIA]:
         """Descreve uma imagem e retorna o resultado ou erro."""
-        ...
\ No newline at end of file
+        ...
+
+
+class ServicoIAStreaming(Protocol):
+    """
+    Porta para serviços que entregam a descrição em fragmentos à medida que
+    ela é gerada. Fechar o iterador (close) interrompe a geração no provedor.
+    """
+    def descrever_imagem_bytes_stream(
+        self,
+        imagem_bytes: bytes,
+        mime_type: str,
+        prazo: Optional[Prazo] = None,
+        nivel: NivelDetalhe = NivelDetalhe.DETALHADO,
+        resumo: Optional[bytes] = None
+    ) -> Result[Iterator[str], ErroIA]:
+        """Inicia a descrição e retorna um iterador com os fragmentos de texto."""
+        ...
+
+
+class ServicoIABlocos(Protocol):
+    """
+    Porta para serviços que descrevem um bloco de uma imagem dividida com a
+    instrução própria de blocos, que informa qual parte da imagem ele é.
+    """
+    def descrever_bloco_bytes(
+        self,
+        imagem_bytes: bytes,
+        mime_type: str,
+        indice: int,
+        total: int,
+        prazo: Optional[Prazo] = None,
+        nivel: NivelDetalhe = NivelDetalhe.DETALHADO,
+        resumo: Optional[bytes] = None
+    ) -> Result[DescricaoImagem, ErroIA]:
+        """Descreve o bloco indice de total e retorna o resultado ou erro."""
+        ...
+
+
+class ServicoIATexto(Protocol):
+    """
+    Porta para serviços que também geram texto sem imagem, usada para
+    juntar descrições parciais numa só.
+    """
+    def gerar_texto(
+        self,
+        instrucao: str,
+        prazo: Optional[Prazo] = None,
+        nivel: NivelDetalhe = NivelDetalhe.DETALHADO
+    ) -> Result[str, ErroIA]:
+        """Responde à instrução e retorna o texto gerado ou erro."""
+        ...
+
+
+def descrever_em_fragmentos(
+    servico: ServicoIA,
+    imagem_bytes: bytes,
+    mime_type: str,
+    prazo: Optional[Prazo] = None,
+    nivel: NivelDetalhe = NivelDetalhe.DETALHADO,
+    resumo: Optional[bytes] = None
+) -> Result[Iterator[str], ErroIA]:
+    """
+    Descreve em fluxo quando o serviço suporta; caso contrário, entrega a
+    descrição completa como um único fragmento.
+    """
+    descrever_stream = getattr(servico, 'descrever_imagem_bytes_stream', None)
+    if descrever_stream is not None:
+        return descrever_stream(imagem_bytes, mime_type, prazo, nivel, resumo)
+    return servico.descrever_imagem_bytes(imagem_bytes, mime_type, prazo, nivel, resumo).map(
+        lambda descricao: iter([descricao])
+    )
+
+
+class DecoradorServicoIA:
+    """
+    Base para decoradores que acrescentam comportamento a um ServicoIA.
+    Atributos não definidos no decorador (provedor, modelo, prompt...)
+    são delegados ao serviço envolvido.
+    """
+    def __init__(self, servico: ServicoIA):
+        self.servico = servico
+
+    def __getattr__(self, nome: str):
+        if nome == 'servico':
+            raise AttributeError(nome)
+        return getattr(self.servico, nome)
+
@@ -0,0 +1,11 @@
+# tests/coleta.py
+"""
+Plugin do pytest, carregado pelo pytest.ini. A raiz do repositório é o
+pacote do complemento, cujo __init__ só pode ser importado dentro do NVDA:
+ela é coletada como uma pasta comum, sem importar o __init__.
+"""
+import pytest
+
+def pytest_collect_directory(path, parent):
+    if path == parent.config.rootpath:
+        return pytest.Dir.from_parent(parent, path=path)
@@ -0,0 +1,45 @@
+# tests/test_divisor_frases.py
+from divisor_frases import dividir_em_frases
+
+def test_frases_atravessando_fragmentos():
+    fragmentos = ['A imagem mostra um gato ', 'deitado no sofá. Ao fundo há ', 'uma janela aberta! Fim']
+    assert list(dividir_em_frases(fragmentos)) == [
+        'A imagem mostra um gato deitado no sofá.',
+        'Ao fundo há uma janela aberta!',
+        'Fim',
+    ]
+
+def test_entrega_cada_frase_assim_que_termina():
+    recebidos = []
+
+    def fragmentos():
+        for fragmento in ['Primeira frase completa aqui. ', 'Segunda frase ainda sem fim']:
+            recebidos.append(fragmento)
+            yield fragmento
+
+    frases = dividir_em_frases(fragmentos())
+    assert next(frases) == 'Primeira frase completa aqui.'
+    # A primeira frase saiu antes de o segundo fragmento ser pedido
+    assert len(recebidos) == 1
+    assert list(frases) == ['Segunda frase ainda sem fim']
+
+def test_frases_curtas_sao_emendadas_a_seguinte():
+    texto = 'O Sr. Silva aparece na foto. 1. Um item de lista bem descrito.'
+    assert list(dividir_em_frases([texto])) == [
+        'O Sr. Silva aparece na foto.',
+        '1. Um item de lista bem descrito.',
+    ]
+
+def test_quebra_de_linha_sempre_divide():
+    assert list(dividir_em_frases(['Título\n\nTexto do corpo'])) == ['Título', 'Texto do corpo']
+
+def test_pontuacao_com_aspas_de_fechamento():
+    texto = 'Na placa está escrito "Proibido fumar." Ao lado há um extintor.'
+    assert list(dividir_em_frases([texto])) == [
+        'Na placa está escrito "Proibido fumar."',
+        'Ao lado há um extintor.',
+    ]
+
+def test_entrada_vazia_ou_so_espacos():
+    assert list(dividir_em_frases([])) == []
+    assert list(dividir_em_frases(['  ', '\n'])) == []
@@ -0,0 +1,77 @@
+# tests/test_hash_perceptual.py
+import io
+import math
+import random
+
+import pytest
+from PIL import Image
+
+from hash_perceptual import BITS_DHASH, IndiceHashPerceptual, calcular_dhash, distancia_hamming
+
+def _inverter_bits(valor: int, quantidade: int, gerador: random.Random) -> int:
+    for bit in gerador.sample(range(BITS_DHASH), quantidade):
+        valor ^= 1 << bit
+    return valor
+
+def _imagem(largura: int, altura: int, formato: str) -> bytes:
+    """Mesma cena em qualquer tamanho: ondas de brilho nas duas direções."""
+    imagem = Image.new('L', (largura, altura))
+    imagem.putdata([
+        int(127 + 60 * math.sin(7 * x / largura) + 60 * math.cos(5 * y / altura))
+        for y in range(altura) for x in range(largura)
+    ])
+    saida = io.BytesIO()
+    imagem.convert('RGB').save(saida, formato)
+    return saida.getvalue()
+
+def test_busca_encontra_ate_a_distancia_maxima_em_ordem():
+    gerador = random.Random(1)
+    indice = IndiceHashPerceptual(distancia_maxima=6)
+    base = gerador.getrandbits(BITS_DHASH)
+    indice.adicionar(base, 'igual')
+    indice.adicionar(_inverter_bits(base, 3, gerador), 'perto')
+    indice.adicionar(_inverter_bits(base, 6, gerador), 'no limite')
+    indice.adicionar(_inverter_bits(base, 7, gerador), 'longe')
+    assert indice.buscar(base) == [(0, 'igual'), (3, 'perto'), (6, 'no limite')]
+
+@pytest.mark.parametrize('distancia_maxima', [0, 3, 6, 10])
+def test_busca_igual_a_comparacao_exaustiva(distancia_maxima):
+    gerador = random.Random(distancia_maxima)
+    indice = IndiceHashPerceptual(distancia_maxima)
+    bases = [gerador.getrandbits(BITS_DHASH) for _ in range(20)]
+    valores = bases + [_inverter_bits(gerador.choice(bases), gerador.randint(0, 12), gerador) for _ in range(300)]
+    for numero, valor in enumerate(valores):
+        indice.adicionar(valor, str(numero))
+
+    for consulta in bases:
+        esperados = sorted(
+            (distancia_hamming(consulta, valor), str(numero))
+            for numero, valor in enumerate(valores)
+            if distancia_hamming(consulta, valor) <= distancia_maxima
+        )
+        assert indice.buscar(consulta) == esperados
+
+def test_remover_tira_so_a_chave_indicada():
+    indice = IndiceHashPerceptual(distancia_maxima=4)
+    indice.adicionar(0b1011, 'a')
+    indice.adicionar(0b1011, 'b')
+    assert len(indice) == 2
+    indice.remover(0b1011, 'a')
+    assert indice.buscar(0b1011) == [(0, 'b')]
+    indice.remover(0b1011, 'b')
+    assert len(indice) == 0
+    assert indice.buscar(0b1011) == []
+    assert all(not tabela for tabela in indice._tabelas)
+    # Remover o que não existe não falha
+    indice.remover(0b1011, 'b')
+
+def test_dhash_estavel_entre_formatos_e_escalas():
+    png = calcular_dhash(_imagem(320, 240, 'PNG'))
+    jpeg = calcular_dhash(_imagem(320, 240, 'JPEG'))
+    reduzido = calcular_dhash(_imagem(160, 120, 'PNG'))
+    assert png is not None
+    assert distancia_hamming(png, jpeg) <= 6
+    assert distancia_hamming(png, reduzido) <= 6
+
+def test_dhash_de_bytes_invalidos_e_none():
+    assert calcular_dhash(b'nao e uma imagem') is None
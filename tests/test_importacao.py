@@ -0,0 +1,14 @@
+# tests/test_importacao.py
+"""
+A importação do complemento pelo NVDA não pode carregar SDKs nem bibliotecas
+de imagem: eles só são importados no primeiro uso. A importação roda num
+interpretador novo, com os módulos do NVDA simulados como no benchmark.
+"""
+from benchmark_pipeline import MODULOS_PESADOS, medir_importacao
+
+def test_modulos_verificados_incluem_sdks_e_bibliotecas_de_imagem():
+    assert {'google.genai', 'mistralai', 'httpx', 'PIL', 'numpy'} <= set(MODULOS_PESADOS)
+
+def test_importacao_nao_carrega_modulos_pesados():
+    importacao = medir_importacao()
+    assert importacao['modulos_pesados'] == []
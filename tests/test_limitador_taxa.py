@@ -0,0 +1,128 @@
+# tests/test_limitador_taxa.py
+import time
+from typing import List, Optional
+
+import pytest
+from returns.result import Result, Success, Failure
+
+import limitador_taxa
+from entidades import CategoriaErro, DescricaoImagem, ErroIA, LimiteTaxa, NivelDetalhe, ProvedorIA
+from limitador_taxa import BaldeTokens, MAX_TENTATIVAS, ServicoIALimitado
+from prazo import Prazo
+
+class ServicoRoteirizado:
+    """ServicoIA de teste: devolve as respostas na ordem dada e conta as chamadas."""
+
+    def __init__(self, respostas: List[Result], limite_taxa: Optional[LimiteTaxa] = None):
+        self.provedor = ProvedorIA.GEMINI
+        self.limite_taxa = limite_taxa
+        self.chamadas = 0
+        self._respostas = respostas
+
+    def descrever_imagem_bytes(self, imagem_bytes: bytes, mime_type: str, prazo: Optional[Prazo] = None, nivel: NivelDetalhe = NivelDetalhe.DETALHADO, resumo: Optional[bytes] = None) -> Result[DescricaoImagem, ErroIA]:
+        resposta = self._respostas[min(self.chamadas, len(self._respostas) - 1)]
+        self.chamadas += 1
+        return resposta
+
+@pytest.fixture
+def esperas(monkeypatch) -> List[float]:
+    """Registra as esperas do limitador em vez de dormir."""
+    registradas: List[float] = []
+    monkeypatch.setattr(limitador_taxa.time, 'sleep', registradas.append)
+    return registradas
+
+def _falha(categoria: CategoriaErro, espera: Optional[float] = None) -> Result:
+    return Failure(ErroIA('falha simulada', categoria, espera))
+
+def test_balde_entrega_a_rajada_sem_espera():
+    balde = BaldeTokens(LimiteTaxa(requisicoes_por_minuto=60, rajada=3))
+    assert [balde.reservar() for _ in range(3)] == [0.0, 0.0, 0.0]
+
+def test_balde_vazio_reserva_tokens_futuros_em_fila():
+    balde = BaldeTokens(LimiteTaxa(requisicoes_por_minuto=60, rajada=1))
+    assert balde.reservar() == 0.0
+    primeira = balde.reservar()
+    segunda = balde.reservar()
+    # Um token por segundo: cada reserva na fila espera um segundo a mais
+    assert primeira == pytest.approx(1.0, abs=0.05)
+    assert segunda == pytest.approx(2.0, abs=0.05)
+    assert balde.disponiveis() < 0
+
+def test_balde_recusa_sem_reservar_quando_a_espera_passa_do_maximo():
+    balde = BaldeTokens(LimiteTaxa(requisicoes_por_minuto=60, rajada=1))
+    balde.reservar()
+    assert balde.reservar(espera_maxima=0.5) is None
+    # A recusa não consumiu token: a próxima reserva continua a primeira da fila
+    assert balde.reservar() == pytest.approx(1.0, abs=0.05)
+
+def test_balde_nao_passa_da_capacidade():
+    balde = BaldeTokens(LimiteTaxa(requisicoes_por_minuto=6000, rajada=2))
+    time.sleep(0.05)
+    assert balde.disponiveis() == 2.0
+
+def test_bloquear_suspende_as_reservas():
+    balde = BaldeTokens(LimiteTaxa(requisicoes_por_minuto=60, rajada=5))
+    balde.bloquear(3.0)
+    assert balde.disponiveis() == 0.0
+    assert balde.reservar() == pytest.approx(3.0, abs=0.05)
+    # Um bloqueio mais curto não encurta o atual
+    balde.bloquear(1.0)
+    assert balde.reservar() == pytest.approx(3.0, abs=0.05)
+
+@pytest.mark.parametrize('categoria', [CategoriaErro.COTA, CategoriaErro.TRANSITORIO])
+def test_repete_ate_o_maximo_da_categoria(categoria, esperas):
+    servico = ServicoRoteirizado([_falha(categoria)])
+    resultado = ServicoIALimitado(servico).descrever_imagem_bytes(b'', 'image/png')
+    assert isinstance(resultado, Failure)
+    assert servico.chamadas == MAX_TENTATIVAS[categoria]
+    assert len(esperas) == MAX_TENTATIVAS[categoria] - 1
+
+@pytest.mark.parametrize('categoria', [
+    CategoriaErro.AUTENTICACAO, CategoriaErro.ENTRADA_INVALIDA,
+    CategoriaErro.CONTEUDO_BLOQUEADO, CategoriaErro.TEMPO_ESGOTADO, CategoriaErro.DESCONHECIDO,
+])
+def test_nao_repete_falhas_que_dariam_o_mesmo_resultado(categoria, esperas):
+    servico = ServicoRoteirizado([_falha(categoria)])
+    ServicoIALimitado(servico).descrever_imagem_bytes(b'', 'image/png')
+    assert servico.chamadas == 1
+    assert esperas == []
+
+def test_repete_ate_dar_certo(esperas):
+    servico = ServicoRoteirizado([_falha(CategoriaErro.TRANSITORIO), Success(DescricaoImagem('ok'))])
+    resultado = ServicoIALimitado(servico).descrever_imagem_bytes(b'', 'image/png')
+    assert resultado == Success(DescricaoImagem('ok'))
+    assert servico.chamadas == 2
+
+def test_espera_o_retry_after_informado(esperas):
+    servico = ServicoRoteirizado([_falha(CategoriaErro.COTA, espera=1.5), Success(DescricaoImagem('ok'))])
+    ServicoIALimitado(servico).descrever_imagem_bytes(b'', 'image/png')
+    assert esperas == [1.5]
+
+def test_desiste_quando_a_espera_nao_cabe_no_prazo(esperas):
+    servico = ServicoRoteirizado([_falha(CategoriaErro.COTA, espera=10.0)])
+    resultado = ServicoIALimitado(servico).descrever_imagem_bytes(b'', 'image/png', Prazo(1.0))
+    assert isinstance(resultado, Failure)
+    assert servico.chamadas == 1
+    assert esperas == []
+
+def test_retry_after_bloqueia_o_balde_para_todos_os_pedidos(esperas):
+    servico = ServicoRoteirizado(
+        [_falha(CategoriaErro.COTA, espera=2.0), Success(DescricaoImagem('ok'))],
+        LimiteTaxa(requisicoes_por_minuto=600, rajada=5)
+    )
+    limitado = ServicoIALimitado(servico)
+    limitado.descrever_imagem_bytes(b'', 'image/png')
+    # A nova tentativa esperou pelo balde bloqueado, não por um sleep próprio
+    assert len(esperas) == 1 and esperas[0] == pytest.approx(2.0, abs=0.05)
+    assert not limitado.comporta(1)
+
+def test_cota_que_nao_cabe_no_prazo_falha_como_tempo_esgotado(esperas):
+    servico = ServicoRoteirizado(
+        [Success(DescricaoImagem('ok'))],
+        LimiteTaxa(requisicoes_por_minuto=60, rajada=1)
+    )
+    limitado = ServicoIALimitado(servico)
+    limitado.descrever_imagem_bytes(b'', 'image/png')
+    resultado = limitado.descrever_imagem_bytes(b'', 'image/png', Prazo(0.2))
+    assert resultado.failure().categoria == CategoriaErro.TEMPO_ESGOTADO
+    assert servico.chamadas == 1
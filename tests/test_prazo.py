@@ -0,0 +1,34 @@
+# tests/test_prazo.py
+import time
+
+import pytest
+
+from prazo import FRACAO_TENTATIVA_ATUAL, Prazo
+
+def test_restante_nunca_fica_negativo():
+    prazo = Prazo(0.01)
+    time.sleep(0.02)
+    assert prazo.expirado
+    assert prazo.restante == 0.0
+    assert prazo.milissegundos_restantes == 1
+
+def test_tentativa_atual_recebe_a_maior_parte_quando_outras_podem_vir():
+    prazo = Prazo(10.0)
+    fatia = prazo.dividir(3)
+    assert fatia.segundos == pytest.approx(10.0 * FRACAO_TENTATIVA_ATUAL, abs=0.05)
+    assert fatia.segundos < prazo.restante
+
+@pytest.mark.parametrize('tentativas_restantes', [1, 0])
+def test_ultima_tentativa_recebe_todo_o_tempo_restante(tentativas_restantes):
+    prazo = Prazo(10.0)
+    assert prazo.dividir(tentativas_restantes).segundos == pytest.approx(10.0, abs=0.05)
+
+def test_tempo_nao_usado_por_uma_tentativa_fica_para_a_seguinte():
+    prazo = Prazo(10.0)
+    prazo.dividir(2)
+    # A primeira tentativa terminou logo: a última ainda tem o prazo quase todo
+    assert prazo.dividir(1).segundos == pytest.approx(10.0, abs=0.05)
+
+def test_fatia_de_prazo_expirado_ja_nasce_expirada():
+    prazo = Prazo(0.0)
+    assert prazo.dividir(2).expirado
@@ -0,0 +1,56 @@
+# tests/test_preprocessamento_imagem.py
+import pytest
+
+from entidades import Imagem, PerfilImagem
+from preprocessamento_imagem import FRACAO_SOBREPOSICAO, MAX_BLOCOS, calcular_blocos, lado_blocos, precisa_dividir
+
+PERFIL = PerfilImagem(lado_maximo=1024, formato='JPEG', qualidade=85)
+
+def _cobertura(blocos, eixo):
+    """Intervalos cobertos numa dimensão, ordenados, sem repetição."""
+    return sorted({(bloco[eixo], bloco[eixo + 2]) for bloco in blocos})
+
+def test_imagem_que_cabe_num_bloco_vira_um_bloco_so():
+    assert calcular_blocos(800, 600, 1024) == [(0, 0, 800, 600)]
+
+@pytest.mark.parametrize('largura, altura, lado', [
+    (5000, 3000, 1024),
+    (1280, 12000, 1280),
+    (30000, 30000, 1024),
+    (2049, 1025, 1024),
+])
+def test_blocos_cobrem_a_imagem_com_sobreposicao_e_respeitam_o_limite(largura, altura, lado):
+    blocos = calcular_blocos(largura, altura, lado)
+    assert 1 <= len(blocos) <= MAX_BLOCOS
+    for eixo, dimensao in ((0, largura), (1, altura)):
+        intervalos = _cobertura(blocos, eixo)
+        assert intervalos[0][0] == 0
+        assert intervalos[-1][1] == dimensao
+        tamanho = intervalos[0][1] - intervalos[0][0]
+        for anterior, seguinte in zip(intervalos, intervalos[1:]):
+            # Vizinhos se sobrepõem ao menos na fração prevista do lado do bloco
+            assert anterior[1] - seguinte[0] >= int(tamanho * FRACAO_SOBREPOSICAO) - 1
+
+def test_blocos_em_ordem_de_leitura():
+    blocos = calcular_blocos(3000, 3000, 1024)
+    assert blocos == sorted(blocos, key=lambda caixa: (caixa[1], caixa[0]))
+    assert len({caixa[0] for caixa in blocos}) * len({caixa[1] for caixa in blocos}) == len(blocos)
+
+def test_grade_grande_demais_aumenta_os_blocos():
+    blocos = calcular_blocos(10000, 10000, 1024, max_blocos=4)
+    assert len(blocos) == 4
+    esquerda, topo, direita, base = blocos[0]
+    assert direita - esquerda > 1024 and base - topo > 1024
+
+def test_so_divide_imagens_enormes_ou_muito_alongadas():
+    assert not precisa_dividir(PERFIL, Imagem('a.png', 'png', 3840, 2160))
+    assert precisa_dividir(PERFIL, Imagem('a.png', 'png', 8000, 6000))
+    assert precisa_dividir(PERFIL, Imagem('a.png', 'png', 1280, 12000))
+    assert not precisa_dividir(PERFIL, Imagem('a.png', 'png', 1024, 2048))
+    assert not precisa_dividir(PERFIL, Imagem('a.png', 'png'))
+
+def test_imagem_alongada_divide_so_o_lado_maior():
+    lado = lado_blocos(PERFIL, 1280, 12000)
+    assert lado == 1280
+    blocos = calcular_blocos(1280, 12000, lado)
+    assert all(esquerda == 0 and direita == 1280 for esquerda, _, direita, _ in blocos)
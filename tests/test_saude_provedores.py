@@ -0,0 +1,169 @@
+# tests/test_saude_provedores.py
+import time
+from typing import Iterator, List, Optional
+
+from returns.result import Result, Success, Failure
+
+from entidades import CategoriaErro, DescricaoImagem, ErroIA, NivelDetalhe, ProvedorIA
+from prazo import Prazo
+from saude_provedores import EstadoCircuito, MonitorSaude, ServicoIAMonitorado
+
+# Espera curta até a sondagem, para percorrer os estados do circuito sem demora
+ESPERA_SONDAGEM = 0.05
+
+def _monitor(**parametros) -> MonitorSaude:
+    return MonitorSaude(espera_sondagem=ESPERA_SONDAGEM, **parametros)
+
+def _abrir(monitor: MonitorSaude, provedor: ProvedorIA = ProvedorIA.GEMINI) -> None:
+    for _ in range(monitor.falhas_para_abrir):
+        monitor.registrar_falha(provedor)
+
+class ServicoRoteirizado:
+    """ServicoIA de teste: devolve sempre a mesma resposta e conta as chamadas."""
+
+    def __init__(self, resposta: Result, provedor: ProvedorIA = ProvedorIA.GEMINI):
+        self.provedor = provedor
+        self.resposta = resposta
+        self.chamadas = 0
+
+    def descrever_imagem_bytes(self, imagem_bytes: bytes, mime_type: str, prazo: Optional[Prazo] = None, nivel: NivelDetalhe = NivelDetalhe.DETALHADO, resumo: Optional[bytes] = None) -> Result[DescricaoImagem, ErroIA]:
+        self.chamadas += 1
+        return self.resposta
+
+    def descrever_imagem_bytes_stream(self, imagem_bytes: bytes, mime_type: str, prazo: Optional[Prazo] = None, nivel: NivelDetalhe = NivelDetalhe.DETALHADO, resumo: Optional[bytes] = None) -> Result[Iterator[str], ErroIA]:
+        self.chamadas += 1
+        return self.resposta.map(lambda texto: iter(texto.split()))
+
+def test_circuito_comeca_fechado():
+    monitor = _monitor()
+    assert monitor.estado(ProvedorIA.GEMINI) == EstadoCircuito.FECHADO
+    assert monitor.permitir(ProvedorIA.GEMINI)
+
+def test_falhas_consecutivas_abrem_o_circuito():
+    monitor = _monitor(falhas_para_abrir=3)
+    monitor.registrar_falha(ProvedorIA.GEMINI)
+    monitor.registrar_falha(ProvedorIA.GEMINI)
+    assert monitor.estado(ProvedorIA.GEMINI) == EstadoCircuito.FECHADO
+    monitor.registrar_falha(ProvedorIA.GEMINI)
+    assert monitor.estado(ProvedorIA.GEMINI) == EstadoCircuito.ABERTO
+    assert not monitor.permitir(ProvedorIA.GEMINI)
+    assert 0 < monitor.espera_restante(ProvedorIA.GEMINI) <= ESPERA_SONDAGEM
+
+def test_sucesso_zera_as_falhas_consecutivas():
+    monitor = _monitor(falhas_para_abrir=3)
+    for _ in range(5):
+        monitor.registrar_falha(ProvedorIA.GEMINI)
+        monitor.registrar_sucesso(ProvedorIA.GEMINI, 0.1)
+    assert monitor.estado(ProvedorIA.GEMINI) == EstadoCircuito.FECHADO
+
+def test_taxa_de_erro_alta_abre_o_circuito_com_amostras_suficientes():
+    monitor = _monitor(falhas_para_abrir=3, minimo_amostras=6, taxa_erro_para_abrir=0.5)
+    for _ in range(2):
+        monitor.registrar_sucesso(ProvedorIA.GEMINI, 0.1)
+        monitor.registrar_falha(ProvedorIA.GEMINI)
+    assert monitor.estado(ProvedorIA.GEMINI) == EstadoCircuito.FECHADO
+    monitor.registrar_sucesso(ProvedorIA.GEMINI, 0.1)
+    monitor.registrar_falha(ProvedorIA.GEMINI)
+    assert monitor.estado(ProvedorIA.GEMINI) == EstadoCircuito.ABERTO
+
+def test_depois_da_espera_libera_uma_unica_sondagem():
+    monitor = _monitor()
+    _abrir(monitor)
+    time.sleep(ESPERA_SONDAGEM * 1.5)
+    assert monitor.permitir(ProvedorIA.GEMINI)
+    assert monitor.estado(ProvedorIA.GEMINI) == EstadoCircuito.SEMI_ABERTO
+    assert not monitor.permitir(ProvedorIA.GEMINI)
+
+def test_sondagem_bem_sucedida_fecha_o_circuito():
+    monitor = _monitor()
+    _abrir(monitor)
+    time.sleep(ESPERA_SONDAGEM * 1.5)
+    monitor.permitir(ProvedorIA.GEMINI)
+    monitor.registrar_sucesso(ProvedorIA.GEMINI, 0.1)
+    assert monitor.estado(ProvedorIA.GEMINI) == EstadoCircuito.FECHADO
+    assert monitor.permitir(ProvedorIA.GEMINI)
+
+def test_sondagem_com_falha_reabre_o_circuito():
+    monitor = _monitor(falhas_para_abrir=3)
+    _abrir(monitor)
+    time.sleep(ESPERA_SONDAGEM * 1.5)
+    monitor.permitir(ProvedorIA.GEMINI)
+    monitor.registrar_sucesso(ProvedorIA.GEMINI, 0.1)
+    _abrir(monitor)
+    time.sleep(ESPERA_SONDAGEM * 1.5)
+    monitor.permitir(ProvedorIA.GEMINI)
+    # No semiaberto, uma única falha basta para reabrir
+    monitor.registrar_falha(ProvedorIA.GEMINI)
+    assert monitor.estado(ProvedorIA.GEMINI) == EstadoCircuito.ABERTO
+    assert not monitor.permitir(ProvedorIA.GEMINI)
+
+def test_sondagem_sem_resposta_e_substituida_depois_da_espera():
+    monitor = _monitor()
+    _abrir(monitor)
+    time.sleep(ESPERA_SONDAGEM * 1.5)
+    assert monitor.permitir(ProvedorIA.GEMINI)
+    time.sleep(ESPERA_SONDAGEM * 1.5)
+    assert monitor.permitir(ProvedorIA.GEMINI)
+
+def test_circuitos_sao_independentes_por_provedor():
+    monitor = _monitor()
+    _abrir(monitor, ProvedorIA.GEMINI)
+    assert monitor.permitir(ProvedorIA.MISTRAL)
+
+def test_ordenar_poe_circuitos_abertos_por_ultimo_e_os_mais_rapidos_primeiro():
+    monitor = _monitor(fator_preferencia=1.0)
+    gemini = ServicoRoteirizado(Success(''), ProvedorIA.GEMINI)
+    mistral = ServicoRoteirizado(Success(''), ProvedorIA.MISTRAL)
+    local = ServicoRoteirizado(Success(''), ProvedorIA.LOCAL)
+    monitor.registrar_sucesso(ProvedorIA.GEMINI, 2.0)
+    monitor.registrar_sucesso(ProvedorIA.MISTRAL, 0.5)
+    assert monitor.ordenar([gemini, mistral, local]) == [mistral, gemini, local]
+    _abrir(monitor, ProvedorIA.MISTRAL)
+    assert monitor.ordenar([gemini, mistral, local])[-1] is mistral
+
+def test_ordenar_mantem_a_ordem_sem_historico_e_favorece_o_primario():
+    monitor = _monitor(fator_preferencia=0.8)
+    gemini = ServicoRoteirizado(Success(''), ProvedorIA.GEMINI)
+    mistral = ServicoRoteirizado(Success(''), ProvedorIA.MISTRAL)
+    assert monitor.ordenar([gemini, mistral]) == [gemini, mistral]
+    # O primário, um pouco mais lento, continua na frente pela preferência
+    monitor.registrar_sucesso(ProvedorIA.GEMINI, 1.1)
+    monitor.registrar_sucesso(ProvedorIA.MISTRAL, 1.0)
+    assert monitor.ordenar([gemini, mistral]) == [gemini, mistral]
+
+def test_monitorado_recusa_sem_chamar_com_o_circuito_aberto():
+    monitor = _monitor()
+    _abrir(monitor)
+    servico = ServicoRoteirizado(Success(DescricaoImagem('ok')))
+    resultado = ServicoIAMonitorado(servico, monitor).descrever_imagem_bytes(b'', 'image/png')
+    assert servico.chamadas == 0
+    erro = resultado.failure()
+    assert erro.categoria == CategoriaErro.TRANSITORIO
+    assert 0 < erro.espera <= ESPERA_SONDAGEM
+
+def test_falhas_causadas_pelo_pedido_nao_afetam_a_saude():
+    monitor = _monitor(falhas_para_abrir=1)
+    for categoria in (CategoriaErro.ENTRADA_INVALIDA, CategoriaErro.CONTEUDO_BLOQUEADO):
+        servico = ServicoRoteirizado(Failure(ErroIA('recusada', categoria)))
+        ServicoIAMonitorado(servico, monitor).descrever_imagem_bytes(b'', 'image/png')
+    assert monitor.estado(ProvedorIA.GEMINI) == EstadoCircuito.FECHADO
+
+def test_tempo_esgotado_no_fim_do_prazo_do_pedido_nao_conta_como_falha():
+    monitor = _monitor(falhas_para_abrir=1)
+    servico = ServicoRoteirizado(Failure(ErroIA('sem resposta', CategoriaErro.TEMPO_ESGOTADO)))
+    monitorado = ServicoIAMonitorado(servico, monitor)
+    monitorado.descrever_imagem_bytes(b'', 'image/png', Prazo(0.0))
+    assert monitor.estado(ProvedorIA.GEMINI) == EstadoCircuito.FECHADO
+    # Com tempo de sobra no prazo, a demora é do provedor
+    monitorado.descrever_imagem_bytes(b'', 'image/png', Prazo(30.0))
+    assert monitor.estado(ProvedorIA.GEMINI) == EstadoCircuito.ABERTO
+
+def test_primeiro_fragmento_do_fluxo_fecha_o_circuito():
+    monitor = _monitor()
+    _abrir(monitor)
+    time.sleep(ESPERA_SONDAGEM * 1.5)
+    servico = ServicoRoteirizado(Success(DescricaoImagem('uma frase longa')))
+    fragmentos = ServicoIAMonitorado(servico, monitor).descrever_imagem_bytes_stream(b'', 'image/png').unwrap()
+    assert next(fragmentos) == 'uma'
+    assert monitor.estado(ProvedorIA.GEMINI) == EstadoCircuito.FECHADO
+    fragmentos.close()
@@ -0,0 +1,79 @@
+# tests/test_tratador_erros.py
+from typing import Dict, Optional
+
+import pytest
+
+from entidades import CategoriaErro
+from tratador_erros import classificar_excecao
+
+class ErroSDK(Exception):
+    """Exceção de SDK de teste, com status HTTP e cabeçalhos opcionais."""
+
+    def __init__(self, mensagem: str, status: Optional[int] = None, cabecalhos: Optional[Dict[str, str]] = None):
+        super().__init__(mensagem)
+        self.status_code = status
+        if cabecalhos is not None:
+            self.response = type('Resposta', (), {'headers': cabecalhos, 'status_code': status})()
+
+class TimeoutException(Exception):
+    """Mesmo nome da exceção de tempo esgotado do httpx."""
+
+class ConnectError(Exception):
+    """Mesmo nome de uma exceção de rede do httpx, que herda de NetworkError."""
+
+class NetworkError(Exception):
+    pass
+
+class ConexaoRecusada(ConnectError, NetworkError):
+    pass
+
+@pytest.mark.parametrize('status, categoria', [
+    (401, CategoriaErro.AUTENTICACAO),
+    (403, CategoriaErro.AUTENTICACAO),
+    (429, CategoriaErro.COTA),
+    (408, CategoriaErro.TEMPO_ESGOTADO),
+    (504, CategoriaErro.TEMPO_ESGOTADO),
+    (500, CategoriaErro.TRANSITORIO),
+    (503, CategoriaErro.TRANSITORIO),
+    (413, CategoriaErro.ENTRADA_INVALIDA),
+    (422, CategoriaErro.ENTRADA_INVALIDA),
+])
+def test_categoria_pelo_status_http(status, categoria):
+    assert classificar_excecao(ErroSDK('falhou', status), 'Gemini').categoria == categoria
+
+def test_chave_invalida_respondida_com_400_e_autenticacao():
+    erro = classificar_excecao(ErroSDK('400 INVALID_ARGUMENT: API key not valid', 400), 'Gemini')
+    assert erro.categoria == CategoriaErro.AUTENTICACAO
+
+def test_conteudo_bloqueado_respondido_com_400_e_reconhecido_pela_mensagem():
+    erro = classificar_excecao(ErroSDK('400 request blocked by SAFETY filters', 400), 'Gemini')
+    assert erro.categoria == CategoriaErro.CONTEUDO_BLOQUEADO
+
+def test_tipo_da_excecao_vale_mais_que_a_mensagem():
+    assert classificar_excecao(TimeoutException('500 no meio'), 'Mistral').categoria == CategoriaErro.TEMPO_ESGOTADO
+    assert classificar_excecao(ConexaoRecusada('recusada'), 'Mistral').categoria == CategoriaErro.TRANSITORIO
+
+@pytest.mark.parametrize('mensagem, categoria', [
+    ('429 RESOURCE_EXHAUSTED', CategoriaErro.COTA),
+    ('Too Many Requests', CategoriaErro.COTA),
+    ('DEADLINE_EXCEEDED', CategoriaErro.TEMPO_ESGOTADO),
+    ('503 UNAVAILABLE: model overloaded', CategoriaErro.TRANSITORIO),
+    ('PERMISSION_DENIED', CategoriaErro.AUTENTICACAO),
+    ('algo inesperado', CategoriaErro.DESCONHECIDO),
+])
+def test_categoria_pela_mensagem_sem_status(mensagem, categoria):
+    assert classificar_excecao(Exception(mensagem), 'Gemini').categoria == categoria
+
+def test_espera_do_cabecalho_retry_after():
+    erro = classificar_excecao(ErroSDK('limite', 429, {'retry-after': '7'}), 'Mistral')
+    assert erro.categoria == CategoriaErro.COTA
+    assert erro.espera == 7.0
+
+def test_espera_do_retry_delay_na_mensagem():
+    erro = classificar_excecao(Exception("429 RESOURCE_EXHAUSTED {'retryDelay': '12s'}"), 'Gemini')
+    assert erro.espera == 12.0
+
+def test_mensagem_inclui_o_contexto_e_continua_sendo_texto():
+    erro = classificar_excecao(Exception('falhou'), 'Erro ao processar imagem com Gemini')
+    assert erro == 'Erro ao processar imagem com Gemini: falhou'
+    assert erro.espera is None
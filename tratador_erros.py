@@ -1,29 +1,155 @@
 # infraestrutura/tratador_erros.py
-from typing import Dict, Any, Callable
+import re
+from typing import Dict, Any, Callable, Optional, Union
 from returns.result import Result, Success, Failure
 from returns.curry import curry
 
+from entidades import CategoriaErro, ErroIA, categoria_erro
+
+# Retry-After (cabeçalho HTTP, em segundos) ou retryDelay (RetryInfo do Google, "12s")
+PADRAO_ESPERA_INFORMADA = re.compile(
+    r'(?:retry-after|retryDelay)[\'"]?\s*[:=]\s*[\'"]?(\d+(?:\.\d+)?)', re.IGNORECASE
+)
+
+# Os SDKs nem sempre expõem o status HTTP, mas o repetem na mensagem da
+# exceção; os padrões são verificados nesta ordem. O Gemini responde 400
+# para chaves inválidas, por isso a autenticação vem antes da entrada inválida
+PADROES_CATEGORIA = (
+    (CategoriaErro.AUTENTICACAO, re.compile(
+        r'\b40[13]\b|API.?key|UNAUTHENTICATED|PERMISSION_DENIED|unauthori[sz]ed', re.IGNORECASE
+    )),
+    (CategoriaErro.COTA, re.compile(
+        r'\b429\b|RESOURCE_EXHAUSTED|too many requests|rate.?limit', re.IGNORECASE
+    )),
+    (CategoriaErro.CONTEUDO_BLOQUEADO, re.compile(
+        r'SAFETY|PROHIBITED_CONTENT|blocked|content.?filter|moderation', re.IGNORECASE
+    )),
+    (CategoriaErro.TEMPO_ESGOTADO, re.compile(
+        r'\b(?:408|504)\b|DEADLINE_EXCEEDED|timed? ?out', re.IGNORECASE
+    )),
+    (CategoriaErro.TRANSITORIO, re.compile(
+        r'\b50[0-3]\b|UNAVAILABLE|INTERNAL|overloaded|connection', re.IGNORECASE
+    )),
+    (CategoriaErro.ENTRADA_INVALIDA, re.compile(
+        r'\b(?:400|413|415|422)\b|INVALID_ARGUMENT', re.IGNORECASE
+    )),
+)
+
+# Exceções de transporte do httpx (usado pelos dois SDKs) e da biblioteca padrão,
+# reconhecidas pelo nome para não importar o httpx só para classificá-las
+EXCECOES_TEMPO_ESGOTADO = {'TimeoutException', 'TimeoutError', 'timeout'}
+EXCECOES_REDE = {'NetworkError', 'TransportError', 'RemoteProtocolError', 'ConnectionError'}
+
+def espera_informada(erro: str) -> Optional[float]:
+    """Segundos de espera pedidos pelo provedor na mensagem de erro, se houver."""
+    encontrado = PADRAO_ESPERA_INFORMADA.search(erro)
+    return float(encontrado.group(1)) if encontrado else None
+
+def _status_http(excecao: BaseException) -> Optional[int]:
+    """Status HTTP da exceção: status_code (Mistral), code (Gemini) ou o da resposta anexada."""
+    for atributo in ('status_code', 'code'):
+        valor = getattr(excecao, atributo, None)
+        if isinstance(valor, int):
+            return valor
+    resposta = getattr(excecao, 'response', None) or getattr(excecao, 'raw_response', None)
+    valor = getattr(resposta, 'status_code', None)
+    return valor if isinstance(valor, int) else None
+
+def _espera_cabecalho(excecao: BaseException) -> Optional[float]:
+    """Retry-After, em segundos, da resposta HTTP anexada à exceção."""
+    resposta = getattr(excecao, 'response', None) or getattr(excecao, 'raw_response', None)
+    cabecalhos = getattr(resposta, 'headers', None)
+    if cabecalhos is None:
+        return None
+    try:
+        return float(cabecalhos.get('retry-after'))
+    except (TypeError, ValueError):
+        return None
+
+def categoria_status(status: int) -> CategoriaErro:
+    """Categoria de uma resposta HTTP de erro."""
+    if status in (401, 403):
+        return CategoriaErro.AUTENTICACAO
+    if status == 429:
+        return CategoriaErro.COTA
+    if status in (408, 504):
+        return CategoriaErro.TEMPO_ESGOTADO
+    if status >= 500:
+        return CategoriaErro.TRANSITORIO
+    if status in (400, 413, 415, 422):
+        return CategoriaErro.ENTRADA_INVALIDA
+    return CategoriaErro.DESCONHECIDO
+
+def categoria_mensagem(mensagem: str) -> CategoriaErro:
+    """Categoria deduzida do texto do erro, para SDKs que só repassam a mensagem."""
+    for categoria, padrao in PADROES_CATEGORIA:
+        if padrao.search(mensagem):
+            return categoria
+    return CategoriaErro.DESCONHECIDO
+
+def classificar_excecao(excecao: BaseException, contexto: str) -> ErroIA:
+    """
+    Converte a exceção de um SDK em ErroIA com categoria e espera pedida.
+    Prioriza o tipo da exceção e o status HTTP; a mensagem é o último recurso.
+    """
+    mensagem = f'{contexto}: {str(excecao)}'
+    nomes = {classe.__name__ for classe in type(excecao).__mro__}
+    status = _status_http(excecao)
+
+    if nomes & EXCECOES_TEMPO_ESGOTADO:
+        categoria = CategoriaErro.TEMPO_ESGOTADO
+    elif nomes & EXCECOES_REDE:
+        categoria = CategoriaErro.TRANSITORIO
+    elif status is not None:
+        categoria = categoria_status(status)
+        # Chaves inválidas também chegam como 400 INVALID_ARGUMENT
+        if categoria in (CategoriaErro.ENTRADA_INVALIDA, CategoriaErro.DESCONHECIDO):
+            categoria = _refinar(categoria, mensagem)
+    else:
+        categoria = categoria_mensagem(mensagem)
+
+    espera = _espera_cabecalho(excecao)
+    if espera is None:
+        espera = espera_informada(mensagem)
+    return ErroIA(mensagem, categoria, espera)
+
+def _refinar(categoria: CategoriaErro, mensagem: str) -> CategoriaErro:
+    """Usa a mensagem quando ela é mais específica que o status."""
+    pela_mensagem = categoria_mensagem(mensagem)
+    if pela_mensagem in (CategoriaErro.AUTENTICACAO, CategoriaErro.CONTEUDO_BLOQUEADO):
+        return pela_mensagem
+    return categoria if categoria != CategoriaErro.DESCONHECIDO else pela_mensagem
+
 @curry
 def tratar_erro(
-    manipuladores: Dict[str, Callable[[str], Result[Any, str]]],
+    manipuladores: Dict[Union[CategoriaErro, str], Callable[[str], Result[Any, str]]],
     erro: str
 ) -> Result[Any, str]:
     """
-    Trata erros baseado em manipuladores registrados.
-    Usa pattern matching funcional para determinar o manipulador correto.
+    Trata erros baseado em manipuladores registrados. Erros com categoria
+    vão direto ao manipulador dela; nos demais, os padrões de texto
+    registrados são procurados na mensagem.
     """
+    categoria = categoria_erro(erro)
+    if categoria in manipuladores:
+        return manipuladores[categoria](erro)
+
     for padrao, manipulador in manipuladores.items():
-        if padrao in erro:
+        if isinstance(padrao, str) and padrao in erro:
             return manipulador(erro)
-    
+
     # Manipulador padrão se nenhum padrão corresponder
     return Failure(f'Erro não tratado: {erro}')
 
 # Exemplo de uso do tratador de erros
 manipuladores_erro = {
+    CategoriaErro.AUTENTICACAO: lambda erro: Failure('Problema com a chave de API. Verifique suas configurações.'),
+    CategoriaErro.COTA: lambda erro: Failure('Limite de uso do provedor atingido. Tente novamente em instantes.'),
+    CategoriaErro.TRANSITORIO: lambda erro: Failure('Erro de conexão. Verifique sua internet.'),
+    CategoriaErro.CONTEUDO_BLOQUEADO: lambda erro: Failure('O provedor se recusou a descrever esta imagem.'),
     'Imagem não encontrada': lambda erro: Failure('A imagem solicitada não pôde ser localizada.'),
     'chave API': lambda erro: Failure('Problema com a chave de API. Verifique suas configurações.'),
     'conexão': lambda erro: Failure('Erro de conexão. Verifique sua internet.'),
 }
 
-tratar_erro_padronizado = tratar_erro(manipuladores_erro)
\ No newline at end of file
+tratar_erro_padronizado = tratar_erro(manipuladores_erro)